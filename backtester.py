@@ -0,0 +1,148 @@
+# Vectorized rule-based backtester for daily close series.
+#
+# Signals are evaluated at the close of bar t and the position is taken at that
+# close, so it earns the return of bar t + 1. Every step -- signals, the position
+# state machine (including stop-loss / take-profit exits), sizing, fees and the
+# equity curve -- is a NumPy array operation; there is no per-bar Python loop.
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def moving_average(values, window):
+    # Simple moving average via cumulative sums; NaN until `window` bars are available
+    values = np.asarray(values, dtype='float64')
+    out = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        csum = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def _ffill_index(mask):
+    # For every bar, the index of the most recent bar where `mask` was True (-1 if none)
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+
+def ma_crossover_signals(close, fast=20, slow=50):
+    fast_ma = moving_average(close, fast)
+    slow_ma = moving_average(close, slow)
+    above = fast_ma > slow_ma  # False while either average is still NaN
+    below = fast_ma < slow_ma
+    return above, below
+
+
+def threshold_signals(values, entry_below, exit_above):
+    # Enter when the series drops to `entry_below` or lower, exit once it reaches `exit_above`
+    values = np.asarray(values, dtype='float64')
+    return values <= entry_below, values >= exit_above
+
+
+def positions_from_signals(close, entries, exits, stop_loss=None, take_profit=None):
+    """Turn entry/exit conditions into a 0/1 long position series.
+
+    An exit condition wins over an entry condition on the same bar. `stop_loss` and
+    `take_profit` are fractions (0.1 = 10%) measured from the entry close; once hit,
+    the position stays flat until the next fresh entry.
+    """
+    close = np.asarray(close, dtype='float64')
+    entries = np.asarray(entries, dtype=bool)
+    exits = np.asarray(exits, dtype=bool)
+    n = len(close)
+
+    # Latch the last signal: 1 after an entry, 0 after an exit
+    events = entries | exits
+    last_event = _ffill_index(events)
+    state = np.where(last_event >= 0, entries[np.maximum(last_event, 0)] & ~exits[np.maximum(last_event, 0)], False)
+    position = state.astype('float64')
+    if stop_loss is None and take_profit is None:
+        return position
+
+    # Each trade starts where the latched state switches on
+    starts = state & ~np.concatenate(([False], state[:-1]))
+    start_idx = _ffill_index(starts)
+    entry_price = close[np.maximum(start_idx, 0)]
+    change = close / entry_price - 1
+    hit = state & (np.arange(n) > start_idx)
+    stop_hit = np.zeros(n, dtype=bool)
+    if stop_loss is not None:
+        stop_hit |= change <= -stop_loss
+    if take_profit is not None:
+        stop_hit |= change >= take_profit
+    last_hit = _ffill_index(hit & stop_hit)
+    # Flat from the close of the bar that hit the level until the trade's next start
+    stopped = state & (last_hit >= start_idx) & (start_idx >= 0)
+    return np.where(stopped, 0.0, position)
+
+
+def position_sizes(close, fraction=1.0, target_vol=None, vol_window=20, max_leverage=1.0):
+    # Share of equity committed when long: a fixed fraction, or scaled so the position's
+    # trailing annualised volatility matches `target_vol` (capped at `max_leverage`)
+    n = len(close)
+    if target_vol is None:
+        return np.full(n, float(fraction))
+    returns = np.diff(np.log(np.asarray(close, dtype='float64')), prepend=np.nan)
+    returns = np.nan_to_num(returns)
+    mean = moving_average(returns, vol_window)
+    mean_sq = moving_average(returns ** 2, vol_window)
+    vol = np.sqrt(np.maximum(mean_sq - mean ** 2, 0) * TRADING_DAYS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        size = np.where(vol > 0, target_vol / vol, 0.0)
+    return np.clip(np.nan_to_num(size), 0.0, max_leverage) * fraction
+
+
+def equity_curve(close, position, sizes=1.0, fee=0.001, initial_capital=10_000.0):
+    # Per-bar strategy returns and equity for a position series
+    close = np.asarray(close, dtype='float64')
+    exposure = np.asarray(position, dtype='float64') * np.broadcast_to(np.asarray(sizes, dtype='float64'), close.shape)
+    asset_returns = np.zeros(len(close))
+    asset_returns[1:] = close[1:] / close[:-1] - 1
+    held = np.concatenate(([0.0], exposure[:-1]))
+    turnover = np.abs(np.diff(exposure, prepend=0.0))
+    strategy_returns = held * asset_returns - fee * turnover
+    return exposure, strategy_returns, initial_capital * np.cumprod(1 + strategy_returns)
+
+
+def run_backtest(dates, close, position, sizes=1.0, fee=0.001, initial_capital=10_000.0):
+    """Equity curve and summary stats for a position series.
+
+    `position` is 0/1 per bar, `sizes` the share of equity committed when long
+    (scalar or per bar), `fee` the cost per unit of turnover (0.001 = 10 bp).
+    Returns (frame, stats).
+    """
+    close = np.asarray(close, dtype='float64')
+    exposure, strategy_returns, equity = equity_curve(close, position, sizes, fee, initial_capital)
+    frame = pd.DataFrame({
+        'Close': close,
+        'Position': exposure,
+        'Return': strategy_returns,
+        'Equity': equity,
+        'Buy & Hold': initial_capital * close / close[0],
+    }, index=pd.DatetimeIndex(dates, name='Date'))
+    return frame, summarize(close, np.asarray(position) > 0, strategy_returns, equity, initial_capital)
+
+
+def summarize(close, long, returns, equity, initial_capital):
+    years = max(len(equity) / TRADING_DAYS, 1e-9)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    # Trades run from the bar a position opens to the bar it closes
+    opens = np.flatnonzero(long & ~np.concatenate(([False], long[:-1])))
+    closes = np.flatnonzero(~long & np.concatenate(([False], long[:-1])))
+    closes = np.concatenate((closes, [len(long) - 1]))[:len(opens)]
+    trade_returns = equity[closes] / equity[np.maximum(opens - 1, 0)] - 1 if len(opens) else np.empty(0)
+
+    volatility = returns.std() * np.sqrt(TRADING_DAYS)
+    return {
+        'total_return': equity[-1] / initial_capital - 1,
+        'cagr': (equity[-1] / initial_capital) ** (1 / years) - 1,
+        'volatility': volatility,
+        'sharpe': returns.mean() * TRADING_DAYS / volatility if volatility > 0 else np.nan,
+        'max_drawdown': drawdown.min(),
+        'trades': len(opens),
+        'win_rate': (trade_returns > 0).mean() if len(trade_returns) else np.nan,
+        'exposure': long.mean(),
+        'buy_hold_return': close[-1] / close[0] - 1,
+    }
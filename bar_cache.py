@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFPricesMissingError
+
+import perf
+from data_broker import get_broker
+
+CACHE_DIR = 'history_cache'
+
+# How old the newest fetch may get before the tail is refreshed
+STALE_AFTER = {
+    '1m': pd.Timedelta(minutes=1), '5m': pd.Timedelta(minutes=5), '15m': pd.Timedelta(minutes=5),
+    '30m': pd.Timedelta(minutes=5), '1h': pd.Timedelta(minutes=5), '90m': pd.Timedelta(minutes=5),
+    '1d': pd.Timedelta(hours=1), '5d': pd.Timedelta(hours=6), '1wk': pd.Timedelta(hours=6),
+    '1mo': pd.Timedelta(days=1), '3mo': pd.Timedelta(days=1),
+}
+
+# yfinance period strings -> how far back to start. "Nd" periods count trading days,
+# so they are fetched with slack for weekends and holidays and trimmed afterwards.
+PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1), '3mo': pd.DateOffset(months=3), '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1), '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+EARLIEST = pd.Timestamp('1970-01-01', tz='UTC')
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def fetch_history(ticker, start, end, interval):
+    try:
+        return yf.Ticker(ticker).history(start=start.to_pydatetime(), end=end.to_pydatetime(),
+                                         interval=interval, raise_errors=True)
+    except YFPricesMissingError:
+        # Nothing traded in the range (a weekend or holiday gap): it is still covered.
+        # An unknown ticker fails before this, on its missing timezone.
+        return pd.DataFrame()
+
+
+def _to_utc(value, tz):
+    value = pd.Timestamp(value)
+    if value.tzinfo is None:
+        value = value.tz_localize(tz or 'UTC')
+    return value.tz_convert('UTC')
+
+
+def _period_start(period, now):
+    if period == 'max':
+        return EARLIEST
+    if period == 'ytd':
+        return now.normalize().replace(month=1, day=1)
+    if period[:-1].isdigit() and period.endswith('d'):
+        days = int(period[:-1])
+        return now.normalize() - pd.Timedelta(days=days * 7 // 5 + 4)
+    return now - PERIOD_OFFSETS[period]
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _missing_ranges(covered, start, end):
+    # Parts of [start, end) not covered by the (merged, sorted) `covered` ranges
+    missing = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+class BarCache:
+    """On-disk OHLCV cache per (ticker, interval).
+
+    Each entry remembers which time ranges have already been fetched, so a request
+    only downloads the missing tail and any internal gaps, merges them into the
+    stored series and serves the answer as a slice of it.
+    """
+
+    def __init__(self, root=CACHE_DIR, fetch=fetch_history):
+        self.root = root
+        self.fetch = fetch
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker, interval):
+        return os.path.join(self.root, f"{ticker.upper()}_{interval}")
+
+    def _lock(self, ticker, interval):
+        with _locks_guard:
+            return _locks.setdefault((self.root, ticker.upper(), interval), threading.Lock())
+
+    def load(self, ticker, interval):
+        path = self._path(ticker, interval)
+        try:
+            with open(path + '.json') as f:
+                meta = json.load(f)
+            bars = pd.read_pickle(path + '.pkl')
+        except (OSError, ValueError):
+            return pd.DataFrame(), {'tz': None, 'covered': []}
+        meta['covered'] = [[pd.Timestamp(s), pd.Timestamp(e)] for s, e in meta['covered']]
+        return bars, meta
+
+    def _save(self, ticker, interval, bars, meta):
+        path = self._path(ticker, interval)
+        bars.to_pickle(path + '.pkl.tmp')
+        with open(path + '.json.tmp', 'w') as f:
+            json.dump({'tz': meta['tz'],
+                       'covered': [[s.isoformat(), e.isoformat()] for s, e in meta['covered']]}, f)
+        os.replace(path + '.pkl.tmp', path + '.pkl')
+        os.replace(path + '.json.tmp', path + '.json')
+
+    def get(self, ticker, interval='1d', period=None, start=None, end=None):
+        # Same arguments as Ticker.history(): either a yfinance `period` or start/end
+        now = pd.Timestamp.now(tz='UTC')
+        with self._lock(ticker, interval):
+            bars, meta = self.load(ticker, interval)
+            if period is not None:
+                start_utc, end_utc = _period_start(period, now), now
+            else:
+                start_utc = _to_utc(start, meta['tz']) if start is not None else EARLIEST
+                end_utc = min(_to_utc(end, meta['tz']), now) if end is not None else now
+
+            covered = meta['covered']
+            # A recent enough fetch counts as covering "now"
+            if covered and now - covered[-1][1] <= STALE_AFTER.get(interval, pd.Timedelta(hours=1)):
+                covered = covered[:-1] + [[covered[-1][0], now]]
+
+            missing = _missing_ranges(covered, start_utc, end_utc)
+            if missing:
+                frames = [bars]
+                covered_end = meta['covered'][-1][1] if meta['covered'] else None
+                for gap_start, gap_end in missing:
+                    fetch_start = gap_start
+                    # The newest stored bar may still have been forming; fetch it again
+                    if len(bars) and gap_start >= covered_end:
+                        fetch_start = min(gap_start, _to_utc(bars.index[-1], meta['tz']))
+                    with perf.span('fetch.yahoo.history', ticker=ticker.upper(), interval=interval):
+                        frames.append(self.fetch(ticker, fetch_start, gap_end, interval))
+                    meta['covered'].append([gap_start, gap_end])
+                frames = [frame for frame in frames if len(frame)]
+                if frames:
+                    bars = pd.concat(frames)
+                    bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+                    meta['tz'] = str(bars.index.tz) if bars.index.tz is not None else meta['tz']
+                meta['covered'] = _merge_ranges(meta['covered'])
+                self._save(ticker, interval, bars, meta)
+
+        if not len(bars):
+            return bars
+        index = bars.index if bars.index.tz is not None else bars.index.tz_localize('UTC')
+        result = bars[(index >= start_utc) & (index < end_utc)]
+        if period is not None and period[:-1].isdigit() and period.endswith('d'):
+            # "5d" means the last five trading sessions, not the last five calendar days
+            days = result.index.normalize().unique()[-int(period[:-1]):]
+            result = result[result.index.normalize().isin(days)]
+        return result
+
+
+_cache = None
+
+
+def get_history(ticker, interval='1d', period=None, start=None, end=None):
+    # Identical requests from concurrent sessions share one cache read/download, and
+    # the answer stays in memory for as long as the cached tail counts as fresh
+    global _cache
+    if _cache is None:
+        _cache = BarCache()
+    cache = _cache
+    key = ('history', ticker.upper(), interval, period, start, end)
+    ttl = STALE_AFTER.get(interval, pd.Timedelta(minutes=5)).total_seconds()
+    with perf.span('fetch.history', ticker=key[1], interval=interval):
+        return get_broker().get(key, lambda: cache.get(ticker, interval=interval, period=period, start=start, end=end),
+                                ttl=ttl)
@@ -0,0 +1,111 @@
+# Benchmark for fetch_engine.py against a local stand-in for the Yahoo quote endpoint.
+#
+# A threaded HTTP server on localhost answers /info/<ticker> with a small JSON
+# payload after an injected delay (plus an occasional slow or failing ticker),
+# then the same 500 tickers are fetched sequentially and concurrently.
+#
+#   python bench_fetch_engine.py --tickers 500 --latency 0.2 --workers 32 --rate 100
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fetch_engine import fetch_concurrent
+
+
+def make_handler(latency, jitter, error_rate, slow_rate, slow_latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            ticker = self.path.rsplit("/", 1)[-1]
+            delay = latency + random.uniform(-jitter, jitter)
+            if random.random() < slow_rate:
+                delay = slow_latency
+            time.sleep(max(0.0, delay))
+            if random.random() < error_rate:
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = json.dumps({
+                "symbol": ticker,
+                "trailingPE": random.uniform(5, 60),
+                "previousClose": random.uniform(10, 500),
+                "fiftyTwoWeekHigh": random.uniform(400, 600),
+                "fiftyTwoWeekLow": random.uniform(5, 100),
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--slow-rate", type=float, default=0.01, help="share of very slow tickers")
+    parser.add_argument("--slow-latency", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=100.0, help="requests per second, 0 = unlimited")
+    parser.add_argument("--timeout", type=float, default=3.0)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    handler = make_handler(args.latency, args.jitter, args.error_rate, args.slow_rate, args.slow_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/info/"
+
+    def fetch(ticker):
+        with urllib.request.urlopen(base_url + ticker, timeout=args.timeout) as response:
+            return json.load(response)
+
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+
+    if not args.skip_sequential:
+        start = time.perf_counter()
+        ok = 0
+        for ticker in tickers:
+            try:
+                fetch(ticker)
+                ok += 1
+            except Exception:
+                pass
+        sequential = time.perf_counter() - start
+        print(f"sequential: {sequential:7.2f}s  ok={ok}/{len(tickers)}")
+
+    start = time.perf_counter()
+    first = None
+    ok = failed = 0
+    for ticker, result, error in fetch_concurrent(tickers, fetch=fetch, max_workers=args.workers,
+                                                  rate=args.rate or None, timeout=args.timeout,
+                                                  retries=2, backoff=0.1):
+        if first is None:
+            first = time.perf_counter() - start
+        if error is None:
+            ok += 1
+        else:
+            failed += 1
+    concurrent = time.perf_counter() - start
+    print(f"concurrent: {concurrent:7.2f}s  ok={ok}/{len(tickers)} failed={failed}  "
+          f"first result after {first * 1000:.0f}ms")
+    if not args.skip_sequential:
+        print(f"speedup:    {sequential / concurrent:7.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Accuracy and latency of the forecasting backends in forecasters.py.
+#
+# Each backend forecasts the last --horizon sessions from several origins
+# (--origins, spaced --horizon sessions apart) for every ticker, and is scored
+# against what actually followed: MAPE, directional hit rate against the origin
+# close and how often the actual fell inside the band. Prophet is slow, so it
+# runs on the first --prophet-tickers tickers only; latency is reported per
+# ticker so the numbers stay comparable.
+#
+#   python bench_forecasters.py --tickers 500 --horizon 7
+#   python bench_forecasters.py --source store --tickers 200   # Stock_data/ via stock_store.py
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecasters import BACKENDS, get_forecaster
+
+
+def synthetic_closes(tickers, sessions, seed=0):
+    # Geometric random walks with a per-ticker drift that changes regime once
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0004, 0.0008, (2, tickers))
+    vol = rng.uniform(0.01, 0.03, tickers)
+    switch = rng.integers(sessions // 4, 3 * sessions // 4, tickers)
+    regime = (np.arange(sessions)[:, None] >= switch).astype(int)
+    returns = np.take_along_axis(drift, regime, axis=0) + rng.normal(0, 1, (sessions, tickers)) * vol
+    index = pd.bdate_range(end='2024-01-01', periods=sessions)
+    return pd.DataFrame(50 * np.exp(np.cumsum(returns, axis=0)), index=index,
+                        columns=[f"T{i:04d}" for i in range(tickers)])
+
+
+def store_closes(tickers, sessions):
+    import stock_store
+    series = {}
+    for ticker in stock_store.list_tickers()[:tickers]:
+        frame = stock_store.load_series(ticker)
+        series[ticker] = frame.set_index('Date')['Close'].iloc[-sessions:]
+    return pd.DataFrame(series)
+
+
+def score(forecast, closes, origin, horizon):
+    actual = closes.iloc[origin:origin + horizon][forecast['yhat'].columns].to_numpy()
+    last = closes.iloc[origin - 1][forecast['yhat'].columns].to_numpy()
+    yhat = forecast['yhat'].to_numpy()[:len(actual)]
+    lower = forecast['yhat_lower'].to_numpy()[:len(actual)]
+    upper = forecast['yhat_upper'].to_numpy()[:len(actual)]
+    return {
+        'ape': np.abs(yhat - actual) / actual,
+        'hit': np.sign(yhat - last) == np.sign(actual - last),
+        'covered': (actual >= lower) & (actual <= upper),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', choices=('synthetic', 'store'), default='synthetic')
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--sessions', type=int, default=1000, help='history per ticker')
+    parser.add_argument('--horizon', type=int, default=7)
+    parser.add_argument('--origins', type=int, default=5)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS))
+    parser.add_argument('--prophet-tickers', type=int, default=10)
+    parser.add_argument('--prophet-workers', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.source == 'store':
+        closes = store_closes(args.tickers, args.sessions)
+    else:
+        closes = synthetic_closes(args.tickers, args.sessions)
+    origins = [len(closes) - args.horizon * k for k in range(args.origins, 0, -1)]
+    print(f"{closes.shape[1]} tickers x {len(closes)} sessions, {len(origins)} origins, "
+          f"horizon {args.horizon} sessions\n")
+
+    rows = []
+    for name in args.backends:
+        data = closes
+        kwargs = {}
+        if name == 'prophet':
+            data = closes.iloc[:, :args.prophet_tickers]
+            kwargs = {'cache_dir': tempfile.mkdtemp(), 'workers': args.prophet_workers}
+        forecaster = get_forecaster(name, **kwargs)
+        elapsed, scores, forecasts = 0.0, [], 0
+        for origin in origins:
+            start = time.perf_counter()
+            forecast = forecaster.forecast(data.iloc[:origin], periods=args.horizon)
+            elapsed += time.perf_counter() - start
+            forecasts += forecast['yhat'].shape[1]
+            scores.append(score(forecast, data, origin, args.horizon))
+        rows.append({
+            'backend': name,
+            'tickers': data.shape[1],
+            'ms_per_ticker': elapsed / max(forecasts, 1) * 1000,
+            'mape_pct': np.nanmean(np.concatenate([s['ape'].ravel() for s in scores])) * 100,
+            'hit_rate': np.mean(np.concatenate([s['hit'].ravel() for s in scores])),
+            'coverage': np.mean(np.concatenate([s['covered'].ravel() for s in scores])),
+            'nominal': forecaster.interval_width,
+        })
+        print(f"  {name}: {elapsed:.2f}s")
+
+    with pd.option_context('display.float_format', '{:.3f}'.format):
+        print()
+        print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# Chart latency against history length, with and without plotting.py.
+#
+# For each length a synthetic daily close series (plus a spiky rainfall-like
+# series) is drawn three ways: every point through pyplot as the apps used to,
+# decimated to the figure width, and decimated again from the PNG cache. Peak
+# memory is checked by repeating the old path without plt.close().
+#
+#   python bench_plotting.py --lengths 1000 10000 100000 1000000 --repeats 3
+
+import argparse
+import io
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from plotting import _figures, price_and_precipitation, render_png
+
+
+def synthetic(length, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('1962-01-02', periods=length, freq='D')
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, length)))
+    rain = np.where(rng.random(length) < 0.1, rng.exponential(0.5, length), 0.0)
+    return pd.DataFrame({'Close': close, 'PrecipitationSumInches': rain}, index=index)
+
+
+def full_pyplot(chart_data):
+    # The apps' previous path: every point, a pyplot figure that is never closed
+    fig, ax1 = plt.subplots(figsize=(10, 5))
+    ax1.plot(chart_data['Close'], color='blue')
+    ax2 = ax1.twinx()
+    ax2.plot(chart_data['PrecipitationSumInches'], color='pink')
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return fig
+
+
+def timed(function, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lengths', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for length in args.lengths:
+        chart_data = synthetic(length)
+        full = timed(lambda: full_pyplot(chart_data), args.repeats)
+        open_figures = len(plt.get_fignums())
+        plt.close('all')
+
+        def decimated():
+            _figures.invalidate()
+            render_png(price_and_precipitation, chart_data, title='bench')
+        rows.append({
+            'points': length,
+            'full_ms': full,
+            'decimated_ms': timed(decimated, args.repeats),
+            'cached_ms': timed(lambda: render_png(price_and_precipitation, chart_data, title='bench'), args.repeats),
+            'leaked_figures': open_figures,
+        })
+        print(f"  {length} points done")
+
+    with pd.option_context('display.float_format', '{:.1f}'.format):
+        print()
+        print(pd.DataFrame(rows).to_string(index=False))
+    print(f"\nfigure cache: {_figures.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# End-to-end benchmarks of the apps' main paths, run offline against
+# fake_yfinance.py so the numbers measure this code and not Yahoo.
+#
+#   screen_500       fundamentals + 5y closes + factors for 500 tickers, then one screen (yfinance_app_7.py)
+#   compare_8        stream 8 tickers' info and history, align and compute stats (yfinance_app_3.py)
+#   stock_data_load  one multi-decade Stock_data series, CSV parse vs. columnar store (yfinance_app_6.py)
+#   prophet_fit      fit a Prophet model on 4 years of closes, then load it from the cache
+#   render_chart     price/precipitation chart over 20 years of closes, cold and from the figure cache
+#
+# Each benchmark runs "cold" (fresh caches and stores) and, where there is one,
+# "warm" (the second visit). Results go to a JSON file per run, so two versions
+# can be compared:
+#
+#   python bench_suite.py --latency 0.05 --out bench_results/
+#   python bench_suite.py --only compare_8 screen_500 --compare bench_results/<earlier>.json
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import fake_yfinance
+
+OUT_DIR = 'bench_results'
+
+
+def fresh_state(tmp):
+    # Point every process-wide cache and store at an empty directory
+    import bar_cache
+    import data_broker
+    import fundamentals_store
+    import plotting
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    data_broker._broker = None
+    bar_cache._cache = bar_cache.BarCache(os.path.join(tmp, 'history_cache'))
+    fundamentals_store._store = fundamentals_store.FundamentalsStore(os.path.join(tmp, 'fundamentals.sqlite'))
+    plotting._figures.invalidate()
+
+
+def tickers(n):
+    return [f"T{i:03d}" for i in range(n)]
+
+
+def screen_500(tmp):
+    from factors import compute_factors
+    from fundamentals_store import get_infos
+    from history_loader import load_histories
+    from screener_engine import build_metrics, screen
+    from trend import trend_summary
+    universe = tickers(500)
+
+    def run():
+        infos = get_infos(universe, max_workers=16)
+        closes, _ = load_histories(universe, period='5y', interval='1d')
+        technicals = compute_factors(closes).join(trend_summary(closes))
+        metrics = build_metrics(infos, technicals)
+        return screen(metrics, "pe < 30 and ret_12m > 0", sort_by='sharpe_12m', ascending=False, top_n=50)
+    return {'cold': run, 'warm': run}
+
+
+def compare_8(tmp):
+    from comparison import align_calendar, comparison_stats, stream_comparison
+    basket = ['AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'TSLA', 'SPY']
+
+    def run():
+        closes = {}
+        for kind, ticker, result, error in stream_comparison(basket, '1Y'):
+            if kind == 'history' and error is None:
+                closes[ticker] = result
+        return comparison_stats(align_calendar(closes, '1mo'), benchmark='SPY', interval='1mo')
+    return {'cold': run, 'warm': run}
+
+
+def stock_data_load(tmp):
+    import stock_store
+    src, dst = os.path.join(tmp, 'Stocks'), os.path.join(tmp, 'store')
+    os.makedirs(src)
+    bars = fake_yfinance.synthetic_bars('GE', first='1962-01-02')
+    frame = bars.assign(OpenInt=0).set_axis(bars.index.tz_localize(None).rename('Date'))
+    frame.round(4).to_csv(os.path.join(src, 'ge.us.txt'))
+
+    def csv():
+        return stock_store.read_source(os.path.join(src, 'ge.us.txt'))[['Date', 'Close']]
+
+    def store():
+        return stock_store.load_series('ge.us', dst=dst, src=src)
+    stock_store.ingest(src, dst)
+    return {'csv': csv, 'store': store}
+
+
+def prophet_fit(tmp):
+    from prophet_batch import fitted_model, quiet_logging, training_frame
+    quiet_logging()
+    close = fake_yfinance.synthetic_bars('NVDA')['Close'].iloc[-1000:]
+    frame = training_frame(close)
+    cache = os.path.join(tmp, 'prophet_models')
+
+    def run():
+        return fitted_model('NVDA', frame, cache)
+    return {'cold': run, 'warm': run}
+
+
+def render_chart(tmp):
+    from plotting import price_and_precipitation, render_png
+    close = fake_yfinance.synthetic_bars('AAPL')['Close'].iloc[-5000:]
+    rain = np.where(np.random.default_rng(0).random(len(close)) < 0.1, 0.5, 0.0)
+    chart_data = pd.DataFrame({'Close': close.to_numpy(), 'PrecipitationSumInches': rain},
+                              index=close.index.tz_localize(None))
+
+    def run():
+        return render_png(price_and_precipitation, chart_data, title='AAPL')
+    return {'cold': run, 'warm': run}
+
+
+BENCHMARKS = {
+    'screen_500': screen_500,
+    'compare_8': compare_8,
+    'stock_data_load': stock_data_load,
+    'prophet_fit': prophet_fit,
+    'render_chart': render_chart,
+}
+
+
+def run_benchmark(name, repeats, tmp, fake):
+    # Every repeat starts from empty caches; the phases run in order within a repeat
+    timings, calls = {}, {}
+    for _ in range(repeats):
+        fresh_state(tmp)
+        before = dict(fake.calls)
+        for phase, function in BENCHMARKS[name](tmp).items():
+            start = time.perf_counter()
+            function()
+            timings.setdefault(phase, []).append(time.perf_counter() - start)
+        calls = {endpoint: fake.calls[endpoint] - before[endpoint] for endpoint in fake.calls}
+    return {
+        phase: {'min_s': min(values), 'median_s': statistics.median(values), 'runs': len(values)}
+        for phase, values in timings.items()
+    } | {'upstream_calls': calls}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    print(f"\nagainst {previous['commit']} ({previous['timestamp']}):")
+    for name, phases in results.items():
+        for phase, stats in phases.items():
+            old = previous['results'].get(name, {}).get(phase)
+            if phase == 'upstream_calls' or not old:
+                continue
+            ratio = stats['median_s'] / old['median_s'] if old['median_s'] else float('nan')
+            flag = '  <-- slower' if ratio > 1.2 else ''
+            print(f"  {name}/{phase}: {old['median_s'] * 1000:.1f} -> {stats['median_s'] * 1000:.1f} ms "
+                  f"(x{ratio:.2f}){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per fake upstream call')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--fixtures', help='recorded fixtures (see fake_yfinance.py --record)')
+    parser.add_argument('--out', default=OUT_DIR)
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    fake = fake_yfinance.FakeYahoo(args.fixtures, args.latency, args.jitter, args.error_rate)
+    # Build the fake's shared calendar up front so the first benchmark doesn't pay for it
+    fake.daily_bars('SPY')
+    tmp = tempfile.mkdtemp(prefix='bench_suite_')
+    results = {}
+    try:
+        with fake_yfinance.install(fake):
+            for name in args.only:
+                results[name] = run_benchmark(name, args.repeats, os.path.join(tmp, name), fake)
+                phases = ", ".join(f"{phase} {stats['median_s'] * 1000:.1f} ms"
+                                   for phase, stats in results[name].items() if phase != 'upstream_calls')
+                print(f"  {name}: {phases}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'versions': {'pandas': pd.__version__, 'numpy': np.__version__},
+        'settings': {key: value for key, value in vars(args).items() if key not in ('out', 'compare')},
+        'results': results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{report['timestamp'].replace(':', '')}_{report['commit'] or 'nogit'}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"\nwritten to {path}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+
+from bar_cache import get_history
+from fetch_engine import fetch_concurrent
+from fundamentals_store import get_info
+from history_loader import PERIOD_INTERVALS
+
+# Side-by-side analytics for any number of tickers, including ones listed on
+# different exchanges.
+#
+# Daily and longer bars are keyed by each exchange's own trading date (a
+# Tokyo close and a New York close on the same date share a row); intraday bars
+# are converted to one timezone first. Sessions where only some markets traded
+# are forward-filled for at most `fill_limit` rows, so a holiday on one exchange
+# doesn't break the others' lines. Correlations, covariances and betas use
+# pairwise-complete returns, computed for all pairs in a few matrix products.
+
+# Bars per year, for annualising
+PERIODS_PER_YEAR = {'1h': 252 * 7, '1d': 252, '5d': 52, '1wk': 52, '1mo': 12, '3mo': 4}
+INTRADAY = ('1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h')
+
+
+def _calendar_index(index, interval, tz):
+    index = pd.DatetimeIndex(index)
+    if interval in INTRADAY:
+        return index.tz_convert(tz) if index.tz is not None else index.tz_localize(tz)
+    # Each bar's own local trading date, tz-naive
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+
+def align_calendar(prices, interval='1d', how='union', fill_limit=5, tz='UTC'):
+    """Put several price series on one calendar.
+
+    `prices` is a wide frame or a {ticker: Series} dict (each series may carry
+    its own timezone). how='union' keeps every row where any market traded,
+    'intersection' only rows where all of them did. Gaps after a ticker's first
+    bar are forward-filled for up to `fill_limit` rows (None = no limit, 0 = no
+    filling); rows before a ticker's first bar stay NaN.
+    """
+    if isinstance(prices, pd.DataFrame):
+        prices = {column: prices[column] for column in prices.columns}
+    series = {}
+    for ticker, values in prices.items():
+        values = values.dropna()
+        values.index = _calendar_index(values.index, interval, tz)
+        # Two bars landing on the same calendar slot: keep the later one
+        series[ticker] = values[~values.index.duplicated(keep='last')]
+    if not series:
+        return pd.DataFrame()
+    aligned = pd.concat(series, axis=1, join='inner' if how == 'intersection' else 'outer').sort_index()
+    if fill_limit != 0:
+        aligned = aligned.ffill(limit=fill_limit)
+    return aligned
+
+
+def normalized_performance(aligned, base=100.0):
+    # Every series rebased to `base` at its own first price
+    return aligned / aligned.bfill().iloc[0] * base if len(aligned) else aligned
+
+
+def returns_matrix(aligned):
+    # Simple returns per row; NaN where either end is missing (no filling here)
+    values = aligned.to_numpy(dtype='float64')
+    returns = np.full(values.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[1:] = values[1:] / values[:-1] - 1
+    return returns
+
+
+def pairwise_moments(returns):
+    """Covariance and correlation of every pair of columns over the rows both have.
+
+    Returns (observations, covariance, correlation, variance_given_pair) as
+    (N, N) arrays; variance_given_pair[i, j] is column i's variance over the
+    rows shared with column j.
+    """
+    present = ~np.isnan(returns)
+    x = np.where(present, returns, 0.0)
+    mask = present.astype('float64')
+    n = mask.T @ mask
+    sums = x.T @ mask
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = (x.T @ x - sums * sums.T / n) / (n - 1)
+        var = ((x ** 2).T @ mask - sums ** 2 / n) / (n - 1)
+        corr = cov / np.sqrt(var * var.T)
+    few = n < 3
+    cov[few] = corr[few] = var[few] = np.nan
+    return n, cov, np.clip(corr, -1, 1), var
+
+
+def comparison_stats(aligned, benchmark=None, interval='1d'):
+    """Correlation and (annualised) covariance matrices plus a per-ticker summary.
+
+    The summary has total and annualised return, annualised volatility, max
+    drawdown and, when `benchmark` is one of the columns, beta and correlation
+    against it.
+    """
+    tickers = aligned.columns
+    periods = PERIODS_PER_YEAR.get(interval, 252)
+    returns = returns_matrix(aligned)
+    n, cov, corr, var = pairwise_moments(returns)
+
+    values = aligned.to_numpy(dtype='float64')
+    first = aligned.bfill().iloc[0].to_numpy() if len(aligned) else np.full(len(tickers), np.nan)
+    last = aligned.ffill().iloc[-1].to_numpy() if len(aligned) else np.full(len(tickers), np.nan)
+    bars = (~np.isnan(values)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total = last / first - 1
+        years = np.maximum(bars - 1, 1) / periods
+        peaks = np.fmax.accumulate(values, axis=0)
+        drawdown = np.nanmin(np.where(np.isnan(values), np.inf, values / peaks - 1), axis=0) if len(values) else total
+    summary = pd.DataFrame({
+        'total_return': total,
+        'annual_return': (1 + total) ** (1 / years) - 1,
+        'annual_volatility': np.sqrt(np.diag(var) * periods),
+        'max_drawdown': drawdown,
+        'observations': np.diag(n).astype(int),
+    }, index=tickers)
+    if benchmark is not None and benchmark in tickers:
+        b = tickers.get_loc(benchmark)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            summary['beta'] = cov[:, b] / var[b, :]
+        summary['correlation'] = corr[:, b]
+
+    return {
+        'correlation': pd.DataFrame(corr, index=tickers, columns=tickers),
+        'covariance': pd.DataFrame(cov * periods, index=tickers, columns=tickers),
+        'summary': summary,
+    }
+
+
+# Rows of the combined comparison table: (label, .info field, format)
+INFO_ROWS = [
+    ("Name", "longName", "text"),
+    ("Country", "country", "text"),
+    ("Sector", "sector", "text"),
+    ("Industry", "industry", "text"),
+    ("Market Cap", "marketCap", "money_short"),
+    ("Enterprise Value", "enterpriseValue", "money_short"),
+    ("Employees", "fullTimeEmployees", "text"),
+    ("Current Price", "currentPrice", "money"),
+    ("Previous Close", "previousClose", "money"),
+    ("Day High", "dayHigh", "money"),
+    ("Day Low", "dayLow", "money"),
+    ("52 Week High", "fiftyTwoWeekHigh", "money"),
+    ("52 Week Low", "fiftyTwoWeekLow", "money"),
+    ("EPS (FWD)", "forwardEps", "money"),
+    ("P/E (FWD)", "forwardPE", "money"),
+    ("PEG Ratio", "pegRatio", "money"),
+    ("Div Rate (FWD)", "dividendRate", "money"),
+    ("Div Yield (FWD)", "dividendYield", "percent"),
+    ("Recommendation", "recommendationKey", "title"),
+]
+
+
+INFO_FIELDS = [field for _, field, _ in INFO_ROWS]
+
+
+def format_info(value, kind):
+    if value is None:
+        return "N/A"
+    if kind == "money_short" and isinstance(value, (int, float)):
+        suffixes = ["", "K", "M", "B", "T"]
+        suffix_index = 0
+        while value >= 1000 and suffix_index < len(suffixes) - 1:
+            value /= 1000
+            suffix_index += 1
+        return f"${value:.1f}{suffixes[suffix_index]}"
+    if kind == "money":
+        return f"${value:.2f}" if isinstance(value, (int, float)) else "N/A"
+    if kind == "percent":
+        return f"{value * 100:.2f}%" if isinstance(value, (int, float)) else "N/A"
+    if kind == "title":
+        return str(value).capitalize()
+    return str(value)
+
+
+def info_table(infos, tickers, pending="Loading..."):
+    # One column per ticker; tickers whose info hasn't arrived yet show `pending`
+    columns = {}
+    for ticker in tickers:
+        info = infos.get(ticker)
+        columns[ticker] = [pending if info is None else format_info(info.get(field), kind)
+                           for _, field, kind in INFO_ROWS]
+    return pd.DataFrame(columns, index=pd.Index([label for label, _, _ in INFO_ROWS], name="Metric"))
+
+
+def _fetch_part(key, period, interval):
+    kind, ticker = key
+    if kind == "info":
+        return get_info(ticker, INFO_FIELDS)
+    bars = get_history(ticker, interval=interval, period=period)
+    if not len(bars):
+        raise ValueError("No data returned (unknown ticker or nothing traded in this period)")
+    return bars["Close"]
+
+
+def stream_comparison(tickers, period_key, max_workers=16, timeout=60.0, history_only=()):
+    """Fetch every ticker's info and close history concurrently.
+
+    Yields ('info' | 'history', ticker, result, error) as each one completes, so
+    a page can draw whatever has arrived instead of waiting for the slowest
+    ticker. Info comes through the fundamentals store and history through the
+    bar cache, so repeat visits are served locally. Tickers in `history_only`
+    (a benchmark, say) get their history but no info request.
+    """
+    period, interval = PERIOD_INTERVALS[period_key]
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    extra = [t.strip().upper() for t in history_only if t and t.strip() and t.strip().upper() not in tickers]
+    keys = ([("history", ticker) for ticker in tickers + list(dict.fromkeys(extra))]
+            + [("info", ticker) for ticker in tickers])
+    for (kind, ticker), result, error in fetch_concurrent(
+            keys, fetch=lambda key: _fetch_part(key, period, interval), max_workers=max_workers,
+            timeout=timeout, retries=0):
+        yield kind, ticker, result, error
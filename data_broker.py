@@ -0,0 +1,167 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# Process-wide front for upstream data requests.
+#
+# Every Streamlit session runs in the same process, so when several people open
+# a page for the same popular tickers the broker makes sure there is only one
+# request per (ticker, endpoint, params) key in flight: the first caller fetches,
+# everyone who asks for the same key meanwhile waits for and shares that result.
+# Recent results are kept in an LRU bounded by their (estimated) size in bytes.
+
+MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 60.0
+# How long a caller waits on someone else's fetch of the same key before giving up
+WAIT_TIMEOUT = 60.0
+
+# With copy-on-write (always on from pandas 3) a shallow copy is enough to keep one
+# caller's edits out of everyone else's copy; without it the data must be copied
+_COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3 or pd.options.mode.copy_on_write is True
+
+
+def sizeof(value):
+    # Rough in-memory size; DataFrames count their buffers, containers their items
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _detach(value):
+    # Each caller gets its own container, so mutating a result can't change the cached one
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=not _COPY_ON_WRITE)
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DataBroker:
+    """Single-flight fetches with a byte-bounded LRU of recent results.
+
+    get(key, fetch, ttl) returns a cached result younger than `ttl` seconds, joins
+    a fetch of the same key that is already running, or runs `fetch()` itself.
+    Errors are passed to every waiter but never cached. A waiter gives up with
+    TimeoutError after `wait_timeout` seconds. Every caller gets its own copy of
+    a DataFrame/Series/dict/list result (shallow: cells are shared, but edits
+    don't reach the cache).
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, wait_timeout=WAIT_TIMEOUT):
+        self.max_bytes = max_bytes
+        self.wait_timeout = wait_timeout
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, size, result)
+        self.inflight = {}
+        self.bytes = 0
+        self.counters = dict.fromkeys(('hits', 'misses', 'coalesced', 'errors', 'evictions', 'wait_timeouts'), 0)
+
+    def get(self, key, fetch, ttl=DEFAULT_TTL):
+        leader = False
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return _detach(entry[2])
+                self._drop(key)
+            flight = self.inflight.get(key)
+            if flight is not None:
+                self.counters['coalesced'] += 1
+            else:
+                flight = self.inflight[key] = _Flight()
+                self.counters['misses'] += 1
+                leader = True
+        if not leader:
+            # Bounded, so a hung upstream call doesn't pin every session asking for the key
+            if not flight.done.wait(self.wait_timeout):
+                with self.lock:
+                    self.counters['wait_timeouts'] += 1
+                raise TimeoutError(f"{key!r}: no result after waiting {self.wait_timeout:g}s")
+            if flight.error is not None:
+                raise flight.error
+            return _detach(flight.result)
+
+        try:
+            flight.result = fetch()
+        except BaseException as error:
+            flight.error = error
+            with self.lock:
+                self.counters['errors'] += 1
+                del self.inflight[key]
+            flight.done.set()
+            raise
+        with self.lock:
+            self._store(key, flight.result, ttl)
+            del self.inflight[key]
+        flight.done.set()
+        return _detach(flight.result)
+
+    def _store(self, key, result, ttl):
+        size = sizeof(result)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (time.monotonic() + ttl, size, result)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+            self.counters['evictions'] += 1
+
+    def _drop(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def invalidate(self, key=None):
+        # Forget one cached key, or everything
+        with self.lock:
+            for k in ([key] if key is not None else list(self.entries)):
+                if k in self.entries:
+                    self._drop(k)
+
+    def stats(self):
+        with self.lock:
+            requests = self.counters['hits'] + self.counters['misses'] + self.counters['coalesced']
+            return {
+                **self.counters,
+                'hit_rate': (self.counters['hits'] + self.counters['coalesced']) / requests if requests else 0.0,
+                'in_flight': len(self.inflight),
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+_broker = None
+_broker_guard = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_guard:
+        if _broker is None:
+            _broker = DataBroker()
+        return _broker
+
+
+def broker_stats():
+    return get_broker().stats()
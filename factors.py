@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# Technical factors for a whole universe from one price matrix (dates x tickers).
+#
+# Every factor is a NumPy reduction over the matrix as of its last row, so the
+# cost doesn't grow with a per-ticker Python loop. Gaps are forward-filled;
+# factors that need more history than a ticker has are NaN. Returns, volatility,
+# drawdowns and distances are in percent, like the screener's other columns.
+
+TRADING_DAYS = 252
+
+# Look-backs in sessions
+PERIODS = {'1w': 5, '1m': 21, '3m': 63, '6m': 126, '12m': 252}
+
+FACTORS = {
+    'ret_1w': '1-week return (%)',
+    'ret_1m': '1-month return (%)',
+    'ret_3m': '3-month return (%)',
+    'ret_6m': '6-month return (%)',
+    'ret_12m': '12-month return (%)',
+    'cagr_5y': 'Annualised return over the whole download (%)',
+    'momentum_12_1': '12-month return excluding the last month (%)',
+    'momentum_6_1': '6-month return excluding the last month (%)',
+    'vol_1m': '1-month annualised volatility (%)',
+    'vol_3m': '3-month annualised volatility (%)',
+    'vol_12m': '12-month annualised volatility (%)',
+    'downside_vol_12m': '12-month annualised downside volatility (%)',
+    'sharpe_12m': '12-month return / volatility, no risk-free rate',
+    'max_drawdown_12m': 'Worst peak-to-trough fall over 12 months (%)',
+    'max_drawdown_5y': 'Worst peak-to-trough fall over the whole download (%)',
+    'drawdown': 'Current distance below the running high (%)',
+    'ma50_dist': 'Distance above the 50-day moving average (%)',
+    'ma200_dist': 'Distance above the 200-day moving average (%)',
+    'ma50_200': '50-day over 200-day moving average (%)',
+    'high_52w_dist': 'Distance below the 52-week high (%)',
+    'low_52w_dist': 'Distance above the 52-week low (%)',
+}
+
+
+def _back(values, sessions):
+    # Row `sessions` sessions before the last one (NaN if the history is shorter)
+    if sessions >= len(values):
+        return np.full(values.shape[1], np.nan)
+    return values[-1 - sessions]
+
+
+def _max_drawdown(values):
+    peaks = np.fmax.accumulate(values, axis=0)
+    with np.errstate(invalid='ignore'):
+        drawdowns = values / peaks - 1
+    return np.nanmin(np.where(np.isnan(drawdowns), np.inf, drawdowns), axis=0)
+
+
+def compute_factors(closes):
+    """One row per ticker with every factor in FACTORS, as of the last date."""
+    closes = closes.sort_index().ffill()
+    values = closes.to_numpy(dtype='float64')
+    columns = closes.columns
+    if len(values) < 2:
+        return pd.DataFrame(index=columns, columns=list(FACTORS), dtype='float64')
+
+    last = values[-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_returns = np.diff(np.log(values), axis=0)
+        out = {}
+        for label, sessions in PERIODS.items():
+            out[f'ret_{label}'] = (last / _back(values, sessions) - 1) * 100
+
+        # Annualised over each ticker's own history in the matrix
+        present = ~np.isnan(values)
+        first_row = np.argmax(present, axis=0)
+        first = values[first_row, np.arange(values.shape[1])]
+        years = (len(values) - 1 - first_row) / TRADING_DAYS
+        out['cagr_5y'] = np.where(years >= 1, ((last / first) ** (1 / np.where(years > 0, years, 1)) - 1) * 100, np.nan)
+
+        month_ago = _back(values, PERIODS['1m'])
+        out['momentum_12_1'] = (month_ago / _back(values, PERIODS['12m']) - 1) * 100
+        out['momentum_6_1'] = (month_ago / _back(values, PERIODS['6m']) - 1) * 100
+
+        annualise = np.sqrt(TRADING_DAYS) * 100
+        for label in ('1m', '3m', '12m'):
+            window = log_returns[-PERIODS[label]:]
+            vol = window.std(axis=0, ddof=1) * annualise
+            out[f'vol_{label}'] = vol if len(window) == PERIODS[label] else np.full(len(columns), np.nan)
+        year = log_returns[-PERIODS['12m']:]
+        downside = np.sqrt((np.minimum(year, 0) ** 2).sum(axis=0) / max(len(year) - 1, 1)) * annualise
+        out['downside_vol_12m'] = np.where(np.isnan(out['vol_12m']), np.nan, downside)
+        out['sharpe_12m'] = out['ret_12m'] / out['vol_12m']
+
+        out['max_drawdown_12m'] = _max_drawdown(values[-PERIODS['12m'] - 1:]) * 100
+        out['max_drawdown_5y'] = _max_drawdown(values) * 100
+        out['drawdown'] = (last / np.nanmax(values, axis=0) - 1) * 100
+
+        ma50 = values[-50:].mean(axis=0) if len(values) >= 50 else np.full(len(columns), np.nan)
+        ma200 = values[-200:].mean(axis=0) if len(values) >= 200 else np.full(len(columns), np.nan)
+        out['ma50_dist'] = (last / ma50 - 1) * 100
+        out['ma200_dist'] = (last / ma200 - 1) * 100
+        out['ma50_200'] = (ma50 / ma200 - 1) * 100
+
+        year_prices = values[-PERIODS['12m']:]
+        out['high_52w_dist'] = (1 - last / np.nanmax(year_prices, axis=0)) * 100
+        out['low_52w_dist'] = (last / np.nanmin(year_prices, axis=0) - 1) * 100
+
+    factors = pd.DataFrame(out, index=columns)[list(FACTORS)]
+    return factors.replace([np.inf, -np.inf], np.nan)
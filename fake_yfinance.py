@@ -0,0 +1,293 @@
+# Offline stand-in for the parts of yfinance the apps use: Ticker(...).info,
+# Ticker(...).history(...) and download(...).
+#
+# Tickers with a recorded fixture are served from it; any other ticker gets a
+# deterministic synthetic history (a random walk seeded by the symbol) and a
+# synthetic .info record, so a benchmark can ask for 500 tickers without
+# recording 500. Every call can be delayed (--latency +- jitter) and can fail
+# (--error-rate), to mimic the upstream without its noise.
+#
+#   python fake_yfinance.py --record AAPL NVDA MSFT --out fixtures/   # needs network
+#
+# Fixture layout: <dir>/info.json ({ticker: info}) and <dir>/history/<TICKER>.csv
+# (daily Date/Open/High/Low/Close/Volume).
+
+import argparse
+import functools
+import json
+import os
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+import yfinance
+
+TZ = 'America/New_York'
+FIRST_DATE = '1990-01-02'
+SECTORS = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Industrials',
+           'Consumer Cyclical', 'Consumer Defensive', 'Utilities', 'Real Estate', 'Basic Materials']
+PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1), '3mo': pd.DateOffset(months=3), '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1), '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+RESAMPLE = {'1wk': 'W-MON', '5d': 'W-MON', '1mo': 'MS', '3mo': 'QS'}
+
+
+class FakeError(Exception):
+    pass
+
+
+def _seed(ticker):
+    return zlib.crc32(ticker.upper().encode())
+
+
+class FakeYahoo:
+    """Serves .info, .history() and download() from fixtures or synthetic data.
+
+    `latency` (+- `jitter`) seconds are slept per call and `error_rate` of calls
+    raise FakeError (in download() the failed tickers come back as all-NaN
+    columns, as yfinance does). `calls` counts requests per endpoint.
+    """
+
+    def __init__(self, fixtures=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {'info': 0, 'history': 0, 'download': 0}
+        self.daily = {}
+        self.infos = {}
+        if fixtures and os.path.exists(os.path.join(fixtures, 'info.json')):
+            with open(os.path.join(fixtures, 'info.json')) as f:
+                self.infos = json.load(f)
+
+    def _request(self, endpoint, ticker=''):
+        with self.lock:
+            self.calls[endpoint] += 1
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+            fail = self.random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise FakeError(f"{ticker}: simulated upstream error")
+
+    def daily_bars(self, ticker):
+        # Full daily OHLCV history of a ticker, tz-aware like yfinance's
+        ticker = ticker.upper()
+        with self.lock:
+            bars = self.daily.get(ticker)
+        if bars is not None:
+            return bars
+        path = os.path.join(self.fixtures, 'history', f"{ticker}.csv") if self.fixtures else None
+        if path and os.path.exists(path):
+            bars = pd.read_csv(path, index_col='Date', parse_dates=['Date'])
+            if bars.index.tz is None:
+                bars.index = bars.index.tz_localize(TZ)
+        else:
+            bars = synthetic_bars(ticker)
+        with self.lock:
+            self.daily[ticker] = bars
+        return bars
+
+    def info(self, ticker):
+        self._request('info', ticker)
+        ticker = ticker.upper()
+        if ticker in self.infos:
+            return dict(self.infos[ticker])
+        return synthetic_info(ticker, self.daily_bars(ticker))
+
+    def history(self, ticker, period=None, interval='1d', start=None, end=None, raise_errors=False, **kwargs):
+        self._request('history', ticker)
+        return self._slice(ticker, period, interval, start, end)
+
+    def _slice(self, ticker, period, interval, start, end):
+        bars = self.daily_bars(ticker)
+        now = pd.Timestamp.now(tz=TZ)
+        if start is None and period is not None and period[:-1].isdigit() and period.endswith('d'):
+            # "5d" is the last five sessions, not five calendar days
+            sessions = bars.index[bars.index < now]
+            start = sessions[-int(period[:-1]):][0].normalize() if len(sessions) else now
+        elif start is None and period not in (None, 'max'):
+            start = now.normalize().replace(month=1, day=1) if period == 'ytd' else now - PERIOD_OFFSETS[period]
+        elif start is None and period is None:
+            start = now - PERIOD_OFFSETS['1mo']
+        start = _aware(start) if start is not None else bars.index[0]
+        end = _aware(end) if end is not None else now
+        if interval in ('1h', '60m'):
+            return _hourly(bars[(bars.index >= start.normalize()) & (bars.index < end)], start, end)
+        bars = bars[(bars.index >= start) & (bars.index < end)]
+        if interval in RESAMPLE and len(bars):
+            bars = bars.resample(RESAMPLE[interval], label='left', closed='left').agg(
+                {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}).dropna()
+        return bars
+
+    def download(self, tickers, period=None, interval='1d', start=None, end=None, group_by='column',
+                 auto_adjust=True, threads=True, progress=False, **kwargs):
+        if isinstance(tickers, str):
+            tickers = tickers.replace(',', ' ').split()
+        self._request('download')
+        frames = {}
+        for ticker in tickers:
+            try:
+                with self.lock:
+                    fail = self.random.random() < self.error_rate
+                if fail:
+                    raise FakeError(ticker)
+                bars = self._slice(ticker, period, interval, start, end)
+            except FakeError:
+                bars = pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'], dtype='float64')
+            if interval not in ('1h', '60m') and len(bars):
+                # download() labels daily and longer bars with naive dates
+                bars = bars.set_axis(bars.index.tz_localize(None))
+            frames[ticker] = bars
+        data = pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+        if group_by == 'column':
+            data = data.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+        return data
+
+
+def _aware(value):
+    value = pd.Timestamp(value)
+    return value.tz_localize(TZ) if value.tzinfo is None else value.tz_convert(TZ)
+
+
+def _hourly(daily, start, end):
+    # Seven hourly bars per session, interpolated between the daily opens and closes
+    if not len(daily):
+        return daily
+    hours = pd.to_timedelta(np.arange(7) + 9.5, unit='h')
+    days = daily.index.normalize().tz_localize(None).to_numpy()
+    index = pd.DatetimeIndex((days[:, None] + hours.to_numpy()).ravel()).tz_localize(TZ)
+    weights = np.linspace(0, 1, 7)
+    close = (daily['Open'].to_numpy()[:, None] * (1 - weights) + daily['Close'].to_numpy()[:, None] * weights).ravel()
+    bars = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                         'Volume': np.repeat(daily['Volume'].to_numpy() // 7, 7)}, index=index)
+    return bars[(bars.index >= start) & (bars.index < end)]
+
+
+@functools.lru_cache(maxsize=8)
+def _calendar(first, last):
+    # Building a tz-aware business-day range is slow, so it is shared by every ticker
+    return pd.bdate_range(first, last, tz=TZ)
+
+
+def synthetic_bars(ticker, first=FIRST_DATE):
+    # Geometric random walk over business days with a per-ticker drift and volatility
+    rng = np.random.default_rng(_seed(ticker))
+    index = _calendar(first, pd.Timestamp.now(tz=TZ).tz_localize(None).normalize())
+    vol = rng.uniform(0.01, 0.03)
+    close = rng.uniform(10, 300) * np.exp(np.cumsum(rng.normal(0.0003, vol, len(index))))
+    open_ = close * np.exp(rng.normal(0, vol / 3, len(index)))
+    spread = np.abs(rng.normal(0, vol / 2, len(index)))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + spread),
+        'Low': np.minimum(open_, close) * (1 - spread),
+        'Close': close,
+        'Volume': rng.integers(100_000, 10_000_000, len(index)),
+    }, index=index.rename('Date'))
+
+
+def synthetic_info(ticker, bars):
+    rng = np.random.default_rng(_seed(ticker) + 1)
+    year = bars['Close'].iloc[-252:]
+    price = float(bars['Close'].iloc[-1])
+    eps = price / rng.uniform(8, 60)
+    shares = rng.uniform(5e7, 5e9)
+    return {
+        'symbol': ticker,
+        'longName': f"{ticker.title()} Corporation",
+        'country': 'United States',
+        'sector': SECTORS[_seed(ticker) % len(SECTORS)],
+        'industry': 'Synthetic',
+        'recommendationKey': ['strong_buy', 'buy', 'hold', 'sell'][_seed(ticker) % 4],
+        'marketCap': int(price * shares),
+        'enterpriseValue': int(price * shares * rng.uniform(0.9, 1.3)),
+        'fullTimeEmployees': int(rng.integers(100, 200_000)),
+        'currentPrice': price,
+        'previousClose': float(bars['Close'].iloc[-2]),
+        'dayHigh': float(bars['High'].iloc[-1]),
+        'dayLow': float(bars['Low'].iloc[-1]),
+        'fiftyTwoWeekHigh': float(year.max()),
+        'fiftyTwoWeekLow': float(year.min()),
+        'trailingPE': price / eps,
+        'forwardPE': price / (eps * rng.uniform(0.9, 1.3)),
+        'forwardEps': eps,
+        'pegRatio': float(rng.uniform(0.5, 3)),
+        'dividendRate': float(price * rng.uniform(0, 0.04)),
+        'dividendYield': float(rng.uniform(0, 0.04)),
+    }
+
+
+class _Ticker:
+    def __init__(self, fake, ticker):
+        self.fake = fake
+        self.ticker = ticker
+
+    @property
+    def info(self):
+        return self.fake.info(self.ticker)
+
+    def history(self, *args, **kwargs):
+        return self.fake.history(self.ticker, *args, **kwargs)
+
+
+class install:
+    """Point yfinance.Ticker and yfinance.download at `fake` until uninstall().
+
+    Every module here calls yf.Ticker / yf.download through the module, so this
+    covers all of them. Also usable as a context manager.
+    """
+
+    def __init__(self, fake):
+        self.fake = fake
+        self.saved = (yfinance.Ticker, yfinance.download)
+        yfinance.Ticker = lambda ticker, *args, **kwargs: _Ticker(fake, ticker)
+        yfinance.download = fake.download
+
+    def uninstall(self):
+        yfinance.Ticker, yfinance.download = self.saved
+
+    def __enter__(self):
+        return self.fake
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+
+def record(tickers, out, period='5y'):
+    # Save real .info and daily history from Yahoo as fixtures
+    os.makedirs(os.path.join(out, 'history'), exist_ok=True)
+    info_path = os.path.join(out, 'info.json')
+    infos = {}
+    if os.path.exists(info_path):
+        with open(info_path) as f:
+            infos = json.load(f)
+    for ticker in tickers:
+        ticker = ticker.upper()
+        handle = yfinance.Ticker(ticker)
+        infos[ticker] = handle.info
+        bars = handle.history(period=period, interval='1d', auto_adjust=True)
+        bars[['Open', 'High', 'Low', 'Close', 'Volume']].to_csv(os.path.join(out, 'history', f"{ticker}.csv"))
+        print(f"  {ticker}: {len(bars)} bars")
+    with open(info_path, 'w') as f:
+        json.dump(infos, f, default=str)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--record', nargs='+', required=True, metavar='TICKER')
+    parser.add_argument('--out', default='fixtures')
+    parser.add_argument('--period', default='5y')
+    args = parser.parse_args()
+    record(args.record, args.out, args.period)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+
+import yfinance as yf
+
+import perf
+
+
+class TokenBucket:
+    # Thread-safe token bucket: `rate` tokens are added per second, up to `capacity`.
+    # Every request to Yahoo takes one token, so bursts are allowed but the
+    # sustained request rate never goes above `rate`.
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+def fetch_info(ticker):
+    return yf.Ticker(ticker).info
+
+
+def _fetch_with_retry(fetch, ticker, bucket, retries, backoff, started):
+    started[ticker] = time.monotonic()
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            return fetch(ticker)
+        except Exception:
+            if attempt == retries:
+                raise
+            # Exponential backoff with jitter so retries from many threads don't line up
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def _spawn(fn, *args):
+    # One daemon thread per request: a thread stuck on a hung request is left behind
+    # without holding a slot of a fixed-size pool (or blocking interpreter exit)
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def run():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as error:
+            future.set_exception(error)
+    threading.Thread(target=run, name='fetch_concurrent', daemon=True).start()
+    return future
+
+
+def fetch_concurrent(tickers, fetch=fetch_info, max_workers=16, rate=None, timeout=30.0,
+                     retries=2, backoff=0.5):
+    """Fetch `fetch(ticker)` for every ticker, at most `max_workers` at a time.
+
+    Yields (ticker, result, error) tuples as soon as each ticker finishes, so callers
+    can render partial results. `rate` caps requests per second (None = unlimited),
+    `timeout` is the per-ticker wall-clock budget including retries. A ticker that
+    times out is reported with a TimeoutError; its thread is abandoned and no longer
+    counts towards `max_workers`, so a few hung requests don't stall the rest.
+    """
+    bucket = TokenBucket(rate) if rate else None
+    # Spans from the worker threads belong to the caller's trace, if it has one
+    fetch = perf.bind(fetch)
+    started = {}
+    queue = deque(dict.fromkeys(tickers))
+    pending = {}
+    while queue or pending:
+        while queue and len(pending) < max_workers:
+            ticker = queue.popleft()
+            pending[_spawn(_fetch_with_retry, fetch, ticker, bucket, retries, backoff, started)] = ticker
+
+        # Wake up at least once a second to check for tickers that ran out of time
+        done, _ = wait(pending, timeout=min(1.0, timeout), return_when=FIRST_COMPLETED)
+        for future in done:
+            ticker = pending.pop(future)
+            error = future.exception()
+            yield ticker, (None if error else future.result()), error
+
+        now = time.monotonic()
+        for future, ticker in list(pending.items()):
+            start = started.get(ticker)
+            # A request that finished since wait() returned is reported on the next pass
+            if start is not None and now - start > timeout and not future.done():
+                del pending[future]
+                yield ticker, None, TimeoutError(f"{ticker}: no response after {timeout:.0f}s")
+
+
+def fetch_all(tickers, fetch=fetch_info, **kwargs):
+    # Blocking convenience wrapper: returns ({ticker: result}, {ticker: error})
+    results, errors = {}, {}
+    for ticker, result, error in fetch_concurrent(tickers, fetch=fetch, **kwargs):
+        if error is None:
+            results[ticker] = result
+        else:
+            errors[ticker] = error
+    return results, errors
@@ -0,0 +1,183 @@
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from prophet_batch import CACHE_DIR, fitted_model, quiet_logging, training_frame
+from trend import fit_polynomial
+
+# Forecasting backends with one interface. Every backend takes a wide frame of
+# closes (dates x tickers) and forecasts all of its columns in one call; the
+# NumPy backends do that as array operations across the tickers, Prophet fits
+# one (cached) model per ticker.
+#
+# forecast() returns a frame indexed by the next `periods` business days with
+# ('yhat' | 'yhat_lower' | 'yhat_upper', ticker) columns, the same layout as
+# yf.download(group_by='column'), so result['yhat'] is a dates x tickers frame.
+
+
+def _naive(index):
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize(None) if index.tz is not None else index
+
+
+def future_dates(index, periods):
+    # The next `periods` business days after the last date
+    return pd.bdate_range(_naive(index)[-1] + pd.offsets.BDay(1), periods=periods)
+
+
+def _result(dates, tickers, yhat, lower, upper):
+    parts = {name: pd.DataFrame(values, index=dates, columns=tickers)
+             for name, values in (('yhat', yhat), ('yhat_lower', lower), ('yhat_upper', upper))}
+    return pd.concat(parts, axis=1)
+
+
+class Forecaster:
+    """Base class: fits on the last `lookback` sessions of every ticker.
+
+    Tickers without a full `lookback` window (after forward-filling gaps) are
+    left out of the result. Bands cover `interval_width` of the forecast
+    distribution under a normal approximation.
+    """
+    name = None
+
+    def __init__(self, lookback=252, interval_width=0.8):
+        self.lookback = lookback
+        self.interval_width = interval_width
+        self.z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+
+    def window(self, closes):
+        closes = closes.sort_index().ffill()
+        if self.lookback:
+            closes = closes.iloc[-self.lookback:]
+        return closes.dropna(axis=1)
+
+    def forecast(self, closes, periods=7):
+        closes = self.window(closes)
+        dates = future_dates(closes.index, periods) if len(closes) else pd.DatetimeIndex([])
+        if len(closes) < 3 or closes.shape[1] == 0:
+            empty = np.empty((len(dates), 0))
+            return _result(dates, [], empty, empty, empty)
+        yhat, lower, upper = self.predict(closes, dates)
+        return _result(dates, closes.columns, yhat, lower, upper)
+
+    def predict(self, closes, dates):
+        # -> (yhat, lower, upper), each (len(dates), tickers)
+        raise NotImplementedError
+
+
+class DriftForecaster(Forecaster):
+    # Random walk with drift on log prices: the average daily log return carried forward
+    name = 'drift'
+
+    def predict(self, closes, dates):
+        logs = np.log(closes.to_numpy(dtype='float64'))
+        n = len(logs)
+        slope = (logs[-1] - logs[0]) / (n - 1)
+        h = np.arange(1, len(dates) + 1)[:, None]
+        center = logs[-1] + h * slope
+        sigma = (np.diff(logs, axis=0) - slope).std(axis=0, ddof=1)
+        spread = self.z * sigma * np.sqrt(h * (1 + h / (n - 1)))
+        return np.exp(center), np.exp(center - spread), np.exp(center + spread)
+
+
+class HoltForecaster(Forecaster):
+    """Holt's linear-trend exponential smoothing on log prices.
+
+    Smoothing constants are picked per ticker from a small grid by one-step
+    squared error; the whole grid for all tickers is smoothed together, so the
+    only Python loop is over time.
+    """
+    name = 'holt'
+    ALPHAS = np.linspace(0.1, 0.9, 9)
+    BETAS = np.array([0.0, 0.01, 0.05, 0.1, 0.2])
+
+    def predict(self, closes, dates):
+        logs = np.log(closes.to_numpy(dtype='float64'))
+        alpha, beta = (grid.ravel()[:, None] for grid in np.meshgrid(self.ALPHAS, self.BETAS))
+        level = np.repeat(logs[:1], len(alpha), axis=0)
+        trend = np.repeat(logs[1:2] - logs[:1], len(alpha), axis=0)
+        sse = np.zeros_like(level)
+        for y in logs[1:]:
+            error = y - (level + trend)
+            sse += error ** 2
+            level = level + trend + alpha * error
+            trend = trend + alpha * beta * error
+        best = np.argmin(sse, axis=0)
+        columns = np.arange(logs.shape[1])
+        level, trend, sse = level[best, columns], trend[best, columns], sse[best, columns]
+        a, b = alpha[best, 0], beta[best, 0]
+
+        h = np.arange(1, len(dates) + 1)[:, None]
+        center = level + h * trend
+        # Variance of the h-step error: sigma^2 * (1 + sum_{j<h} (alpha * (1 + j * beta))^2)
+        steps = (a * (1 + np.arange(len(dates))[:, None] * b)) ** 2
+        steps[0] = 0
+        sigma = np.sqrt(sse / (len(logs) - 1))
+        spread = self.z * sigma * np.sqrt(1 + np.cumsum(steps, axis=0))
+        return np.exp(center), np.exp(center - spread), np.exp(center + spread)
+
+
+class PolyTrendForecaster(Forecaster):
+    # Polynomial trend line (see trend.py) for all tickers in one solve, extended forward
+    name = 'poly'
+
+    def __init__(self, lookback=252, interval_width=0.8, degree=3):
+        super().__init__(lookback, interval_width)
+        self.degree = degree
+
+    def predict(self, closes, dates):
+        fit = fit_polynomial(closes, min(self.degree, len(closes) - 2))
+        yhat = fit.predict(dates).to_numpy()
+        spread = self.z * fit.residual_std.to_numpy()
+        return yhat, yhat - spread, yhat + spread
+
+
+def _prophet_forecast(ticker, frame, dates, cache_dir, params):
+    quiet_logging()
+    model, _ = fitted_model(ticker, frame, cache_dir, params)
+    forecast = model.predict(pd.DataFrame({'ds': dates}))
+    return forecast[['yhat', 'yhat_lower', 'yhat_upper']].to_numpy().T
+
+
+class ProphetForecaster(Forecaster):
+    """Prophet, one model per ticker on its full history (lookback=None).
+
+    Fitted models are reused from the prophet_batch cache. With workers > 1 the
+    tickers are fitted in a process pool.
+    """
+    name = 'prophet'
+
+    def __init__(self, lookback=None, interval_width=0.8, workers=1, cache_dir=CACHE_DIR, params=None):
+        super().__init__(lookback, interval_width)
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.params = {**(params or {}), 'interval_width': interval_width}
+
+    def window(self, closes):
+        # Prophet copes with gaps and short histories, so keep every ticker with data
+        closes = closes.sort_index()
+        if self.lookback:
+            closes = closes.iloc[-self.lookback:]
+        return closes.dropna(axis=1, how='all')
+
+    def predict(self, closes, dates):
+        frames = [(ticker, training_frame(closes[ticker])) for ticker in closes.columns]
+        args = [(ticker, frame, dates, self.cache_dir, self.params) for ticker, frame in frames]
+        if self.workers == 1 or len(args) == 1:
+            bands = [_prophet_forecast(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=quiet_logging) as pool:
+                bands = list(pool.map(_prophet_forecast, *zip(*args)))
+        yhat, lower, upper = np.stack(bands, axis=2)
+        return yhat, lower, upper
+
+
+BACKENDS = {cls.name: cls for cls in (DriftForecaster, HoltForecaster, PolyTrendForecaster, ProphetForecaster)}
+
+
+def get_forecaster(name, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown forecaster {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
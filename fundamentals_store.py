@@ -0,0 +1,202 @@
+import sqlite3
+import threading
+import time
+from datetime import date
+
+import perf
+from data_broker import get_broker
+from fetch_engine import fetch_concurrent, fetch_info
+
+# The .info fields the apps actually read, with the SQLite type they are stored as.
+# Everything else in the (large) .info dict is dropped.
+FIELDS = {
+    'longName': 'TEXT',
+    'country': 'TEXT',
+    'sector': 'TEXT',
+    'industry': 'TEXT',
+    'recommendationKey': 'TEXT',
+    'marketCap': 'INTEGER',
+    'enterpriseValue': 'INTEGER',
+    'fullTimeEmployees': 'INTEGER',
+    'currentPrice': 'REAL',
+    'previousClose': 'REAL',
+    'dayHigh': 'REAL',
+    'dayLow': 'REAL',
+    'fiftyTwoWeekHigh': 'REAL',
+    'fiftyTwoWeekLow': 'REAL',
+    'trailingPE': 'REAL',
+    'forwardPE': 'REAL',
+    'forwardEps': 'REAL',
+    'pegRatio': 'REAL',
+    'dividendRate': 'REAL',
+    'dividendYield': 'REAL',
+}
+
+# How long each field stays fresh, in seconds. Prices move during the day,
+# company descriptors and fundamentals barely change.
+HOUR = 60 * 60
+DAY = 24 * HOUR
+TTL = {field: DAY for field in FIELDS}
+TTL.update({field: 30 * DAY for field in ('longName', 'country', 'sector', 'industry', 'fullTimeEmployees')})
+TTL.update({field: 15 * 60 for field in ('currentPrice', 'dayHigh', 'dayLow', 'marketCap', 'enterpriseValue')})
+TTL.update({field: 6 * HOUR for field in ('previousClose', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow',
+                                          'trailingPE', 'forwardPE', 'pegRatio')})
+
+DEFAULT_PATH = 'fundamentals.sqlite'
+_COLUMNS = ", ".join(f'"{field}" {kind}' for field, kind in FIELDS.items())
+_NAMES = ", ".join(f'"{field}"' for field in FIELDS)
+
+
+def _coerce(field, value):
+    if value is None:
+        return None
+    try:
+        if FIELDS[field] == 'INTEGER':
+            return int(value)
+        if FIELDS[field] == 'REAL':
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def _record(row):
+    # Missing fields are left out so callers' info.get('x', 'N/A') keeps working
+    return {field: value for field, value in zip(FIELDS, row) if value is not None}
+
+
+class FundamentalsStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS fundamentals "
+                         f"(ticker TEXT PRIMARY KEY, fetched_at REAL NOT NULL, {_COLUMNS})")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS snapshots "
+                         f"(snapshot_date TEXT NOT NULL, ticker TEXT NOT NULL, fetched_at REAL NOT NULL, "
+                         f"{_COLUMNS}, PRIMARY KEY (snapshot_date, ticker))")
+
+    def _connect(self):
+        # One connection per thread; Streamlit reruns and fetch workers live on different threads
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def upsert_many(self, infos, fetched_at=None):
+        # infos: {ticker: info dict as returned by yf.Ticker(...).info}
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        rows = [(ticker, fetched_at, *(_coerce(field, info.get(field)) for field in FIELDS))
+                for ticker, info in infos.items()]
+        placeholders = ", ".join("?" * (len(FIELDS) + 2))
+        with self._connect() as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO fundamentals (ticker, fetched_at, {_NAMES}) "
+                             f"VALUES ({placeholders})", rows)
+
+    def get_many(self, tickers, fields=None, now=None):
+        # Returns ({ticker: record}, [stale or missing tickers]). A record counts as fresh
+        # only if every requested field is still within its TTL. .info comes back whole,
+        # so all of a record's fields share one fetched_at; `fields` is what makes a
+        # name-only lookup last 30 days while a price lookup lasts 15 minutes.
+        now = time.time() if now is None else now
+        fields = list(FIELDS) if fields is None else fields
+        max_age = min(TTL[field] for field in fields)
+        tickers = list(dict.fromkeys(tickers))
+        found = {}
+        conn = self._connect()
+        # SQLite limits the number of bound parameters, so look tickers up in chunks
+        for i in range(0, len(tickers), 500):
+            chunk = tickers[i:i + 500]
+            cursor = conn.execute(f"SELECT ticker, fetched_at, {_NAMES} FROM fundamentals "
+                                  f"WHERE ticker IN ({', '.join('?' * len(chunk))})", chunk)
+            for ticker, fetched_at, *row in cursor:
+                if now - fetched_at <= max_age:
+                    found[ticker] = _record(row)
+        return found, [ticker for ticker in tickers if ticker not in found]
+
+    def snapshot(self, snapshot_date=None):
+        # Freeze the current contents under a date so a screen can be replayed later
+        snapshot_date = (snapshot_date or date.today()).isoformat()
+        with self._connect() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO snapshots (snapshot_date, ticker, fetched_at, {_NAMES}) "
+                         f"SELECT ?, ticker, fetched_at, {_NAMES} FROM fundamentals", (snapshot_date,))
+        return snapshot_date
+
+    def get_snapshot(self, snapshot_date, tickers=None):
+        query = f"SELECT ticker, {_NAMES} FROM snapshots WHERE snapshot_date = ?"
+        params = [snapshot_date.isoformat() if isinstance(snapshot_date, date) else snapshot_date]
+        if tickers is not None:
+            tickers = list(tickers)
+            query += f" AND ticker IN ({', '.join('?' * len(tickers))})"
+            params += tickers
+        return {ticker: _record(row) for ticker, *row in self._connect().execute(query, params)}
+
+    def snapshot_dates(self):
+        cursor = self._connect().execute("SELECT DISTINCT snapshot_date FROM snapshots ORDER BY snapshot_date")
+        return [row[0] for row in cursor]
+
+
+_store = None
+_store_guard = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_guard:
+        if _store is None:
+            _store = FundamentalsStore()
+        return _store
+
+
+def shared_info(ticker):
+    # One .info request per ticker at a time across every session in the process
+    with perf.span('fetch.info', ticker=ticker.upper()):
+        return get_broker().get(('info', ticker.upper()), lambda: _fetch_info(ticker), ttl=15 * 60)
+
+
+def _fetch_info(ticker):
+    with perf.span('fetch.yahoo.info', ticker=ticker.upper()):
+        return fetch_info(ticker)
+
+
+def iter_infos(tickers, fields=None, **fetch_kwargs):
+    # Read-through: yields (ticker, record, error), fresh records from disk first, then
+    # stale or missing tickers as their fetches complete. Fetched records are written
+    # back in batches so a long screen doesn't hit SQLite once per ticker.
+    store = get_store()
+    with perf.span('fetch.store.read', tickers=len(tickers)):
+        found, missing = store.get_many(tickers, fields)
+    for ticker, record in found.items():
+        yield ticker, record, None
+    batch = {}
+    try:
+        for ticker, info, error in fetch_concurrent(missing, fetch=shared_info, **fetch_kwargs):
+            if error is None:
+                batch[ticker] = info
+                if len(batch) >= 50:
+                    store.upsert_many(batch)
+                    batch = {}
+                info = _record(_coerce(field, info.get(field)) for field in FIELDS)
+            yield ticker, info, error
+    finally:
+        if batch:
+            store.upsert_many(batch)
+
+
+def get_infos(tickers, fields=None, **fetch_kwargs):
+    # Tickers that fail to fetch are left out; use iter_infos() to see why
+    return {ticker: record for ticker, record, error in iter_infos(tickers, fields, **fetch_kwargs)
+            if error is None}
+
+
+def get_info(ticker, fields=None):
+    # Pass the fields the caller reads, so only their TTLs decide whether to refetch.
+    # A failed fetch raises, as yf.Ticker(ticker).info does.
+    for _, record, error in iter_infos([ticker], fields):
+        if error is not None:
+            raise error
+        return record
+    return {}
@@ -0,0 +1,49 @@
+import pandas as pd
+import yfinance as yf
+
+# Timeframe choices shown in the apps -> (yfinance period, bar interval)
+PERIOD_INTERVALS = {
+    "1D": ("1d", "1h"),
+    "5D": ("5d", "1d"),
+    "1M": ("1mo", "1d"),
+    "6M": ("6mo", "1wk"),
+    "YTD": ("ytd", "1mo"),
+    "1Y": ("1y", "1mo"),
+    "5Y": ("5y", "3mo"),
+}
+
+
+def load_histories(tickers, period=None, interval="1d", start=None, end=None, field="Close"):
+    """Download `field` for all tickers in one batched yf.download call.
+
+    Returns (frame, failures): a wide frame indexed by timestamp with one column per
+    ticker that returned data, and {ticker: reason} for the ones that didn't, so a
+    bad ticker doesn't abort the whole comparison.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    if not tickers:
+        return pd.DataFrame(), {}
+    if period is None and start is None:
+        period = "1mo"
+
+    data = yf.download(tickers, period=period, interval=interval, start=start, end=end,
+                       group_by="column", auto_adjust=True, threads=True, progress=False)
+
+    if data is None or data.empty:
+        frame = pd.DataFrame()
+    elif isinstance(data.columns, pd.MultiIndex):
+        frame = data[field]
+    else:
+        frame = data[[field]].rename(columns={field: tickers[0]})
+
+    failures = {}
+    for ticker in tickers:
+        if ticker not in frame.columns or frame[ticker].isna().all():
+            failures[ticker] = "No data returned (unknown ticker or nothing traded in this period)"
+    frame = frame[[ticker for ticker in tickers if ticker not in failures]]
+    return frame.dropna(how="all"), failures
+
+
+def load_period(tickers, period_key, field="Close"):
+    period, interval = PERIOD_INTERVALS[period_key]
+    return load_histories(tickers, period=period, interval=interval, field=field)
@@ -0,0 +1,261 @@
+# Multi-user load test for the Streamlit apps, offline.
+#
+# Every simulated user is a Streamlit AppTest session on its own thread, all in
+# this one process, the way a Streamlit server runs its sessions: they share the
+# process-wide caches (st.cache_*, the data broker, the bar cache and the
+# fundamentals store) and the GIL. Upstream calls go to fake_yfinance.py with
+# the configured latency. For each concurrency level N, N users open the page
+# and then submit --reruns requests each with random tickers and settings.
+#
+# AppTest itself keeps some process-wide state (the runtime instance, patched
+# config, widget ids), so concurrent AppTest sessions can trip over each other.
+# Those failures are counted as harness_errors, apart from the app's own errors.
+# --processes runs every user in its own process instead: no harness races, but
+# the users then share only the on-disk caches, not the in-memory ones.
+#
+# Reported per app and level: p50/p95/p99 rerun latency, reruns per second,
+# app errors, harness errors and peak RSS (with --processes, the sum of the users'
+# peaks). The saturation point is the first level whose throughput is less than
+# 10% above the previous level's.
+#
+#   python load_test.py --apps 1 3 --levels 1 2 4 8 16 --reruns 5 --latency 0.1
+#   python load_test.py --apps 7 --levels 1 4 --reruns 3
+#   python load_test.py --apps 1 --levels 2 4 8 --processes
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import fake_yfinance
+from bench_suite import OUT_DIR, fresh_state, git_commit
+
+APPS = {'1': 'yfinance_app_1.py', '3': 'yfinance_app_3.py', '7': 'yfinance_app_7.py'}
+TICKERS = ['AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'TSLA', 'JPM', 'XOM', 'CVX',
+           'KO', 'PEP', 'WMT', 'COST', 'DIS', 'NFLX', 'INTC', 'AMD', 'IBM', 'ORCL']
+PERIODS = ['1D', '5D', '1M', '6M', 'YTD', '1Y', '5Y']
+
+
+def _widget(elements, label):
+    for element in elements:
+        if element.label.startswith(label):
+            return element
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+# One interaction per app: set the inputs like a user would and return the element to click (or None)
+def submit_app_1(at, rng):
+    _widget(at.sidebar.text_input, "Enter a stock ticker").set_value(rng.choice(TICKERS))
+    _widget(at.sidebar.selectbox, "Enter a time frame").set_value(rng.choice(PERIODS))
+    return at.sidebar.button[0]
+
+
+def submit_app_3(at, rng):
+    _widget(at.sidebar.text_area, "Or paste").set_value(" ".join(rng.sample(TICKERS, rng.randint(2, 8))))
+    _widget(at.sidebar.selectbox, "Enter a time frame").set_value(rng.choice(PERIODS[1:]))
+    return _widget(at.sidebar.button, "Submit")
+
+
+def submit_app_7(at, rng):
+    # The universe is loaded when the page opens; a submit is a change of thresholds
+    at.number_input[0].set_value(float(rng.randint(10, 40)))
+    at.number_input[1].set_value(float(rng.randint(-10, 20)))
+    return None
+
+
+SUBMIT = {'1': submit_app_1, '3': submit_app_3, '7': submit_app_7}
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, every=0.05):
+        super().__init__(daemon=True)
+        self.every = every
+        self.peak = rss_bytes()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.every):
+            self.peak = max(self.peak, rss_bytes())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return max(self.peak, rss_bytes())
+
+
+def _harness_race(exception):
+    # A widget id missing from the session's widget state: another AppTest session in
+    # this process replaced state that this one was using, not an error in the app
+    return '$$ID-' in exception.message
+
+
+def user_session(app, path, reruns, seed, timeout, samples, errors, harness_errors):
+    from streamlit.testing.v1 import AppTest
+    rng = random.Random(seed)
+    at = AppTest.from_file(path, default_timeout=timeout)
+    for step in range(reruns + 1):
+        try:
+            if step:
+                button = SUBMIT[app](at, rng)
+                if button is not None:
+                    button.click()
+            start = time.perf_counter()
+            at.run()
+        except Exception as e:
+            # Raised by AppTest itself (the app's exceptions end up in at.exception)
+            harness_errors.append(f"{type(e).__name__}: {e}")
+            continue
+        samples.append(('open' if step == 0 else 'submit', time.perf_counter() - start))
+        for exception in at.exception[:1]:
+            (harness_errors if _harness_race(exception) else errors).append(exception.message)
+
+
+def _user_process(app, path, reruns, seed, timeout):
+    samples, errors, harness_errors = [], [], []
+    user_session(app, path, reruns, seed, timeout, samples, errors, harness_errors)
+    return samples, errors, harness_errors, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_level(app, path, users, reruns, timeout, seed, processes=False):
+    samples, errors, harness_errors = [], [], []
+    start = time.perf_counter()
+    if processes:
+        # Forked, so the children inherit the installed fake upstream
+        with ProcessPoolExecutor(max_workers=users, mp_context=multiprocessing.get_context('fork')) as pool:
+            futures = [pool.submit(_user_process, app, path, reruns, seed + i, timeout) for i in range(users)]
+            peak = 0
+            for future in futures:
+                user_samples, user_errors, user_harness_errors, user_peak = future.result()
+                samples += user_samples
+                errors += user_errors
+                harness_errors += user_harness_errors
+                peak += user_peak
+        wall = time.perf_counter() - start
+    else:
+        threads = [threading.Thread(target=user_session,
+                                    args=(app, path, reruns, seed + i, timeout, samples, errors, harness_errors))
+                   for i in range(users)]
+        sampler = RssSampler()
+        sampler.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        peak = sampler.stop()
+
+    submits = np.array([seconds for kind, seconds in samples if kind == 'submit'])
+    opens = np.array([seconds for kind, seconds in samples if kind == 'open'])
+    p50, p95, p99 = np.percentile(submits, [50, 95, 99]) * 1000 if len(submits) else (np.nan,) * 3
+    return {
+        'users': users,
+        'reruns': len(samples),
+        'errors': len(errors),
+        'harness_errors': len(harness_errors),
+        'open_p50_ms': float(np.median(opens) * 1000) if len(opens) else None,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'throughput_per_s': len(samples) / wall,
+        'wall_s': wall,
+        'peak_rss_mb': peak / 2 ** 20,
+        'first_errors': errors[:3],
+        'first_harness_errors': harness_errors[:3],
+    }
+
+
+def saturation(levels):
+    # First level whose throughput is less than 10% above the previous level's
+    for previous, current in zip(levels, levels[1:]):
+        if current['throughput_per_s'] < previous['throughput_per_s'] * 1.1:
+            return current['users']
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', nargs='+', choices=list(APPS), default=list(APPS))
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--reruns', type=int, default=5, help='submits per user after opening the page')
+    parser.add_argument('--latency', type=float, default=0.1, help='seconds per fake upstream call')
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--fixtures', help='recorded fixtures (see fake_yfinance.py --record)')
+    parser.add_argument('--warm', action='store_true', help="keep caches between levels instead of starting cold")
+    parser.add_argument('--processes', action='store_true',
+                        help="run every user in its own process (no AppTest races, no shared in-memory caches)")
+    parser.add_argument('--timeout', type=float, default=300.0, help='per rerun, seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=OUT_DIR)
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = os.path.abspath(args.out)
+    fake = fake_yfinance.FakeYahoo(args.fixtures, args.latency, args.jitter, args.error_rate, args.seed)
+    fake.daily_bars('SPY')
+    results = {}
+    tmp = tempfile.mkdtemp(prefix='load_test_')
+    # The apps read and write their caches relative to the working directory
+    os.chdir(tmp)
+    try:
+        with fake_yfinance.install(fake):
+            for app in args.apps:
+                levels = []
+                for users in args.levels:
+                    if not args.warm or not levels:
+                        fresh_state(os.path.join(tmp, 'state'))
+                    levels.append(run_level(app, os.path.join(here, APPS[app]), users, args.reruns, args.timeout,
+                                            args.seed * 1000 + users, args.processes))
+                    level = levels[-1]
+                    print(f"  {APPS[app]} x{users}: p95 {level['p95_ms']:.0f} ms, "
+                          f"{level['throughput_per_s']:.1f} reruns/s, {level['errors']} errors, "
+                          f"{level['harness_errors']} harness errors")
+                results[APPS[app]] = {'levels': levels, 'saturation_users': saturation(levels)}
+    finally:
+        os.chdir(here)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for app, result in results.items():
+        table = pd.DataFrame(result['levels']).drop(columns=['first_errors', 'first_harness_errors'])
+        with pd.option_context('display.float_format', '{:.1f}'.format, 'display.width', 200):
+            print(f"\n{app} (throughput stops scaling at: {result['saturation_users'] or 'not reached'} users)")
+            print(table.to_string(index=False))
+        for level in result['levels']:
+            for error in level['first_errors']:
+                print(f"  x{level['users']} error: {error}")
+            for error in level['first_harness_errors']:
+                print(f"  x{level['users']} harness error: {error}")
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'settings': vars(args),
+        'results': results,
+    }
+    os.makedirs(out, exist_ok=True)
+    path = os.path.join(out, f"load_{report['timestamp'].replace(':', '')}_{report['commit'] or 'nogit'}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"\nwritten to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,15 @@
+# Interactive walkthrough for one ticker. For many tickers, scheduled runs or
+# files instead of windows, see prophet_report.py.
+
 import yfinance as yf
-from prophet import Prophet
 import seaborn as sns
 import matplotlib.pyplot as plt
-import numpy as np
 import pandas as pd
 import matplotlib.dates as mdates
 
-model = Prophet()
+from forecasters import get_forecaster
+from trend import fit_polynomial
+
 ticker = "NVDA"
 data = yf.download(ticker, start='2020-01-01', end='2024-01-01')
 trendLinePrecision = 3 # Enter the required degree of approximation of the trend line
@@ -20,16 +23,13 @@ plt.legend()
 plt.grid(True)
 plt.show()
 
-data['DateNum'] = data['Date'].map(lambda x: x.toordinal())
-
-x = data['DateNum'].values
+# Dates are rescaled inside fit_polynomial, which keeps the cubic well conditioned
 y = data['Close'].values.ravel()
-coeffs = np.polyfit(x, y, trendLinePrecision) 
-trend_line = np.poly1d(coeffs)
+trend_line = fit_polynomial(pd.DataFrame({ticker: y}, index=pd.DatetimeIndex(data['Date'])), trendLinePrecision)
 
 plt.figure(figsize=(12, 6))
 plt.plot(data['Date'], data['Close'], label='Close Price', color='#c9acfa')
-plt.plot(data['Date'], trend_line(x), label='Trend Line', color='gray', linestyle='--')
+plt.plot(data['Date'], trend_line.fitted[ticker].to_numpy(), label='Trend Line', color='gray', linestyle='--')
 plt.title(f'{ticker} Stock Close Price with Trend Line (2020-2024)', fontsize=16)
 plt.xlabel('Date', fontsize=12)
 plt.ylabel('Close Price (USD)', fontsize=12)
@@ -48,14 +48,15 @@ data.rename(columns={'Date': 'ds', 'Close': 'y'}, inplace=True)
 df = data[['ds', 'y']]
 df['ds']=df['ds'].dt.tz_localize(None)
 
-# Step 2: Train the Prophet model
-model = Prophet()
-model.fit(df)
+# Step 2: Pick the forecasting backend: "prophet" (fitted models are reused from
+# prophet_models/ while the data is unchanged) or the much faster "drift", "holt"
+# or "poly" (see forecasters.py)
+backend = "prophet"
+forecaster = get_forecaster(backend)
 
-# Step 3: Make predictions
-# Create a future dataframe for the next day
-future = model.make_future_dataframe(periods=7)
-forecast = model.predict(future)
+# Step 3: Make predictions for the next 7 trading days
+result = forecaster.forecast(df.set_index('ds')[['y']].rename(columns={'y': ticker}), periods=7)
+forecast = pd.DataFrame({'ds': result.index, 'yhat': result['yhat'][ticker].to_numpy()})
 
 # Step 4: Compare today's close price with the prediction for the next day
 today_close = df['y'].iloc[-1]
@@ -0,0 +1,376 @@
+# Timing spans around the fetch, transform and render stages of a page.
+#
+# A page starts a trace at the top of every rerun and finishes it at the end;
+# anything in between (the page itself, bar_cache, the fundamentals store,
+# plotting, ...) can wrap a stage in `with perf.span("fetch.history"):`. When no
+# trace is active on the thread, span() hands back a shared no-op, so the
+# instrumented code costs one thread-local lookup per stage. Work handed to a
+# thread pool joins the caller's trace through bind().
+#
+# Finished traces are folded into per-span histograms (prometheus_text(), also
+# served over HTTP on 127.0.0.1 from import time when PERF_METRICS_PORT is set;
+# PERF_METRICS_HOST changes the address) and, when PERF_LOG names a file,
+# appended to it one JSON line per span. Summarise a log with:
+#
+#   python perf.py perf_log.jsonl
+
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+# Trace every rerun, not only the ones with the timing panel open
+ENABLED = os.environ.get('PERF_TRACE', '') not in ('', '0')
+LOG_PATH = os.environ.get('PERF_LOG') or None
+METRICS_PORT = int(os.environ.get('PERF_METRICS_PORT') or 0)
+METRICS_HOST = os.environ.get('PERF_METRICS_HOST') or '127.0.0.1'
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGES = ('fetch', 'transform', 'render')
+
+
+class _Local(threading.local):
+    # Class defaults, so a thread that never started a trace reads None without a failed lookup
+    trace = None
+    parent = None
+
+
+_local = _Local()
+_ids = itertools.count(1)
+
+
+class Trace:
+    """Spans recorded during one rerun of one page.
+
+    Each span is a dict with id, parent, name, thread, start_ms and end_ms
+    relative to the start of the trace, plus any attributes passed to span().
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.id = next(_ids)
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.spans = []
+        self.lock = threading.Lock()
+        self.root = {'id': next(_ids), 'parent': None, 'name': 'rerun', 'thread': threading.current_thread().name,
+                     'start_ms': 0.0, 'end_ms': None}
+        self.spans.append(self.root)
+
+    def add(self, record):
+        with self.lock:
+            self.spans.append(record)
+
+    @property
+    def duration_ms(self):
+        end = self.root['end_ms']
+        return end if end is not None else (time.perf_counter() - self.started) * 1000
+
+
+class _Span:
+    __slots__ = ('trace', 'record', 'outer')
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.record = {'id': next(_ids), 'parent': None, 'name': name, 'thread': None,
+                       'start_ms': None, 'end_ms': None, **attrs}
+
+    def __enter__(self):
+        self.outer = _local.parent
+        self.record['parent'] = self.outer if self.outer is not None else self.trace.root['id']
+        self.record['thread'] = threading.current_thread().name
+        _local.parent = self.record['id']
+        self.record['start_ms'] = (time.perf_counter() - self.trace.started) * 1000
+        return self.record
+
+    def __exit__(self, kind, error, traceback):
+        self.record['end_ms'] = (time.perf_counter() - self.trace.started) * 1000
+        if kind is not None:
+            self.record['error'] = kind.__name__
+        _local.parent = self.outer
+        self.trace.add(self.record)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, kind, error, traceback):
+        return False
+
+
+_NOOP = _NoSpan()
+
+
+def span(name, **attrs):
+    # Time the body as `name` ('fetch.*', 'transform.*' or 'render.*') in the current trace
+    trace = _local.trace
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name, attrs)
+
+
+def current():
+    return _local.trace
+
+
+def bind(fn):
+    # Run `fn` in the caller's trace, under the caller's open span, from any thread
+    trace = _local.trace
+    if trace is None:
+        return fn
+    parent = _local.parent
+
+    def bound(*args, **kwargs):
+        saved = _local.trace, _local.parent
+        _local.trace, _local.parent = trace, parent
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.trace, _local.parent = saved
+    return bound
+
+
+def start(page, enabled=False):
+    """Begin a trace for this rerun of `page` on the current thread.
+
+    Returns None (and every span() until finish() is a no-op) unless `enabled`
+    or PERF_TRACE is set. A trace left open by an interrupted rerun is dropped.
+    """
+    _local.parent = None
+    if not (enabled or ENABLED):
+        _local.trace = None
+        return None
+    _local.trace = Trace(page)
+    return _local.trace
+
+
+def finish(trace):
+    # Close the trace, record it in the metrics and the log, and detach it from the thread
+    if _local.trace is trace:
+        _local.trace, _local.parent = None, None
+    if trace is None or trace.root['end_ms'] is not None:
+        return trace
+    trace.root['end_ms'] = (time.perf_counter() - trace.started) * 1000
+    _metrics.observe(trace)
+    if LOG_PATH:
+        write_log(trace, LOG_PATH)
+    return trace
+
+
+def stage(name):
+    prefix = name.split('.', 1)[0]
+    return prefix if prefix in STAGES else 'other'
+
+
+def waterfall(trace):
+    """One row per span in start order, indented under its parent."""
+    with trace.lock:
+        spans = [dict(record) for record in trace.spans if record['end_ms'] is not None]
+    depth = {None: -1}
+    for record in sorted(spans, key=lambda r: r['start_ms']):
+        depth[record['id']] = depth.get(record['parent'], 0) + 1
+    rows, seen = [], set()
+    for record in sorted(spans, key=lambda r: (r['start_ms'], -r['end_ms'])):
+        attrs = {k: v for k, v in record.items()
+                 if k not in ('id', 'parent', 'name', 'thread', 'start_ms', 'end_ms')}
+        label = "  " * depth[record['id']] + record['name']
+        if attrs:
+            label += f" ({', '.join(str(v) for v in attrs.values())})"
+        # Same-named spans (one per ticker, say) each get their own bar
+        n = 1
+        while label in seen:
+            n += 1
+            label = f"{label.rsplit(' #', 1)[0]} #{n}"
+        seen.add(label)
+        rows.append({
+            'span': label,
+            'stage': stage(record['name']),
+            'start_ms': record['start_ms'],
+            'end_ms': record['end_ms'],
+            'duration_ms': record['end_ms'] - record['start_ms'],
+            'thread': record['thread'],
+            'details': ", ".join(f"{k}={v}" for k, v in attrs.items()),
+        })
+    return pd.DataFrame(rows, columns=['span', 'stage', 'start_ms', 'end_ms', 'duration_ms', 'thread', 'details'])
+
+
+def show_panel(trace, container=None):
+    """Draw the rerun's waterfall and a per-stage breakdown into `container` (default: sidebar)."""
+    import streamlit as st
+    container = container if container is not None else st.sidebar
+    with container.expander(f"Timings: {trace.duration_ms:.0f} ms", expanded=True):
+        if trace.root['end_ms'] is None:
+            st.caption("Trace still open: call perf.finish() before showing it")
+        frame = waterfall(trace)
+        # Wall time per stage counts overlapping spans once (concurrent fetches)
+        totals = {name: _covered_ms(frame[frame['stage'] == name]) for name in STAGES}
+        st.caption(" | ".join(f"{name} {ms:.0f} ms" for name, ms in totals.items()))
+        st.vega_lite_chart(frame.assign(order=range(len(frame))), {
+            'mark': {'type': 'bar', 'tooltip': True},
+            'encoding': {
+                'y': {'field': 'span', 'type': 'nominal', 'sort': {'field': 'order'}, 'title': None},
+                'x': {'field': 'start_ms', 'type': 'quantitative', 'title': 'ms'},
+                'x2': {'field': 'end_ms'},
+                'color': {'field': 'stage', 'type': 'nominal', 'scale': {'domain': list(STAGES) + ['other']}},
+            },
+            'height': max(120, 18 * len(frame)),
+        }, width="stretch")
+        st.dataframe(frame[['span', 'duration_ms', 'start_ms', 'thread', 'details']].style.format(
+            "{:.1f}", subset=['duration_ms', 'start_ms']), hide_index=True)
+
+
+def _covered_ms(frame):
+    total, reached = 0.0, float('-inf')
+    for start_ms, end_ms in sorted(zip(frame['start_ms'], frame['end_ms'])):
+        if end_ms > reached:
+            total += end_ms - max(start_ms, reached)
+            reached = end_ms
+    return total
+
+
+class Metrics:
+    """Per-(page, span) latency histograms over every finished trace in the process."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.series = {}  # (page, span) -> [bucket counts..., count, sum, errors]
+
+    def observe(self, trace):
+        with trace.lock:
+            spans = list(trace.spans)
+        with self.lock:
+            for record in spans:
+                seconds = (record['end_ms'] - record['start_ms']) / 1000
+                values = self.series.setdefault((trace.page, record['name']), [0] * (len(self.buckets) + 3))
+                for i, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        values[i] += 1
+                values[-3] += 1
+                values[-2] += seconds
+                values[-1] += 'error' in record
+
+    def text(self):
+        lines = [
+            "# HELP perf_span_seconds Time spent in instrumented page stages.",
+            "# TYPE perf_span_seconds histogram",
+        ]
+        errors = []
+        with self.lock:
+            series = {key: list(values) for key, values in self.series.items()}
+        for (page, name), values in sorted(series.items()):
+            labels = f'page="{_escape(page)}",span="{_escape(name)}"'
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'perf_span_seconds_bucket{{{labels},le="{bound:g}"}} {count}')
+            lines.append(f'perf_span_seconds_bucket{{{labels},le="+Inf"}} {values[-3]}')
+            lines.append(f'perf_span_seconds_sum{{{labels}}} {values[-2]:.6f}')
+            lines.append(f'perf_span_seconds_count{{{labels}}} {values[-3]}')
+            errors.append(f'perf_span_errors_total{{{labels}}} {values[-1]}')
+        lines += ["# HELP perf_span_errors_total Spans that ended in an exception.",
+                  "# TYPE perf_span_errors_total counter"] + errors
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_metrics = Metrics()
+
+
+def prometheus_text():
+    return _metrics.text()
+
+
+_log_lock = threading.Lock()
+
+
+def write_log(trace, path):
+    # One JSON object per span, so the log can be tailed straight into a log pipeline
+    with trace.lock:
+        spans = list(trace.spans)
+    lines = [json.dumps({'trace': trace.id, 'page': trace.page, 'timestamp': trace.timestamp, **record,
+                         'duration_ms': record['end_ms'] - record['start_ms']}, default=str)
+             for record in spans]
+    with _log_lock, open(path, 'a') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_guard = threading.Lock()
+
+
+def serve_metrics(port=METRICS_PORT, host=METRICS_HOST):
+    # Start (once per process) a background HTTP server answering GET /metrics
+    global _server
+    with _server_guard:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                # Port taken (e.g. by another app process): keep going without the endpoint
+                _server = False
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name='perf-metrics', daemon=True).start()
+        return _server or None
+
+
+# Up as soon as a page imports this module, not only after the first traced rerun
+if METRICS_PORT:
+    if not ENABLED:
+        warnings.warn("PERF_METRICS_PORT is set but PERF_TRACE is not: /metrics will only cover reruns "
+                      "with the timing panel open", stacklevel=2)
+    serve_metrics(METRICS_PORT)
+
+
+def summarize(path):
+    # Percentiles per (page, span) over a JSON-lines log
+    frame = pd.read_json(path, lines=True)
+    if frame.empty:
+        return frame
+    grouped = frame.groupby(['page', 'name'])['duration_ms']
+    return pd.DataFrame({
+        'count': grouped.size(),
+        'p50_ms': grouped.quantile(0.5),
+        'p95_ms': grouped.quantile(0.95),
+        'max_ms': grouped.max(),
+        'total_s': grouped.sum() / 1000,
+    }).sort_values('total_s', ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('log', help='JSON-lines span log written with PERF_LOG')
+    args = parser.parse_args()
+    with pd.option_context('display.float_format', '{:.1f}'.format, 'display.width', 200):
+        print(summarize(args.log).to_string())
+
+
+if __name__ == '__main__':
+    main()
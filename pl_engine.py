@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class DateIndex:
+    """Sorted date index over one price series.
+
+    Lookups are binary searches (np.searchsorted) instead of boolean scans of the
+    whole frame, and the year -> month -> day availability map for the date
+    pickers is built once in a single pass.
+    """
+
+    def __init__(self, dates, prices):
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        prices = np.asarray(prices, dtype='float64')
+        order = np.argsort(dates, kind='stable')
+        self.dates = dates[order]
+        self.prices = prices[order]
+        self._calendar = None
+
+    def __len__(self):
+        return len(self.dates)
+
+    def position(self, date):
+        # Index of `date`, or of the last trading day before it if the market was closed
+        i = np.searchsorted(self.dates, np.datetime64(date, 'ns'), side='right') - 1
+        if i < 0:
+            raise KeyError(f"No prices on or before {date}")
+        return int(i)
+
+    def price_at(self, date):
+        return self.prices[self.position(date)]
+
+    def between(self, start, end):
+        # Slice covering start <= date <= end
+        lo = np.searchsorted(self.dates, np.datetime64(start, 'ns'), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(end, 'ns'), side='right')
+        return slice(int(lo), int(hi))
+
+    def calendar(self):
+        # {year: {month: [days]}} of the dates that have prices
+        if self._calendar is None:
+            calendar = {}
+            days = self.dates.astype('datetime64[D]')
+            years = days.astype('datetime64[Y]').astype(int) + 1970
+            months = days.astype('datetime64[M]').astype(int) % 12 + 1
+            day_numbers = (days - days.astype('datetime64[M]')).astype(int) + 1
+            for year, month, day in zip(years.tolist(), months.tolist(), day_numbers.tolist()):
+                calendar.setdefault(year, {}).setdefault(month, []).append(day)
+            self._calendar = calendar
+        return self._calendar
+
+
+def best_trade(prices):
+    # Best single buy-then-sell pair in O(n): the best sale at j uses the lowest price up to j.
+    # Returns (buy_index, sell_index, profit_per_unit); profit is 0 if prices only fall.
+    prices = np.asarray(prices, dtype='float64')
+    if len(prices) < 2:
+        return 0, 0, 0.0
+    gains = prices - np.minimum.accumulate(prices)
+    sell = int(np.argmax(gains))
+    buy = int(np.argmin(prices[:sell + 1]))
+    return buy, sell, float(gains[sell])
+
+
+def holding_period_pl(prices, k, units=1):
+    # P/L for every holding period of k trading days: entry i, exit i + k
+    prices = np.asarray(prices, dtype='float64')
+    if k <= 0 or k >= len(prices):
+        return np.empty(0)
+    return (prices[k:] - prices[:-k]) * units
+
+
+def holding_period_returns(prices, k):
+    prices = np.asarray(prices, dtype='float64')
+    if k <= 0 or k >= len(prices):
+        return np.empty(0)
+    return prices[k:] / prices[:-k] - 1
+
+
+def return_distribution(prices, k, bins=40):
+    # Summary of the k-day return over every possible entry date
+    returns = holding_period_returns(prices, k)
+    if not len(returns):
+        return None
+    counts, edges = np.histogram(returns, bins=bins)
+    q05, q25, q50, q75, q95 = np.percentile(returns, [5, 25, 50, 75, 95])
+    return {
+        'count': len(returns),
+        'mean': float(returns.mean()),
+        'std': float(returns.std()),
+        'win_rate': float((returns > 0).mean()),
+        'p05': q05, 'p25': q25, 'median': q50, 'p75': q75, 'p95': q95,
+        'best': float(returns.max()), 'worst': float(returns.min()),
+        'histogram': (counts, edges),
+    }
@@ -0,0 +1,156 @@
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+import perf
+from data_broker import DataBroker
+
+# Matplotlib charts for the Streamlit apps, drawn at a cost that doesn't grow
+# with the length of the history.
+#
+# Long series are decimated to about one point per horizontal pixel before they
+# reach matplotlib: LTTB (largest-triangle-three-buckets) for prices, min/max per
+# bucket for spiky series such as rainfall, so peaks and troughs survive. Rendered
+# charts are kept as PNG bytes keyed by a hash of their data and every drawing
+# parameter, so a rerun with the same inputs skips matplotlib entirely. Figures
+# are built without pyplot and cleared as soon as they are saved, so nothing
+# accumulates in a long-lived server.
+
+DPI = 100
+MAX_BYTES = 64 * 1024 * 1024
+
+# Rendered PNGs, shared by every session; concurrent renders of one chart coalesce
+_figures = DataBroker(max_bytes=MAX_BYTES)
+
+
+def lttb_indices(x, y, points):
+    """Positions of `points` samples that keep the visual shape of (x, y).
+
+    Largest-triangle-three-buckets: the first and last samples are always kept,
+    the rest is split into points - 2 buckets and each bucket keeps the sample
+    forming the largest triangle with the previously kept sample and the mean of
+    the next bucket.
+    """
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    # Mean of every bucket, for the "next bucket" corner of the triangle
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    keep = np.empty(points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        area = np.abs((x[previous] - mean_x[bucket]) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (mean_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(area))
+        keep[bucket + 1] = previous
+    return keep
+
+
+def minmax_indices(y, points):
+    # Lowest and highest sample of each of points // 2 buckets, in their original order
+    n = len(y)
+    buckets = points // 2
+    if points >= n or buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype='float64')
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    lows = np.empty(buckets, dtype=int)
+    highs = np.empty(buckets, dtype=int)
+    for bucket in range(buckets):
+        start, stop = edges[bucket], edges[bucket + 1]
+        lows[bucket] = start + np.argmin(y[start:stop])
+        highs[bucket] = start + np.argmax(y[start:stop])
+    return np.unique(np.concatenate([lows, highs, [0, n - 1]]))
+
+
+def decimate(series, points, method='lttb'):
+    # A Series (or one column of values against a datetime index) thinned to about `points` samples
+    series = series.dropna()
+    if len(series) <= points:
+        return series
+    if method == 'minmax':
+        keep = minmax_indices(series.to_numpy(), points)
+    else:
+        index = series.index
+        x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(series))
+        keep = lttb_indices(x, series.to_numpy(), points)
+    return series.iloc[keep]
+
+
+def plot_width(fig, share=1.0):
+    # Horizontal pixels available to an axes spanning `share` of the figure
+    return max(int(fig.get_figwidth() * fig.dpi * share), 3)
+
+
+def data_hash(*objects):
+    digest = hashlib.sha1()
+    for obj in objects:
+        if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+            digest.update(pd.util.hash_pandas_object(obj, index=not isinstance(obj, pd.Index)).to_numpy().tobytes())
+            names = obj.columns if isinstance(obj, pd.DataFrame) else [obj.name]
+            digest.update(repr(list(names)).encode())
+        elif isinstance(obj, np.ndarray):
+            digest.update(np.ascontiguousarray(obj).tobytes())
+            digest.update(str(obj.dtype).encode())
+        else:
+            digest.update(repr(obj).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+def render_png(draw, *data, figsize=(10, 5), dpi=DPI, **params):
+    """PNG bytes of the chart `draw(fig, *data, **params)` draws on a blank figure.
+
+    Cached on the draw function, a hash of `data` and the remaining parameters,
+    so `data` must hold everything the chart depends on.
+    """
+    with perf.span('render.png', chart=draw.__name__):
+        key = (draw.__module__, draw.__qualname__, data_hash(*data), figsize, dpi, tuple(sorted(params.items())))
+        return _figures.get(key, lambda: _render(draw, data, figsize, dpi, params), ttl=float('inf'))
+
+
+def _render(draw, data, figsize, dpi, params):
+    fig = Figure(figsize=figsize, dpi=dpi)
+    try:
+        with perf.span('render.draw'):
+            draw(fig, *data, **params)
+        buffer = io.BytesIO()
+        with perf.span('render.savefig'):
+            fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+def figure_cache_stats():
+    return _figures.stats()
+
+
+def price_and_precipitation(fig, chart_data, title):
+    # Close on the left axis, precipitation on the right (apps 5 and 5_IMPROVED)
+    points = plot_width(fig, 0.8)
+    ax1 = fig.add_subplot()
+    ax1.set_xlabel("Date")
+    ax1.set_ylabel("Close Price", color="blue")
+    ax1.plot(decimate(chart_data["Close"], points), color="blue", label="Close Price")
+    ax1.tick_params(axis="y", labelcolor="blue")
+
+    ax2 = ax1.twinx()
+    ax2.set_ylabel("Precipitation (Inches)", color="black")
+    ax2.plot(decimate(chart_data["PrecipitationSumInches"], points, method="minmax"), color="pink",
+             label="Precipitation")
+    ax2.tick_params(axis="y", labelcolor="pink")
+    fig.suptitle(title)
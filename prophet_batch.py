@@ -0,0 +1,179 @@
+# Batch Prophet forecasts for a list of tickers.
+#
+#   python prophet_batch.py --tickers NVDA AAPL MSFT --start 2020-01-01 --end 2024-01-01 --periods 7
+#   python prophet_batch.py --tickers-file sp500.txt --workers 8
+#
+# Closes for every ticker come from one batched download; models are fitted in a
+# process pool. Each fitted model is saved as Prophet JSON under
+# <cache>/<TICKER>-<hash>.json, where the hash covers the training data and the
+# model settings, so a rerun on unchanged data loads the model instead of fitting
+# it again. The forecast summary (one row per ticker) is written to --out.
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from history_loader import load_histories
+
+CACHE_DIR = 'prophet_models'
+
+
+def training_frame(close):
+    # Prophet wants a tz-naive 'ds' column and a 'y' column without gaps
+    close = close.dropna()
+    index = pd.DatetimeIndex(close.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return pd.DataFrame({'ds': index, 'y': close.to_numpy(dtype='float64')})
+
+
+def data_hash(frame, params=None):
+    import prophet
+    digest = hashlib.sha1()
+    digest.update(frame['ds'].to_numpy(dtype='datetime64[ns]').tobytes())
+    digest.update(frame['y'].to_numpy(dtype='float64').tobytes())
+    digest.update(json.dumps({'prophet': prophet.__version__, 'params': params or {}}, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def quiet_logging():
+    # cmdstanpy logs every fit at INFO level (its logger is configured on first use)
+    from cmdstanpy.utils import get_logger
+    get_logger().setLevel(logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+
+
+def fitted_model(ticker, frame, cache_dir=CACHE_DIR, params=None):
+    """Prophet model for `frame`, loaded from the cache when the data hasn't changed.
+
+    Returns (model, cached). Older models for the same ticker are removed when a
+    new one is saved.
+    """
+    from prophet import Prophet
+    from prophet.serialize import model_from_json, model_to_json
+
+    path = os.path.join(cache_dir, f"{ticker}-{data_hash(frame, params)}.json")
+    try:
+        with open(path) as f:
+            return model_from_json(f.read()), True
+    except (OSError, ValueError, KeyError):
+        pass
+
+    model = Prophet(**(params or {}))
+    model.fit(frame)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Exact match on <TICKER>-<hash>.json: a prefix glob for BRK would also hit BRK-B's models
+    stale = re.compile(rf"{re.escape(ticker)}-[0-9a-f]+\.json")
+    for name in os.listdir(cache_dir):
+        if stale.fullmatch(name):
+            os.remove(os.path.join(cache_dir, name))
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(model_to_json(model))
+    os.replace(tmp, path)
+    return model, False
+
+
+def forecast_ticker(ticker, frame, periods=7, cache_dir=CACHE_DIR, params=None):
+    # Worker: fit (or load) one model and forecast `periods` days past the data
+    quiet_logging()
+    model, cached = fitted_model(ticker, frame, cache_dir, params)
+    future = model.make_future_dataframe(periods=periods)
+    forecast = model.predict(future.iloc[-periods:])
+    forecast = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+    return forecast.assign(ticker=ticker), cached
+
+
+def summarize(frame, forecast):
+    last_close = frame['y'].iloc[-1]
+    next_day = forecast['yhat'].iloc[0]
+    return {
+        'last_date': frame['ds'].iloc[-1].date(),
+        'last_close': last_close,
+        'next_yhat': next_day,
+        'final_yhat': forecast['yhat'].iloc[-1],
+        'final_lower': forecast['yhat_lower'].iloc[-1],
+        'final_upper': forecast['yhat_upper'].iloc[-1],
+        'change': forecast['yhat'].iloc[-1] / last_close - 1,
+        'direction': 'up' if next_day > last_close else 'down/flat',
+    }
+
+
+def run_batch(tickers, start=None, end=None, periods=7, cache_dir=CACHE_DIR, workers=None,
+              params=None, min_rows=30):
+    """Forecast every ticker in a process pool.
+
+    Returns (summary, forecasts, failures): one summary row per ticker, the
+    forecast rows of all tickers, and {ticker: reason} for the ones that failed.
+    """
+    closes, failures = load_histories(tickers, start=start, end=end, period=None if start else '5y')
+    frames = {}
+    for ticker in closes.columns:
+        frame = training_frame(closes[ticker])
+        if len(frame) < min_rows:
+            failures[ticker] = f"Only {len(frame)} rows of history"
+        else:
+            frames[ticker] = frame
+
+    rows, forecasts, fitted = [], [], 0
+    if frames:
+        with ProcessPoolExecutor(max_workers=workers, initializer=quiet_logging) as pool:
+            futures = {pool.submit(forecast_ticker, ticker, frame, periods, cache_dir, params): ticker
+                       for ticker, frame in frames.items()}
+            for done, future in enumerate(as_completed(futures), start=1):
+                ticker = futures[future]
+                try:
+                    forecast, cached = future.result()
+                except Exception as e:
+                    failures[ticker] = f"{type(e).__name__}: {e}"
+                    continue
+                fitted += not cached
+                forecasts.append(forecast)
+                rows.append({'ticker': ticker, 'cached': cached, **summarize(frames[ticker], forecast)})
+                if done % 25 == 0 or done == len(futures):
+                    print(f"  {done}/{len(futures)} tickers done ({fitted} fitted, {done - fitted} from cache)")
+
+    summary = pd.DataFrame(rows)
+    if len(summary):
+        summary = summary.sort_values('change', ascending=False, ignore_index=True)
+    forecasts = pd.concat(forecasts, ignore_index=True) if forecasts else pd.DataFrame()
+    return summary, forecasts, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', nargs='*', default=[])
+    parser.add_argument('--tickers-file', help='one ticker per line (or comma separated)')
+    parser.add_argument('--start', help='default: the last 5 years')
+    parser.add_argument('--end')
+    parser.add_argument('--periods', type=int, default=7, help='days to forecast')
+    parser.add_argument('--cache', default=CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='forecasts.csv')
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file) as f:
+            tickers += [t.strip() for t in f.read().replace(',', '\n').split() if t.strip()]
+    if not tickers:
+        parser.error('no tickers given')
+
+    summary, forecasts, failures = run_batch(tickers, args.start, args.end, args.periods, args.cache, args.workers)
+    for ticker, reason in failures.items():
+        print(f"{ticker}: {reason}")
+    if len(summary):
+        summary.to_csv(args.out, index=False)
+        forecasts.to_csv(os.path.splitext(args.out)[0] + '_daily.csv', index=False)
+        with pd.option_context('display.float_format', '{:.2f}'.format):
+            print(summary.head(20).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
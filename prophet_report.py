@@ -0,0 +1,269 @@
+# Headless batch version of nvidia_prophet.py: the same analysis for a whole
+# ticker list, written to files instead of shown on screen.
+#
+#   python prophet_report.py --tickers NVDA AAPL MSFT --start 2020-01-01 --end 2024-01-01
+#   python prophet_report.py --tickers-file sp500.txt --workers 8 --out reports/
+#
+# For every ticker: the close-price chart, the close with its polynomial trend
+# line, and the next --periods sessions forecast next to the last --periods
+# actual closes, each as a PNG, plus report.html and summary.json under
+# <out>/<TICKER>/. <out>/index.html and <out>/summary.json collect all tickers.
+#
+# Closes come from one batched download; the reports are built in a process
+# pool. summary.json records a hash of the ticker's closes and the report
+# settings, and a ticker whose hash is unchanged is skipped, so a nightly run
+# only redoes tickers that have new data. Prophet models themselves are cached
+# by prophet_batch.py as well.
+
+import argparse
+import html
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib.dates as mdates
+import pandas as pd
+from matplotlib.figure import Figure
+
+from forecasters import get_forecaster
+from history_loader import load_histories
+from plotting import decimate, plot_width
+from prophet_batch import CACHE_DIR, data_hash, quiet_logging, training_frame
+from trend import fit_polynomial
+
+OUT_DIR = 'reports'
+# Bump when the report layout changes so every ticker is rebuilt once
+REPORT_VERSION = 1
+CHARTS = ('close.png', 'trend.png', 'forecast.png')
+
+
+def _save(fig, path):
+    try:
+        fig.savefig(path + '.tmp', format='png')
+        os.replace(path + '.tmp', path)
+    finally:
+        fig.clear()
+
+
+def _write(path, text):
+    with open(path + '.tmp', 'w') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
+
+
+def close_chart(fig, close, ticker, span):
+    ax = fig.add_subplot()
+    ax.plot(decimate(close, plot_width(fig, 0.8)), label=f'{ticker} Close Price', color='#c9acfa')
+    ax.set_title(f'{ticker} Stock Close Price ({span})', fontsize=16)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.set_ylabel('Close Price (USD)', fontsize=12)
+    ax.legend()
+    ax.grid(True)
+
+
+def trend_chart(fig, close, trend, ticker, span):
+    points = plot_width(fig, 0.8)
+    ax = fig.add_subplot()
+    ax.plot(decimate(close, points), label='Close Price', color='#c9acfa')
+    ax.plot(decimate(trend, points), label='Trend Line', color='gray', linestyle='--')
+    ax.set_title(f'{ticker} Stock Close Price with Trend Line ({span})', fontsize=16)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.set_ylabel('Close Price (USD)', fontsize=12)
+    ax.legend()
+    ax.grid(True)
+
+
+def forecast_chart(fig, recent, forecast, backend, periods):
+    ax = fig.add_subplot()
+    ax.plot(recent.index, recent.to_numpy(), label='Actual Data', marker='o', color='purple')
+    ax.plot(forecast.index, forecast['yhat'].to_numpy(), label=f'Forecast (Next {periods} Days)',
+            marker='x', color='navy')
+    ax.fill_between(forecast.index, forecast['yhat_lower'].to_numpy(), forecast['yhat_upper'].to_numpy(),
+                    color='navy', alpha=0.15)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Value')
+    ax.set_title(f'{backend.capitalize()} Forecast for the Next {periods} Days '
+                 f'continuing from the previous {periods} Days')
+    ax.legend()
+    ax.grid()
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+
+
+def report_html(summary):
+    rows = "".join(
+        f"<tr><td>{pd.Timestamp(day['ds']).date()}</td><td>{day['yhat']:.2f}</td>"
+        f"<td>{day['yhat_lower']:.2f}</td><td>{day['yhat_upper']:.2f}</td></tr>"
+        for day in summary['forecast'])
+    ticker = html.escape(summary['ticker'])
+    return (f"<!doctype html><html><head><meta charset='utf-8'><title>{ticker}</title></head><body>"
+            f"<h1>{ticker}</h1>"
+            f"<p>{summary['rows']} closes from {summary['first_date']} to {summary['last_date']}. "
+            f"Last close {summary['last_close']:.2f}; next session forecast {summary['next_yhat']:.2f} "
+            f"({html.escape(summary['direction'])}), {summary['periods']}-day change {summary['change']:.2%}. "
+            f"Degree-{summary['degree']} trend R&sup2; {summary['trend_r2']:.3f}.</p>"
+            + "".join(f"<p><img src='{chart}' style='max-width:100%'></p>" for chart in CHARTS)
+            + "<table border='1' cellpadding='4'><tr><th>Date</th><th>Forecast</th><th>Lower</th><th>Upper</th></tr>"
+            f"{rows}</table><p><small>Generated {html.escape(summary['generated_at'])} "
+            f"with the {html.escape(summary['backend'])} backend.</small></p></body></html>")
+
+
+def index_html(summaries):
+    rows = "".join(
+        f"<tr><td><a href='{html.escape(s['ticker'])}/report.html'>{html.escape(s['ticker'])}</a></td>"
+        f"<td>{s['last_date']}</td><td>{s['last_close']:.2f}</td><td>{s['next_yhat']:.2f}</td>"
+        f"<td>{s['change']:.2%}</td><td>{html.escape(s['direction'])}</td><td>{s['trend_r2']:.3f}</td></tr>"
+        for s in sorted(summaries, key=lambda s: s['change'], reverse=True))
+    return ("<!doctype html><html><head><meta charset='utf-8'><title>Forecast reports</title></head><body>"
+            "<h1>Forecast reports</h1><table border='1' cellpadding='4'><tr><th>Ticker</th><th>Last date</th>"
+            "<th>Last close</th><th>Next session</th><th>Change</th><th>Direction</th><th>Trend R&sup2;</th></tr>"
+            f"{rows}</table></body></html>")
+
+
+def build_report(ticker, close, out_dir, settings, input_hash):
+    """Worker: charts, forecast and summary for one ticker, written under out_dir/<ticker>/."""
+    quiet_logging()
+    folder = os.path.join(out_dir, ticker)
+    os.makedirs(folder, exist_ok=True)
+    close = close.dropna()
+    close.index = pd.DatetimeIndex(close.index).tz_localize(None) if close.index.tz is not None else close.index
+    span = f"{close.index[0].year}-{close.index[-1].year}"
+    periods = settings['periods']
+
+    fig = Figure(figsize=(12, 6))
+    close_chart(fig, close, ticker, span)
+    _save(fig, os.path.join(folder, 'close.png'))
+
+    trend = fit_polynomial(close.to_frame(ticker), settings['degree'])
+    fig = Figure(figsize=(12, 6))
+    trend_chart(fig, close, trend.fitted[ticker], ticker, span)
+    _save(fig, os.path.join(folder, 'trend.png'))
+
+    kwargs = {'cache_dir': settings['cache_dir']} if settings['backend'] == 'prophet' else {}
+    result = get_forecaster(settings['backend'], **kwargs).forecast(close.to_frame(ticker), periods=periods)
+    forecast = result.xs(ticker, axis=1, level=1)
+    fig = Figure(figsize=(21, 6))
+    forecast_chart(fig, close.iloc[-periods:], forecast, settings['backend'], periods)
+    _save(fig, os.path.join(folder, 'forecast.png'))
+
+    last_close = float(close.iloc[-1])
+    next_yhat = float(forecast['yhat'].iloc[0])
+    summary = {
+        'ticker': ticker,
+        'input_hash': input_hash,
+        'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        **{key: settings[key] for key in ('backend', 'degree', 'periods')},
+        'rows': len(close),
+        'first_date': str(close.index[0].date()),
+        'last_date': str(close.index[-1].date()),
+        'last_close': last_close,
+        'next_yhat': next_yhat,
+        'final_yhat': float(forecast['yhat'].iloc[-1]),
+        'change': float(forecast['yhat'].iloc[-1]) / last_close - 1,
+        'direction': 'up' if next_yhat > last_close else 'down/flat',
+        'trend_r2': float(trend.r2[ticker]),
+        'forecast': [{'ds': str(ds.date()), **{k: float(v) for k, v in row.items()}}
+                     for ds, row in forecast.iterrows()],
+        'recent': [{'ds': str(ds.date()), 'y': float(y)} for ds, y in close.iloc[-periods:].items()],
+    }
+    _write(os.path.join(folder, 'report.html'), report_html(summary))
+    # Written last: a ticker only counts as done once its summary exists
+    _write(os.path.join(folder, 'summary.json'), json.dumps(summary, indent=1))
+    return summary
+
+
+def previous_summary(out_dir, ticker):
+    folder = os.path.join(out_dir, ticker)
+    try:
+        with open(os.path.join(folder, 'summary.json')) as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not all(os.path.exists(os.path.join(folder, name)) for name in CHARTS + ('report.html',)):
+        return None
+    return summary
+
+
+def run_reports(tickers, start=None, end=None, out_dir=OUT_DIR, backend='prophet', degree=3, periods=7,
+                workers=None, cache_dir=CACHE_DIR, force=False, min_rows=30):
+    """Build reports for every ticker whose closes or settings changed since the last run.
+
+    Returns (summaries, skipped, failures): a summary per ticker (fresh or from
+    the previous run), the tickers that were skipped as unchanged, and
+    {ticker: reason} for the ones that failed.
+    """
+    closes, failures = load_histories(tickers, start=start, end=end, period=None if start else '5y')
+    settings = {'backend': backend, 'degree': degree, 'periods': periods, 'cache_dir': cache_dir,
+                'version': REPORT_VERSION}
+    hash_settings = {key: value for key, value in settings.items() if key != 'cache_dir'}
+    os.makedirs(out_dir, exist_ok=True)
+
+    summaries, skipped, todo = [], [], {}
+    for ticker in closes.columns:
+        close = closes[ticker].dropna()
+        if len(close) < min_rows:
+            failures[ticker] = f"Only {len(close)} rows of history"
+            continue
+        input_hash = data_hash(training_frame(close), hash_settings)
+        previous = None if force else previous_summary(out_dir, ticker)
+        if previous is not None and previous.get('input_hash') == input_hash:
+            summaries.append(previous)
+            skipped.append(ticker)
+        else:
+            todo[ticker] = (close, input_hash)
+
+    print(f"{len(todo)} reports to build, {len(skipped)} unchanged")
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=quiet_logging) as pool:
+            futures = {pool.submit(build_report, ticker, close, out_dir, settings, input_hash): ticker
+                       for ticker, (close, input_hash) in todo.items()}
+            for done, future in enumerate(as_completed(futures), start=1):
+                ticker = futures[future]
+                try:
+                    summaries.append(future.result())
+                except Exception as e:
+                    failures[ticker] = f"{type(e).__name__}: {e}"
+                if done % 25 == 0 or done == len(futures):
+                    print(f"  {done}/{len(futures)} reports built")
+
+    _write(os.path.join(out_dir, 'summary.json'),
+           json.dumps({'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'failures': failures,
+                       'tickers': {s['ticker']: {k: v for k, v in s.items() if k not in ('forecast', 'recent')}
+                                   for s in summaries}}, indent=1))
+    _write(os.path.join(out_dir, 'index.html'), index_html(summaries))
+    return summaries, skipped, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', nargs='*', default=[])
+    parser.add_argument('--tickers-file', help='one ticker per line (or comma separated)')
+    parser.add_argument('--start', help='default: the last 5 years')
+    parser.add_argument('--end')
+    parser.add_argument('--out', default=OUT_DIR)
+    parser.add_argument('--backend', default='prophet', help='see forecasters.py')
+    parser.add_argument('--degree', type=int, default=3, help='degree of the trend line')
+    parser.add_argument('--periods', type=int, default=7, help='sessions to forecast')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default=CACHE_DIR, help='Prophet model cache')
+    parser.add_argument('--force', action='store_true', help='rebuild unchanged tickers too')
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file) as f:
+            tickers += [t.strip() for t in f.read().replace(',', '\n').split() if t.strip()]
+    if not tickers:
+        parser.error('no tickers given')
+
+    start = time.perf_counter()
+    summaries, skipped, failures = run_reports(tickers, args.start, args.end, args.out, args.backend,
+                                               args.degree, args.periods, args.workers, args.cache, args.force)
+    for ticker, reason in failures.items():
+        print(f"{ticker}: {reason}")
+    print(f"{len(summaries) - len(skipped)} built, {len(skipped)} unchanged, {len(failures)} failed "
+          f"in {time.perf_counter() - start:.1f}s -> {os.path.join(args.out, 'index.html')}")
+
+
+if __name__ == '__main__':
+    main()
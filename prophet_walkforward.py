@@ -0,0 +1,177 @@
+# Walk-forward evaluation of the Prophet next-days forecast.
+#
+#   python prophet_walkforward.py --tickers NVDA AAPL --start 2020-01-01 --end 2024-01-01 --horizon 7 --step 5
+#
+# For every cutoff (every --step sessions once --initial sessions of history are
+# available) a model is fitted on the data up to the cutoff and asked for the
+# next --horizon sessions, which are then compared with what actually happened.
+# Cutoffs are split into chunks of consecutive cutoffs that run in a process
+# pool; inside a chunk each fit is warm-started from the previous cutoff's
+# parameters, which is where most of the speed comes from. Finished chunks are
+# appended to <out>/partial.jsonl, so an interrupted run picks up where it left off.
+#
+# Reported per horizon: directional hit rate (did the forecast get the sign of
+# the move from the cutoff close right), MAE, MAPE and how often the actual
+# close fell inside [yhat_lower, yhat_upper] against the nominal interval width.
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from history_loader import load_histories
+from prophet_batch import data_hash, quiet_logging, training_frame
+from sweep import read_checkpoint, resume_checkpoint
+
+
+def cutoff_positions(n, initial=504, horizon=7, step=5):
+    # Row index of the last training row of every cutoff that has `horizon` rows after it
+    return list(range(initial - 1, n - horizon, step))
+
+
+def warm_start(model):
+    # Initial values for Stan taken from a fitted model (Prophet's documented recipe)
+    init = {name: model.params[name][0][0] for name in ('k', 'm', 'sigma_obs')}
+    init.update({name: model.params[name][0] for name in ('delta', 'beta')})
+    return init
+
+
+def _fit(train, params, previous):
+    from prophet import Prophet
+    if previous is not None:
+        try:
+            return Prophet(**params).fit(train, init=warm_start(previous))
+        except (ValueError, RuntimeError):
+            # e.g. yearly seasonality switched on at this cutoff, so the shapes differ
+            pass
+    return Prophet(**params).fit(train)
+
+
+def evaluate_chunk(ticker, frame, positions, horizon, params=None):
+    # Worker: fit at each cutoff in order, warm-starting from the previous one
+    quiet_logging()
+    params = params or {}
+    y = frame['y'].to_numpy()
+    rows, previous = [], None
+    for pos in positions:
+        model = _fit(frame.iloc[:pos + 1], params, previous)
+        future = frame.iloc[pos + 1:pos + 1 + horizon]
+        forecast = model.predict(future[['ds']])
+        for h in range(len(future)):
+            rows.append({
+                'ticker': ticker,
+                'cutoff': str(frame['ds'].iloc[pos].date()),
+                'horizon': h + 1,
+                'ds': str(future['ds'].iloc[h].date()),
+                'last': float(y[pos]),
+                'y': float(future['y'].iloc[h]),
+                'yhat': float(forecast['yhat'].iloc[h]),
+                'yhat_lower': float(forecast['yhat_lower'].iloc[h]),
+                'yhat_upper': float(forecast['yhat_upper'].iloc[h]),
+            })
+        previous = model
+    return rows
+
+
+def run_walkforward(tickers, start='2020-01-01', end='2024-01-01', horizon=7, initial=504, step=5,
+                    chunk_size=20, out_dir='walkforward_results', workers=None, params=None):
+    """Walk-forward forecasts for every ticker and cutoff.
+
+    Returns (results, failures): one row per ticker, cutoff and horizon, and
+    {ticker: reason} for tickers that had no data or too little history.
+    """
+    params = params or {}
+    closes, failures = load_histories(tickers, start=start, end=end)
+    frames = {ticker: training_frame(closes[ticker]) for ticker in closes.columns}
+
+    tasks = {}
+    for ticker, frame in frames.items():
+        positions = cutoff_positions(len(frame), initial, horizon, step)
+        if not positions:
+            failures[ticker] = f"Only {len(frame)} rows of history (need more than {initial + horizon})"
+            continue
+        for i in range(0, len(positions), chunk_size):
+            tasks[(ticker, i // chunk_size)] = positions[i:i + chunk_size]
+
+    # Resume only if the checkpoint belongs to exactly this run (same data and settings)
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = os.path.join(out_dir, 'partial.jsonl')
+    meta = {'data': {ticker: data_hash(frame, params) for ticker, frame in frames.items()},
+            'horizon': horizon, 'initial': initial, 'step': step, 'chunk_size': chunk_size}
+    done = resume_checkpoint(checkpoint, os.path.join(out_dir, 'walkforward.json'), meta)
+
+    todo = [task for task in tasks if task not in done]
+    cutoffs = sum(len(positions) for positions in tasks.values())
+    print(f"{len(frames)} tickers, {cutoffs} cutoffs: {len(todo)} of {len(tasks)} chunks to run")
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=quiet_logging) as pool, open(checkpoint, 'a') as log:
+            futures = {pool.submit(evaluate_chunk, task[0], frames[task[0]], tasks[task], horizon, params): task
+                       for task in todo}
+            for finished, future in enumerate(as_completed(futures), start=1):
+                log.write(json.dumps({'task': futures[future], 'rows': future.result()}) + '\n')
+                log.flush()
+                if finished % 10 == 0 or finished == len(futures):
+                    print(f"  {finished}/{len(futures)} chunks done")
+
+    rows = [row for entry in read_checkpoint(checkpoint) if tuple(entry['task']) in tasks for row in entry['rows']]
+    return pd.DataFrame(rows), failures
+
+
+def evaluate(results, interval_width=0.8, by=('horizon',)):
+    # Hit rate, MAE, MAPE and band coverage, grouped by `by`
+    moved = np.sign(results['y'] - results['last'])
+    called = np.sign(results['yhat'] - results['last'])
+    error = results['yhat'] - results['y']
+    scored = pd.DataFrame({
+        **{column: results[column] for column in by},
+        'hit': (moved == called).astype(float),
+        'abs_error': error.abs(),
+        'ape': (error / results['y']).abs() * 100,
+        'covered': ((results['y'] >= results['yhat_lower']) & (results['y'] <= results['yhat_upper'])).astype(float),
+        'band_width': (results['yhat_upper'] - results['yhat_lower']) / results['last'] * 100,
+    })
+    table = scored.groupby(list(by)).agg(
+        forecasts=('hit', 'size'),
+        hit_rate=('hit', 'mean'),
+        mae=('abs_error', 'mean'),
+        mape=('ape', 'mean'),
+        coverage=('covered', 'mean'),
+        band_width_pct=('band_width', 'mean'),
+    )
+    table['nominal'] = interval_width
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', nargs='+', default=['NVDA'])
+    parser.add_argument('--start', default='2020-01-01')
+    parser.add_argument('--end', default='2024-01-01')
+    parser.add_argument('--horizon', type=int, default=7, help='sessions forecast after each cutoff')
+    parser.add_argument('--initial', type=int, default=504, help='sessions of history before the first cutoff')
+    parser.add_argument('--step', type=int, default=5, help='sessions between cutoffs')
+    parser.add_argument('--chunk-size', type=int, default=20, help='consecutive cutoffs per task')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='walkforward_results')
+    args = parser.parse_args()
+
+    results, failures = run_walkforward(args.tickers, args.start, args.end, args.horizon, args.initial,
+                                        args.step, args.chunk_size, args.out, args.workers)
+    for ticker, reason in failures.items():
+        print(f"{ticker}: {reason}")
+    if results.empty:
+        return
+    by_horizon = evaluate(results)
+    by_ticker = evaluate(results, by=('ticker', 'horizon'))
+    results.to_csv(os.path.join(args.out, 'results.csv'), index=False)
+    by_horizon.to_csv(os.path.join(args.out, 'by_horizon.csv'))
+    by_ticker.to_csv(os.path.join(args.out, 'by_ticker.csv'))
+    with pd.option_context('display.float_format', '{:.3f}'.format):
+        print(by_horizon.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import threading
+
+import pandas as pd
+
+# Pyramid levels: label -> pandas period frequency
+LEVELS = {'D': 'D', 'W': 'W', 'M': 'M', 'Q': 'Q'}
+
+WEATHER_STATS = ['mean', 'sum', 'min', 'max']
+PRICE_AGGREGATIONS = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def _periods(index, freq):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        # Bucket bars by their local exchange date, not by UTC
+        index = index.tz_localize(None)
+    return index.to_period(freq)
+
+
+class RollupPyramid:
+    """Precomputed daily/weekly/monthly/quarterly rollups of a time series.
+
+    kind='weather' keeps mean/sum/min/max of every numeric column (columns become
+    (column, stat) pairs); kind='price' keeps OHLC(V) bars. Every level is indexed
+    by a PeriodIndex, so the weather and price pyramids line up label-for-label at
+    W/M/Q. update() only recomputes the buckets touched by new or corrected rows.
+
+    A pyramid can be shared between sessions (st.cache_resource): update() and
+    slice() hold a lock, so a slice never sees a half-applied update.
+    """
+
+    def __init__(self, frame, kind='weather', levels=LEVELS):
+        self.kind = kind
+        self.freqs = dict(levels)
+        self.lock = threading.RLock()
+        if kind == 'weather':
+            frame = frame.select_dtypes('number')
+        elif 'Open' not in frame.columns:
+            # Close-only series: each bar's OHLC comes from the closes inside it
+            frame = frame[['Close']].assign(Open=frame['Close'], High=frame['Close'], Low=frame['Close'])
+        self.base = frame.sort_index()
+        self.levels = {level: self._rollup(self.base, freq) for level, freq in self.freqs.items()}
+
+    def _rollup(self, frame, freq):
+        grouped = frame.groupby(_periods(frame.index, freq))
+        if self.kind == 'weather':
+            return grouped.agg(WEATHER_STATS)
+        return grouped.agg({column: how for column, how in PRICE_AGGREGATIONS.items() if column in frame})
+
+    def update(self, rows):
+        # Merge new (or corrected) rows into the base and rebuild only the buckets
+        # from the first touched one onwards, at every level
+        if not len(rows):
+            return
+        with self.lock:
+            rows = rows[self.base.columns]
+            base = pd.concat([self.base, rows])
+            base = base[~base.index.duplicated(keep='last')].sort_index()
+            first = rows.index.min()
+            levels = {}
+            for level, freq in self.freqs.items():
+                first_period = _periods([first], freq)[0]
+                base_periods = _periods(base.index, freq)
+                kept = self.levels[level]
+                kept = kept[kept.index < first_period]
+                fresh = self._rollup(base[base_periods >= first_period], freq)
+                levels[level] = pd.concat([kept, fresh])
+            self.base, self.levels = base, levels
+
+    def update_tail(self, rows):
+        # Merge only the rows after the newest stored one; checked and applied under the
+        # lock, so concurrent callers holding the same fresh bars add them once
+        with self.lock:
+            if len(self.base):
+                rows = rows[rows.index > self.base.index[-1]]
+            self.update(rows)
+
+    def slice(self, level, start=None, end=None):
+        # Buckets whose period overlaps [start, end]; a binary search on the sorted index
+        with self.lock:
+            frame = self.levels[level]
+        freq = self.freqs[level]
+        lo = 0 if start is None else frame.index.searchsorted(pd.Period(start, freq), side='left')
+        hi = len(frame) if end is None else frame.index.searchsorted(pd.Period(end, freq), side='right')
+        return frame.iloc[lo:hi]
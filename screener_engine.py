@@ -0,0 +1,103 @@
+import io
+import tokenize
+
+import numpy as np
+import pandas as pd
+
+# Short column names usable in filter expressions, mapped to the .info field they come from
+INFO_COLUMNS = {
+    'name': 'longName',
+    'sector': 'sector',
+    'industry': 'industry',
+    'country': 'country',
+    'pe': 'trailingPE',
+    'forward_pe': 'forwardPE',
+    'peg': 'pegRatio',
+    'eps': 'forwardEps',
+    'price': 'previousClose',
+    'high_52w': 'fiftyTwoWeekHigh',
+    'low_52w': 'fiftyTwoWeekLow',
+    'market_cap': 'marketCap',
+    'dividend_yield': 'dividendYield',
+}
+TEXT_COLUMNS = ('name', 'sector', 'industry', 'country')
+
+
+def build_metrics(infos, technicals=None):
+    # infos: {ticker: info record}. Returns one row per ticker with float64 metric
+    # columns (NaN where missing) so every filter below is a single vectorized pass.
+    # `technicals` (one row per ticker, e.g. from factors.compute_factors) is joined on.
+    tickers = list(infos)
+    data = {}
+    for column, field in INFO_COLUMNS.items():
+        values = [infos[ticker].get(field) for ticker in tickers]
+        if column in TEXT_COLUMNS:
+            data[column] = pd.Series(values, index=tickers, dtype="object").fillna("")
+        else:
+            data[column] = pd.to_numeric(pd.Series(values, index=tickers, dtype="object"), errors="coerce")
+    frame = pd.DataFrame(data, index=pd.Index(tickers, name="ticker"))
+    frame['growth'] = (frame['price'] - frame['low_52w']) / frame['high_52w'] * 100
+    if technicals is not None:
+        frame = frame.join(technicals.reindex(frame.index))
+        # The real trailing 12-month return where there is a price history; the
+        # estimate from the 52-week range otherwise
+        if 'ret_12m' in frame:
+            frame['growth'] = frame['ret_12m'].fillna(frame['growth'])
+    return frame
+
+
+def _check_expression(expression):
+    # pandas' query language only resolves column names; '@' would let an expression
+    # reach local variables and dunder names can walk to arbitrary objects. The check
+    # and the rewrite below only look at code, never inside string literals.
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(expression).readline))
+    except (tokenize.TokenError, SyntaxError) as e:
+        raise ValueError(f"Invalid filter expression: {e}") from None
+    if any((token.type == tokenize.OP and token.string.startswith('@'))
+           or (token.type == tokenize.NAME and '__' in token.string) for token in tokens):
+        raise ValueError("Filter expressions may only refer to metric columns")
+    # Allow the friendlier '=' for equality as well as '=='
+    lines = expression.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    for token in reversed(tokens):
+        if token.type == tokenize.OP and token.string == '=':
+            at = offsets[token.start[0] - 1] + token.start[1]
+            expression = expression[:at] + '==' + expression[at + 1:]
+    return expression
+
+
+def composite_score(frame, factors, ascending):
+    # Mean of each factor's percentile rank over the rows present (lower = better);
+    # a ticker missing a factor is scored on the others, one missing all of them is NaN
+    ranks = [frame[factor].rank(ascending=up, pct=True) for factor, up in zip(factors, ascending)]
+    return pd.concat(ranks, axis=1).mean(axis=1) if ranks else pd.Series(np.nan, index=frame.index)
+
+
+def screen(frame, expression=None, sort_by=None, ascending=True, top_n=None):
+    """Filter, rank and truncate the metrics frame.
+
+    `expression` uses pandas query syntax over the frame's columns, e.g.
+    "pe < 25 and growth > 10 and sector == 'Technology'". Rows with NaN in a
+    compared column never pass a comparison, matching the old screener.
+
+    `sort_by` is one column, or a list of columns ranked by a composite score
+    (see composite_score); `ascending` is then one flag per column.
+    """
+    result = frame
+    if expression and expression.strip():
+        mask = frame.eval(_check_expression(expression))
+        if not (isinstance(mask, pd.Series) and mask.dtype == bool):
+            raise ValueError("Filter expression must evaluate to True/False per ticker")
+        result = frame[mask.to_numpy()]
+    if sort_by is not None and not isinstance(sort_by, str):
+        result = result.assign(score=composite_score(result, sort_by, ascending))
+        sort_by, ascending = 'score', True
+    if sort_by:
+        result = result.sort_values(sort_by, ascending=ascending, na_position="last", kind="stable")
+        result = result.assign(rank=np.arange(1, len(result) + 1))
+    if top_n:
+        result = result.head(top_n)
+    return result
@@ -0,0 +1,107 @@
+# Columnar store for the Stock_data/Stocks price files.
+#
+# Ingest once (re-running only converts files that changed):
+#   python stock_store.py --src Stock_data/Stocks --dst Stock_data/store
+#
+# Every <ticker>.txt CSV becomes a typed, uncompressed Arrow IPC file <ticker>.arrow
+# (memory-mapped on load, so reads are near zero-copy) and manifest.json lists the
+# tickers with their row count and date range, so the apps neither parse CSV nor
+# list the source directory at startup.
+
+import argparse
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # the store is optional; without pyarrow the apps fall back to CSV
+    pa = feather = None
+
+SOURCE_DIR = 'Stock_data/Stocks'
+STORE_DIR = 'Stock_data/store'
+MANIFEST = 'manifest.json'
+
+DTYPES = {'Open': 'float64', 'High': 'float64', 'Low': 'float64', 'Close': 'float64',
+          'Volume': 'int64', 'OpenInt': 'int32'}
+
+
+def read_source(path):
+    return pd.read_csv(path, delimiter=',', parse_dates=['Date'], dtype=DTYPES)
+
+
+def ingest(src=SOURCE_DIR, dst=STORE_DIR):
+    if feather is None:
+        raise RuntimeError("pyarrow is required to build the columnar store (pip install pyarrow)")
+    os.makedirs(dst, exist_ok=True)
+    manifest = load_manifest(dst) or {}
+    converted = skipped = 0
+    for name in sorted(os.listdir(src)):
+        if not name.endswith('.txt'):
+            continue
+        ticker = name[:-len('.txt')]
+        path = os.path.join(src, name)
+        mtime = os.path.getmtime(path)
+        entry = manifest.get(ticker)
+        if entry and entry['source_mtime'] == mtime:
+            continue
+        # A few files in the dataset are empty
+        if os.path.getsize(path) == 0:
+            skipped += 1
+            continue
+        frame = read_source(path).sort_values('Date')
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        feather.write_feather(table, os.path.join(dst, f"{ticker}.arrow"), compression='uncompressed')
+        manifest[ticker] = {
+            'rows': len(frame),
+            'first': frame['Date'].iloc[0].strftime('%Y-%m-%d'),
+            'last': frame['Date'].iloc[-1].strftime('%Y-%m-%d'),
+            'source_mtime': mtime,
+        }
+        converted += 1
+    with open(os.path.join(dst, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(os.path.join(dst, MANIFEST + '.tmp'), os.path.join(dst, MANIFEST))
+    return converted, skipped, len(manifest)
+
+
+def load_manifest(dst=STORE_DIR):
+    try:
+        with open(os.path.join(dst, MANIFEST)) as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+
+def list_tickers(dst=STORE_DIR, src=SOURCE_DIR):
+    manifest = load_manifest(dst)
+    if manifest is not None and feather is not None:
+        return sorted(manifest)
+    return sorted(f[:-len('.txt')] for f in os.listdir(src) if f.endswith('.txt'))
+
+
+def load_series(ticker, columns=('Date', 'Close'), dst=STORE_DIR, src=SOURCE_DIR):
+    # Memory-mapped read of only the requested columns; Arrow hands the float columns
+    # to pandas without copying. Falls back to parsing the CSV if the store isn't built.
+    path = os.path.join(dst, f"{ticker}.arrow")
+    columns = list(columns) if columns else None
+    if feather is not None and os.path.exists(path):
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas(self_destruct=True, split_blocks=True)
+    frame = read_source(os.path.join(src, f"{ticker}.txt"))
+    return frame[columns] if columns else frame
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--src', default=SOURCE_DIR)
+    parser.add_argument('--dst', default=STORE_DIR)
+    args = parser.parse_args()
+    converted, skipped, total = ingest(args.src, args.dst)
+    print(f"Converted {converted} files ({skipped} empty skipped); {total} tickers in {args.dst}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+# Parallel parameter sweep of the moving-average crossover strategy over every
+# stock in the columnar store (see stock_store.py).
+#
+#   python sweep.py --fast 10 20 50 --slow 50 100 200 --stop-loss 0 0.05 0.1 --out sweep_results
+#
+# All close prices are loaded once into a shared-memory block that every worker
+# maps without copying. Grid cells are fanned out over a process pool in chunks of
+# tickers; each finished chunk is appended to <out>/partial.jsonl, so re-running
+# the same command after an interruption only does the missing work (a line torn
+# by the interruption is cut off before appending). The ranked
+# table is written to <out>/ranked.csv (one row per parameter set) and
+# <out>/results.csv (one row per parameter set and ticker).
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+import stock_store
+from backtester import equity_curve, ma_crossover_signals, positions_from_signals, summarize
+
+_prices = None
+_offsets = None
+_shm = None
+_register_guard = threading.Lock()
+
+
+def load_price_matrix(tickers):
+    # Series have different lengths and date ranges, so they are packed end to end
+    # into one float64 array; ticker i lives in prices[offsets[i]:offsets[i + 1]].
+    series = [stock_store.load_series(ticker, columns=['Close'])['Close'].to_numpy() for ticker in tickers]
+    offsets = np.zeros(len(series) + 1, dtype='int64')
+    offsets[1:] = np.cumsum([len(s) for s in series])
+    shm = shared_memory.SharedMemory(create=True, size=max(int(offsets[-1]) * 8, 8))
+    prices = np.ndarray((int(offsets[-1]),), dtype='float64', buffer=shm.buf)
+    for i, values in enumerate(series):
+        prices[offsets[i]:offsets[i + 1]] = values
+    return shm, prices, offsets
+
+
+def _open_untracked(name):
+    # The parent creates and unlinks the block. Attaching registers it with the resource
+    # tracker before Python 3.13, and a worker unregistering it afterwards would also drop
+    # the parent's registration (workers share the parent's tracker), so the worker must
+    # not register it in the first place.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Fallback for older versions: register is swapped out process-wide, so the swap is
+    # held under a lock and no other thread in this module can create a block meanwhile
+    with _register_guard:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _attach(shm_name, size, offsets):
+    global _prices, _offsets, _shm
+    _shm = _open_untracked(shm_name)
+    _prices = np.ndarray((size,), dtype='float64', buffer=_shm.buf)
+    _offsets = offsets
+
+
+def _run_task(cell, ticker_ids, params):
+    rows = []
+    for i in ticker_ids:
+        close = _prices[_offsets[i]:_offsets[i + 1]]
+        if len(close) <= params['slow'] + 1 or not np.all(close > 0):
+            continue
+        entries, exits = ma_crossover_signals(close, params['fast'], params['slow'])
+        position = positions_from_signals(close, entries, exits,
+                                          stop_loss=params['stop_loss'] or None,
+                                          take_profit=params['take_profit'] or None)
+        _, returns, equity = equity_curve(close, position, fee=params['fee'], initial_capital=1.0)
+        stats = summarize(close, position > 0, returns, equity, 1.0)
+        rows.append({'cell': cell, 'ticker_id': int(i), **{k: float(v) for k, v in stats.items()}})
+    return rows
+
+
+def read_checkpoint(path):
+    # A crash mid-write can leave a truncated last line; that task simply runs again
+    entries = []
+    with open(path) as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                pass
+    return entries
+
+
+def _drop_partial_line(path):
+    # Cut the file back to its last complete line, so the next appended record starts on
+    # a line of its own instead of being glued onto (and lost with) a torn one
+    with open(path, 'rb+') as f:
+        end = pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(65536, pos)
+            f.seek(pos - step)
+            newline = f.read(step).rfind(b'\n')
+            if newline != -1:
+                pos = pos - step + newline + 1
+                break
+            pos -= step
+        if pos != end:
+            f.truncate(pos)
+
+
+def resume_checkpoint(checkpoint, meta_path, meta):
+    # Tasks already in `checkpoint`, if it belongs to exactly the run described by `meta`.
+    # A checkpoint without a readable manifest, or with a different one, is started over.
+    previous = None
+    try:
+        with open(meta_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        pass
+    done = set()
+    if os.path.exists(checkpoint):
+        if previous == meta:
+            done = {tuple(entry['task']) for entry in read_checkpoint(checkpoint)}
+            _drop_partial_line(checkpoint)
+        else:
+            os.remove(checkpoint)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return done
+
+
+def parameter_grid(fast, slow, stop_loss, take_profit, fee):
+    grid = []
+    for f, s, sl, tp, fe in itertools.product(fast, slow, stop_loss, take_profit, fee):
+        if f < s:
+            grid.append({'fast': f, 'slow': s, 'stop_loss': sl, 'take_profit': tp, 'fee': fe})
+    return grid
+
+
+def run_sweep(grid, tickers, out_dir, workers=None, chunk_size=250):
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = os.path.join(out_dir, 'partial.jsonl')
+    meta = {'grid': grid, 'tickers': tickers, 'chunk_size': chunk_size}
+    done = resume_checkpoint(checkpoint, os.path.join(out_dir, 'sweep.json'), meta)
+
+    chunks = [list(range(i, min(i + chunk_size, len(tickers)))) for i in range(0, len(tickers), chunk_size)]
+    tasks = [(cell, chunk_id) for cell in range(len(grid)) for chunk_id in range(len(chunks))
+             if (cell, chunk_id) not in done]
+    print(f"{len(grid)} parameter sets x {len(tickers)} tickers: "
+          f"{len(tasks)} of {len(grid) * len(chunks)} tasks to run")
+
+    if tasks:
+        shm, prices, offsets = load_price_matrix(tickers)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(shm.name, len(prices), offsets)) as pool, \
+                    open(checkpoint, 'a') as log:
+                futures = {pool.submit(_run_task, cell, chunks[chunk_id], grid[cell]): (cell, chunk_id)
+                           for cell, chunk_id in tasks}
+                for finished, future in enumerate(as_completed(futures), start=1):
+                    log.write(json.dumps({'task': futures[future], 'rows': future.result()}) + '\n')
+                    log.flush()
+                    if finished % 50 == 0 or finished == len(futures):
+                        print(f"  {finished}/{len(futures)} tasks done")
+        finally:
+            shm.close()
+            shm.unlink()
+
+    return write_results(grid, tickers, checkpoint, out_dir)
+
+
+def write_results(grid, tickers, checkpoint, out_dir):
+    rows = [row for entry in read_checkpoint(checkpoint) for row in entry['rows']]
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    results['ticker'] = [tickers[i] for i in results.pop('ticker_id')]
+    params = pd.DataFrame(grid)
+    results = params.join(results.set_index('cell'), how='inner').rename_axis('cell').reset_index()
+
+    ranked = results.groupby(['cell', *params.columns]).agg(
+        tickers=('ticker', 'size'),
+        median_sharpe=('sharpe', 'median'),
+        mean_sharpe=('sharpe', 'mean'),
+        median_cagr=('cagr', 'median'),
+        median_max_drawdown=('max_drawdown', 'median'),
+        mean_trades=('trades', 'mean'),
+    ).reset_index()
+    beat = (results['total_return'] > results['buy_hold_return']).groupby(results['cell']).mean()
+    ranked['beat_buy_hold'] = ranked['cell'].map(beat)
+    ranked = ranked.sort_values('median_sharpe', ascending=False).drop(columns='cell')
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+
+    results.drop(columns='cell').to_csv(os.path.join(out_dir, 'results.csv'), index=False)
+    ranked.to_csv(os.path.join(out_dir, 'ranked.csv'), index=False)
+    return ranked
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fast', type=int, nargs='+', default=[10, 20, 50])
+    parser.add_argument('--slow', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--stop-loss', type=float, nargs='+', default=[0.0], help='0 = off')
+    parser.add_argument('--take-profit', type=float, nargs='+', default=[0.0], help='0 = off')
+    parser.add_argument('--fee', type=float, nargs='+', default=[0.001])
+    parser.add_argument('--tickers', nargs='*', help='default: every ticker in the store')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=250)
+    parser.add_argument('--out', default='sweep_results')
+    args = parser.parse_args()
+
+    grid = parameter_grid(args.fast, args.slow, args.stop_loss, args.take_profit, args.fee)
+    tickers = args.tickers or stock_store.list_tickers()
+    ranked = run_sweep(grid, tickers, args.out, args.workers, args.chunk_size)
+    print(ranked.head(10).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
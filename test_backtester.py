@@ -0,0 +1,71 @@
+# The vectorized position state machine in backtester.py against a plain per-bar loop.
+#
+#   python -m pytest test_backtester.py
+
+import numpy as np
+import pytest
+
+from backtester import ma_crossover_signals, positions_from_signals, threshold_signals
+
+
+def loop_positions(close, entries, exits, stop_loss=None, take_profit=None):
+    # Reference implementation: one bar at a time, as the docstring describes it
+    position = np.zeros(len(close))
+    state, stopped, entry_price = False, False, np.nan
+    for t in range(len(close)):
+        was_long = state
+        if exits[t]:
+            state = False
+        elif entries[t]:
+            state = True
+        if not state:
+            stopped = False
+            continue
+        if not was_long:
+            entry_price, stopped, start = close[t], False, t
+        elif not stopped and t > start:
+            change = close[t] / entry_price - 1
+            if stop_loss is not None and change <= -stop_loss:
+                stopped = True
+            if take_profit is not None and change >= take_profit:
+                stopped = True
+        position[t] = 0.0 if stopped else 1.0
+    return position
+
+
+def random_walk(rng, n):
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('stop_loss, take_profit', [(None, None), (0.05, None), (None, 0.08), (0.03, 0.04)])
+def test_random_signals_match_loop(seed, stop_loss, take_profit):
+    rng = np.random.default_rng(seed)
+    close = random_walk(rng, 300)
+    entries = rng.random(300) < 0.1
+    exits = rng.random(300) < 0.1
+    expected = loop_positions(close, entries, exits, stop_loss, take_profit)
+    np.testing.assert_array_equal(positions_from_signals(close, entries, exits, stop_loss, take_profit), expected)
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('stop_loss, take_profit', [(None, None), (0.05, 0.1)])
+def test_strategy_signals_match_loop(seed, stop_loss, take_profit):
+    # Long runs of entry/exit conditions, as the apps' strategies produce them
+    close = random_walk(np.random.default_rng(seed), 500)
+    for entries, exits in (ma_crossover_signals(close, 10, 30),
+                           threshold_signals(close, *np.percentile(close, [25, 75]))):
+        expected = loop_positions(close, entries, exits, stop_loss, take_profit)
+        np.testing.assert_array_equal(positions_from_signals(close, entries, exits, stop_loss, take_profit), expected)
+
+
+def test_exit_wins_over_entry_on_the_same_bar():
+    close = np.array([10.0, 11.0, 12.0, 13.0])
+    entries = np.array([True, True, True, False])
+    exits = np.array([False, True, False, False])
+    np.testing.assert_array_equal(positions_from_signals(close, entries, exits), [1.0, 0.0, 1.0, 1.0])
+
+
+def test_empty_series():
+    empty = np.array([])
+    assert len(positions_from_signals(empty, empty.astype(bool), empty.astype(bool), stop_loss=0.1)) == 0
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+# Trend lines for a whole price matrix (dates x tickers) at once.
+#
+# Dates are turned into day numbers in one vectorized cast and rescaled to
+# [-1, 1] over the fitted range, so even a degree-5 polynomial stays well
+# conditioned (raw ordinals around 738000 do not). Every ticker is solved in the
+# same least-squares call; tickers with gaps or shorter histories are handled by
+# leaving their missing rows out of their own normal equations.
+
+DAYS_PER_YEAR = 365.25
+
+
+def day_numbers(dates):
+    # Calendar days since 1970-01-01 as floats, without a per-row toordinal()
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    return dates.to_numpy(dtype='datetime64[D]').astype('float64')
+
+
+def polynomial_basis(x, degree):
+    return np.vander(x, degree + 1, increasing=True)
+
+
+def piecewise_basis(x, knots):
+    # Continuous piecewise-linear trend: a line plus a hinge at every knot
+    return np.column_stack([np.ones_like(x), x] + [np.maximum(x - knot, 0.0) for knot in knots])
+
+
+def solve(basis, values):
+    """Least-squares coefficients of every column of `values` (n, k) on `basis` (n, p).
+
+    Returns (p, k). Missing values are left out column by column; columns with
+    fewer points than coefficients get NaN coefficients.
+    """
+    present = ~np.isnan(values)
+    if present.all():
+        return np.linalg.lstsq(basis, values, rcond=None)[0]
+    weights = present.astype('float64')
+    gram = np.einsum('ni,nk,nj->kij', basis, weights, basis)
+    rhs = np.einsum('ni,nk->ki', basis, np.where(present, values, 0.0))
+    coeffs = np.einsum('kij,kj->ki', np.linalg.pinv(gram), rhs)
+    coeffs[present.sum(axis=0) < basis.shape[1]] = np.nan
+    return coeffs.T
+
+
+class TrendFit:
+    """One trend model fitted to every column of a price frame.
+
+    `basis` maps the rescaled date axis to the design matrix. `fitted` holds the
+    trend on the input dates; predict() and slope() evaluate it anywhere else,
+    including past the last date.
+    """
+
+    def __init__(self, closes, basis):
+        closes = closes.sort_index()
+        days = day_numbers(closes.index)
+        self.columns = closes.columns
+        self.basis = basis
+        self.center = (days[0] + days[-1]) / 2
+        self.half_span = max((days[-1] - days[0]) / 2, 1.0)
+        values = closes.to_numpy(dtype='float64')
+        design = basis(self._x(days))
+        self.coeffs = solve(design, values)
+        fitted = design @ self.coeffs
+        self.fitted = pd.DataFrame(fitted, index=closes.index, columns=self.columns)
+
+        residuals = values - fitted
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ss_res = np.nansum(residuals ** 2, axis=0)
+            ss_tot = np.nansum((values - np.nanmean(values, axis=0)) ** 2, axis=0) if len(values) else ss_res
+            self.residual_std = pd.Series(np.sqrt(ss_res / np.maximum(count - design.shape[1], 1)), self.columns)
+            self.r2 = pd.Series(np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.nan), self.columns)
+        self.residuals = pd.DataFrame(residuals, index=closes.index, columns=self.columns)
+
+    def _x(self, days):
+        return (days - self.center) / self.half_span
+
+    def _at(self, days):
+        return self.basis(self._x(days)) @ self.coeffs
+
+    def predict(self, dates):
+        dates = pd.DatetimeIndex(dates)
+        return pd.DataFrame(self._at(day_numbers(dates)), index=dates, columns=self.columns)
+
+    def slope(self, dates=None):
+        # Change of the trend per calendar day (central difference, works for any basis)
+        dates = self.fitted.index if dates is None else pd.DatetimeIndex(dates)
+        days = day_numbers(dates)
+        return pd.DataFrame(self._at(days + 0.5) - self._at(days - 0.5), index=dates, columns=self.columns)
+
+
+def fit_polynomial(closes, degree=3):
+    return TrendFit(closes, lambda x: polynomial_basis(x, degree))
+
+
+def fit_piecewise(closes, segments=4):
+    # Knots split the fitted date range into `segments` equal stretches
+    knots = np.linspace(-1, 1, segments + 1)[1:-1]
+    return TrendFit(closes, lambda x: piecewise_basis(x, knots))
+
+
+def window_sums(values, window):
+    # Sum of each trailing window of `window` rows along axis 0 (also used by weather_correlation)
+    csum = np.cumsum(values, axis=0)
+    csum = np.concatenate([np.zeros((1,) + values.shape[1:]), csum])
+    return csum[window:] - csum[:-window]
+
+
+def rolling_trend(closes, window=60):
+    """Slope per calendar day of a straight line through each trailing window of `window` rows.
+
+    Computed for every ticker and row from running sums; windows with a missing
+    close are NaN.
+    """
+    closes = closes.sort_index()
+    values = closes.to_numpy(dtype='float64')
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        days = day_numbers(closes.index)
+        x = (days - days.mean())[:, None]
+        full = window_sums(np.isnan(values), window) == 0
+        y = np.nan_to_num(values)
+        sx = window_sums(x, window)
+        sy = window_sums(y, window)
+        sxx = window_sums(x ** 2, window)
+        sxy = window_sums(x * y, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            slope = (window * sxy - sx * sy) / (window * sxx - sx ** 2)
+        out[window - 1:] = np.where(full, slope, np.nan)
+    return pd.DataFrame(out, index=closes.index, columns=closes.columns)
+
+
+def trend_summary(closes, degree=3, segments=4, window=60):
+    """Per-ticker trend columns for a screen.
+
+    Slopes are annualised and relative to the trend value (percent per year);
+    trend_residual_pct is how far the last close sits above (+) or below (-) the
+    polynomial trend.
+    """
+    closes = closes.sort_index()
+    last = closes.ffill().iloc[-1]
+    poly = fit_polynomial(closes, degree)
+    piecewise = fit_piecewise(closes, segments)
+    trend_last = poly.fitted.iloc[-1]
+    annualise = DAYS_PER_YEAR * 100
+    return pd.DataFrame({
+        'trend_slope_pct': poly.slope(closes.index[-1:]).iloc[-1] / trend_last * annualise,
+        'piecewise_slope_pct': piecewise.slope(closes.index[-1:]).iloc[-1] / piecewise.fitted.iloc[-1] * annualise,
+        'rolling_slope_pct': rolling_trend(closes.ffill(), window).iloc[-1] / last * annualise,
+        'trend_residual_pct': (last / trend_last - 1) * 100,
+        'trend_r2': poly.r2,
+    })
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from trend import window_sums
+from weather_store import align_to_trading_days
+
+# Correlations between daily returns of a basket of tickers and Austin weather.
+#
+# Everything is computed on the trading-day grid: weather is rolled forward onto
+# the next session (weekend rain lands on Monday), returns are log close-to-close.
+# A lag of L sessions pairs the return on day t with the weather on day t - L, so
+# positive lags mean the weather leads the price, negative lags that it trails it.
+# All pairs (ticker x parameter) are computed at once per lag and window; rolling
+# Pearson uses running sums, rolling Spearman ranks every window in one sort.
+
+
+def prepare(prices, weather, columns=None):
+    # (returns, weather) on the same trading-day index
+    prices = prices.sort_index()
+    returns = np.log(prices).diff().iloc[1:]
+    aligned = align_to_trading_days(weather, returns.index, columns)
+    aligned = aligned.loc[:, aligned.notna().any()]
+    return returns, aligned
+
+
+def _lagged(x, y, lag):
+    # Rows of x and y that pair x[t] with y[t - lag]
+    if lag >= 0:
+        return x[lag:], y[:len(y) - lag]
+    return x[:lag], y[-lag:]
+
+
+def _pairwise_corr(x, y, min_periods):
+    # Pearson correlation of every column of x against every column of y, each pair
+    # over the rows where both are present: (nx, ny)
+    mx = ~np.isnan(x)
+    my = ~np.isnan(y)
+    x0 = np.where(mx, x, 0.0)
+    y0 = np.where(my, y, 0.0)
+    mx = mx.astype('float64')
+    my = my.astype('float64')
+    n = mx.T @ my
+    sx = x0.T @ my
+    sy = mx.T @ y0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = x0.T @ y0 - sx * sy / n
+        var_x = (x0 ** 2).T @ my - sx ** 2 / n
+        var_y = mx.T @ y0 ** 2 - sy ** 2 / n
+        r = cov / np.sqrt(var_x * var_y)
+    r[(n < min_periods) | ~(var_x > 1e-12) | ~(var_y > 1e-12)] = np.nan
+    return np.clip(r, -1, 1)
+
+
+def _centered(frame):
+    # Float array with each column's mean removed, which keeps running sums accurate
+    values = frame.to_numpy(dtype='float64')
+    if not len(values):
+        return values
+    with np.errstate(invalid='ignore'):
+        return values - np.nanmean(values, axis=0)
+
+
+def lagged_correlation(returns, weather, lags=range(31), method='pearson', min_periods=30):
+    """Full-sample correlation of every ticker with every weather column at every lag.
+
+    Returns a frame indexed by (ticker, parameter) with one column per lag. For
+    method='spearman' each column is ranked once over its whole history.
+    """
+    if method == 'spearman':
+        returns, weather = returns.rank(), weather.rank()
+    x, y = _centered(returns), _centered(weather)
+    lags = list(lags)
+    out = np.full((x.shape[1], y.shape[1], len(lags)), np.nan)
+    for k, lag in enumerate(lags):
+        xs, ys = _lagged(x, y, lag)
+        if len(xs):
+            out[:, :, k] = _pairwise_corr(xs, ys, min_periods)
+    index = pd.MultiIndex.from_product([returns.columns, weather.columns], names=['ticker', 'parameter'])
+    return pd.DataFrame(out.reshape(-1, len(lags)), index=index, columns=pd.Index(lags, name='lag'))
+
+
+def _rolling_pearson(x, y, window, lag):
+    # Rolling correlation of every column pair: (windows, nx, ny). Like pandas'
+    # rolling().corr(), a window with a missing value in either series is NaN.
+    xs, ys = _lagged(x, y, lag)
+    if len(xs) < window:
+        return np.empty((0, x.shape[1], y.shape[1]))
+    full_x = window_sums(np.isnan(xs), window) == 0
+    full_y = window_sums(np.isnan(ys), window) == 0
+    xs = np.nan_to_num(xs)
+    ys = np.nan_to_num(ys)
+    sx, sy = window_sums(xs, window), window_sums(ys, window)
+    var_x = window_sums(xs ** 2, window) - sx ** 2 / window
+    var_y = window_sums(ys ** 2, window) - sy ** 2 / window
+    sxy = window_sums(xs[:, :, None] * ys[:, None, :], window)
+    cov = sxy - sx[:, :, None] * sy[:, None, :] / window
+    var_x = np.where(full_x & (var_x > 1e-12), var_x, np.nan)
+    var_y = np.where(full_y & (var_y > 1e-12), var_y, np.nan)
+    r = cov / np.sqrt(var_x[:, :, None] * var_y[:, None, :])
+    return np.clip(r, -1, 1)
+
+
+def _window_ranks(values, window):
+    """Centered, unit-length average ranks of every trailing window: (windows, ncols, window).
+
+    Windows containing a missing value, or with no variation at all, are NaN.
+    """
+    windows = len(values) - window + 1
+    if windows <= 0:
+        return np.empty((0, values.shape[1], window))
+    missing = window_sums(np.isnan(values), window) > 0
+    # Integer codes preserve the order of the values, so a single sort of
+    # (window id, code) keys ranks every window at once; ties get their average rank
+    codes = np.unique(np.nan_to_num(values), return_inverse=True)[1].reshape(values.shape)
+    keys = sliding_window_view(codes, window, axis=0).reshape(-1, window)
+    row = np.arange(len(keys))[:, None]
+    keys = row * (int(codes.max()) + 1) + keys
+    ordered = np.sort(keys, axis=None)
+    lo = np.searchsorted(ordered, keys, side='left')
+    hi = np.searchsorted(ordered, keys, side='right')
+    ranks = (lo + hi - 1) / 2 - row * window
+    ranks = ranks - (window - 1) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ranks = ranks / np.sqrt((ranks ** 2).sum(axis=1, keepdims=True))
+    ranks = ranks.reshape(windows, values.shape[1], window)
+    ranks[missing] = np.nan
+    return ranks
+
+
+def _rolling_spearman(x_ranks, y_ranks, lag):
+    # Spearman correlation is the dot product of the normalized rank windows
+    if lag >= 0:
+        xr, yr = x_ranks[lag:], y_ranks[:len(y_ranks) - lag]
+    else:
+        xr, yr = x_ranks[:lag], y_ranks[-lag:]
+    return np.clip(np.matmul(xr, yr.transpose(0, 2, 1)), -1, 1)
+
+
+def _rolling_all(returns, weather, window, lags, method):
+    # Yields (lag, first row of `returns` the windows end at, correlations)
+    if method == 'spearman':
+        x_ranks = _window_ranks(returns.to_numpy(dtype='float64'), window)
+        y_ranks = _window_ranks(weather.to_numpy(dtype='float64'), window)
+    else:
+        x, y = _centered(returns), _centered(weather)
+    for lag in lags:
+        if method == 'spearman':
+            r = _rolling_spearman(x_ranks, y_ranks, lag)
+        else:
+            r = _rolling_pearson(x, y, window, lag)
+        yield lag, max(lag, 0) + window - 1, r
+
+
+def rolling_correlation(returns, weather, window=60, lag=0, method='pearson'):
+    # Full rolling series for every (ticker, parameter) pair at one window and lag
+    ((_, start, r),) = _rolling_all(returns, weather, window, [lag], method)
+    columns = pd.MultiIndex.from_product([returns.columns, weather.columns], names=['ticker', 'parameter'])
+    return pd.DataFrame(r.reshape(len(r), -1), index=returns.index[start:start + len(r)], columns=columns)
+
+
+def correlation_grid(returns, weather, windows=(20, 60, 120), lags=range(31), method='pearson'):
+    """Lagged full-sample and rolling correlations for the whole ticker x parameter x lag grid.
+
+    Returns a frame indexed by (ticker, parameter, lag) with the full-sample
+    correlation in 'full' and, for every window length w, the mean and standard
+    deviation of the rolling correlation in 'mean_<w>' and 'std_<w>'.
+    """
+    lags = list(lags)
+    grid = lagged_correlation(returns, weather, lags, method).stack().rename('full').to_frame()
+    shape = (returns.shape[1], weather.shape[1], len(lags))
+    for window in windows:
+        mean = np.full(shape, np.nan)
+        std = np.full(shape, np.nan)
+        for k, (lag, _, r) in enumerate(_rolling_all(returns, weather, window, lags, method)):
+            valid = (~np.isnan(r)).sum(axis=0)
+            if not valid.any():
+                continue
+            with np.errstate(invalid='ignore', divide='ignore'):
+                total = np.nansum(r, axis=0)
+                mean[:, :, k] = np.where(valid > 0, total / valid, np.nan)
+                spread = np.nansum((r - mean[:, :, k]) ** 2, axis=0)
+                std[:, :, k] = np.where(valid > 1, np.sqrt(spread / (valid - 1)), np.nan)
+        grid[f'mean_{window}'] = mean.reshape(-1)
+        grid[f'std_{window}'] = std.reshape(-1)
+    return grid
+
+
+def strongest(grid, column='full'):
+    # Per (ticker, parameter): the correlation at the lag where it is largest in size,
+    # and that lag, as two ticker x parameter frames ready for a heatmap
+    values = grid[column].dropna()
+    if values.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    best = values.abs().groupby(level=['ticker', 'parameter']).idxmax()
+    picked = values.loc[best.to_list()]
+    correlation = picked.droplevel('lag').unstack('parameter')
+    lag = pd.Series(picked.index.get_level_values('lag'), index=picked.index.droplevel('lag')).unstack('parameter')
+    return correlation, lag
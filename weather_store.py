@@ -0,0 +1,121 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import perf
+
+WEATHER_FILE = 'austin_weather.csv'
+
+# How a weather column is combined when several calendar days map onto one trading
+# day (weekends, holidays) or one bar. Anything not listed is averaged.
+AGGREGATIONS = {
+    'PrecipitationSumInches': 'sum',
+    'TempHighF': 'max',
+    'TempLowF': 'min',
+    'WindGustMPH': 'max',
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _parse(path):
+    raw = pd.read_csv(path, index_col='Date', parse_dates=['Date'], dtype=str)
+    weather = pd.DataFrame(index=raw.index.rename('Date'))
+    for column in raw.columns:
+        if column == 'Events':
+            weather[column] = raw[column].fillna('').str.strip()
+            continue
+        values = raw[column].str.strip()
+        if column == 'PrecipitationSumInches':
+            # 'T' marks a trace of rain; treat it (and missing readings) as no rain
+            weather[column] = pd.to_numeric(values, errors='coerce').fillna(0.0)
+        else:
+            # '-' marks a missing reading
+            weather[column] = pd.to_numeric(values, errors='coerce')
+    return weather.sort_index()
+
+
+def load_weather(path=WEATHER_FILE):
+    """Typed, date-indexed weather frame, parsed once per process.
+
+    The parsed frame is also pickled next to the CSV, so a fresh process only
+    re-parses when the CSV itself changes.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+        pickle_path = path + '.pkl'
+        weather = None
+        try:
+            with perf.span('fetch.weather.pickle'):
+                cached_key, weather = pd.read_pickle(pickle_path)
+            if cached_key != key[1:]:
+                weather = None
+        except (OSError, ValueError, TypeError, EOFError):
+            weather = None
+        if weather is None:
+            with perf.span('transform.weather.parse_csv'):
+                weather = _parse(path)
+            try:
+                pd.to_pickle((key[1:], weather), pickle_path)
+            except OSError:
+                pass
+        _cache.clear()
+        _cache[key] = weather
+        return weather
+
+
+def _local_dates(index):
+    # Calendar date of each bar in its own exchange timezone, as tz-naive datetime64
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize().to_numpy(dtype='datetime64[ns]')
+
+
+def align_to_trading_days(weather, trading_index, columns=None, roll='forward', how=None):
+    """As-of join of weather columns onto a price series' index.
+
+    roll='forward' assigns every calendar day to the first trading day on or after
+    it, so weekend and holiday weather lands on the next session (use this for
+    daily bars). roll='backward' assigns it to the last bar starting on or before
+    it, i.e. the weekly/monthly bar that contains it. Days that fall outside the
+    price series are dropped, and each column is aggregated per bar with
+    AGGREGATIONS (or `how`, if given). Returns a frame indexed like `trading_index`.
+    """
+    columns = [c for c in (columns or weather.columns) if c != 'Events']
+    bars = _local_dates(trading_index)
+    days = weather.index.to_numpy(dtype='datetime64[ns]')
+    if roll == 'forward':
+        position = np.searchsorted(bars, days, side='left')
+        keep = position < len(bars)
+        # Only the non-business days just before the first bar roll onto it; earlier
+        # days belong to sessions outside this series
+        if len(bars):
+            previous_session = np.busday_offset(bars[0].astype('datetime64[D]'), -1, roll='backward')
+            keep &= days > previous_session.astype('datetime64[ns]')
+    else:
+        position = np.searchsorted(bars, days, side='right') - 1
+        keep = position >= 0
+        if len(bars) > 1:
+            # Don't let weather run on indefinitely past the last bar
+            keep &= days < bars[-1] + (bars[-1] - bars[-2])
+    subset = weather.loc[keep, columns]
+    grouped = subset.groupby(position[keep])
+    aggregations = {column: how or AGGREGATIONS.get(column, 'mean') for column in columns}
+    aligned = grouped.agg(aggregations)
+    result = pd.DataFrame(index=pd.RangeIndex(len(bars)), columns=columns, dtype='float64')
+    result.loc[aligned.index, columns] = aligned.to_numpy()
+    result.index = trading_index
+    return result
+
+
+def with_prices(history, weather, columns, roll='forward'):
+    # One frame holding Close and the aligned weather columns on the price index
+    aligned = align_to_trading_days(weather, history.index, columns, roll=roll)
+    return pd.concat([history[['Close']], aligned], axis=1)
@@ -1,7 +1,11 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 
+from bar_cache import get_history
+from data_broker import broker_stats
+from fundamentals_store import get_info
+from history_loader import PERIOD_INTERVALS
+
 st.set_page_config(page_title="Financial Analysis", layout="wide")
 with st.sidebar:
     st.title("Financial Analysis")
@@ -25,25 +29,12 @@ if button:
     else: 
         try: 
             with st.spinner("Please wait..."):
-                stock = yf.Ticker(ticker)
-                info = stock.info
+                info = get_info(ticker)
 
                 st.subheader(f"{ticker} - {info.get('longName', 'N/A')}")
                 
-                if period == "1D":
-                        history = stock.history(period="1d", interval="1h")
-                elif period == "5D":
-                        history = stock.history(period="5d", interval="1d")
-                elif period == "1M":
-                        history = stock.history(period="1mo", interval="1d")
-                elif period == "6M":
-                        history = stock.history(period="6mo", interval="1wk")
-                elif period == "YTD":
-                    history = stock.history(period="ytd", interval="1mo")
-                elif period == "1Y":
-                    history = stock.history(period="1y", interval="1mo")
-                elif period == "5Y":
-                    history = stock.history(period="5y", interval="3mo")
+                history_period, interval = PERIOD_INTERVALS[period]
+                history = get_history(ticker, interval=interval, period=history_period)
                 
                 chart_data = pd.DataFrame(history["Close"])
                 st.line_chart(chart_data)
@@ -112,4 +103,7 @@ if button:
                 
         except Exception as e: 
             st.exception(f"An error occured: {e}")
-    
+
+# Requests are shared between everyone using the app in this process
+with st.sidebar.expander("Shared data cache"):
+    st.json(broker_stats())
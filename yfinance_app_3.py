@@ -1,6 +1,10 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
+import time
+
+import perf
+from comparison import align_calendar, comparison_stats, info_table, normalized_performance, stream_comparison
+from data_broker import broker_stats
+from history_loader import PERIOD_INTERVALS
 
 st.set_page_config(page_title="Financial Analysis : Compare 2 stocks", layout="wide")
 with st.sidebar:
@@ -11,21 +15,30 @@ with st.sidebar:
         ticker = st.text_input(f"Enter a stock ticker - ticker ${i + 1} (e.g. AAPL)", "AAPL")
         tickers.append(ticker)
     
+    pasted = st.text_area("Or paste any number of tickers (comma or space separated)")
+    if pasted.strip():
+        tickers = list(dict.fromkeys(pasted.replace(",", " ").upper().split()))
+        num = len(tickers)
+
     period = st.selectbox("Enter a time frame", ("5D", "1M", "6M", "YTD", "1Y", "5Y"))
+    benchmark = st.text_input("Benchmark for beta", "SPY").strip().upper()
+    view = st.radio("Chart", ("Performance (start = 100)", "Price"), horizontal=True)
     button = st.button("Submit")
+    show_timings = st.checkbox("Show timings", help="Time every fetch, transform and render step of this rerun")
 
-def format_value(value):
-    if not isinstance(value, (int, float)):
-        return value  # Return as-is if not a number
-    suffixes = ["", "K", "M", "B", "T"]
-    suffix_index = 0
-    while value >= 1000 and suffix_index < len(suffixes) - 1:
-        value /= 1000
-        suffix_index += 1
-    return f"${value:.1f}{suffixes[suffix_index]}"
+trace = perf.start("yfinance_app_3", enabled=show_timings)
 
-def format_float(value):
-    return f"${value:.2f}" if isinstance(value, (int, float)) else "N/A"
+def draw_chart(slot, closes):
+    with perf.span("transform.align", series=len(closes)):
+        aligned = align_calendar(closes, interval)
+        if view != "Price":
+            shown = normalized_performance(aligned)
+    with perf.span("render.chart", series=len(closes)):
+        if view == "Price":
+            slot.line_chart(aligned.rename(columns=lambda column: f"{column} Close"))
+        else:
+            slot.line_chart(shown)
+    return aligned
 
 if button: 
     for i in range(num):
@@ -33,102 +46,70 @@ if button:
             st.error("Please provide a valid stock ticker.")
     else: 
         try: 
-            with st.spinner("Please wait..."):
-                info = []
-                stock = []
-                for i in range(num):
-                    stock.append(yf.Ticker(tickers[i]))
-                    info.append(stock[i].info)
-                
-                histories = []   # List to store the history data for each stock
-
-                for i in range(num):  # Run twice, once for each stock
-                    current_stock = stock[i]  # Get the current stock
-                    if period == "5D":
-                        histories.append(current_stock.history(period="5d", interval="1d"))
-                    elif period == "1M":
-                        histories.append(current_stock.history(period="1mo", interval="1d"))
-                    elif period == "6M":
-                        histories.append(current_stock.history(period="6mo", interval="1wk"))
-                    elif period == "YTD":
-                        histories.append(current_stock.history(period="ytd", interval="1mo"))
-                    elif period == "1Y":
-                        histories.append(current_stock.history(period="1y", interval="1mo"))
-                    elif period == "5Y":
-                        histories.append(current_stock.history(period="5y", interval="3mo"))
-                
-                chart_data = pd.DataFrame()
-                for ticker, history in zip(tickers, histories):
-                    chart_data[f"{ticker} Close"] = history["Close"]
-                
-                # The below line will help you check if the trading hours are the same. For example: it is not same for AAPL and SMSN.IL
-                # st.write("Chart Data", chart_data)
-                st.line_chart(chart_data)
-
-                for i in range(num):
-                    with st.container():
-                        st.subheader(f"{tickers[i]} - {info[i].get('longName', 'N/A')}")
-                        col1, col2, col3 = st.columns(3)
-                        # Display tables for ticker1
-                        country = info[i].get('country', 'N/A')
-                        sector = info[i].get('sector', 'N/A')
-                        industry = info[i].get('industry', 'N/A')
-                        market_cap = info[i].get('marketCap', 'N/A')
-                        ent_value = info[i].get('enterpriseValue', 'N/A')
-                        employees = info[i].get('fullTimeEmployees', 'N/A')
-
-                        stock_info = [
-                            ("Stock Info", "Value"),
-                            ("Country", country),
-                            ("Sector", sector),
-                            ("Industry", industry),
-                            ("Market Cap", format_value(market_cap)),
-                            ("Enterprise Value", format_value(ent_value)),
-                            ("Employees", employees)
-                        ]
-
-                        df = pd.DataFrame(stock_info[1:], columns=stock_info[0])
-                        col1.dataframe(df, width=400, hide_index=True)
+            tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+            interval = PERIOD_INTERVALS[period][1]
+            # The benchmark only needs its history (for beta), not an info request
+            extra = [benchmark] if benchmark and benchmark not in tickers else []
 
-                        current_price = info[i].get('currentPrice', 'N/A')
-                        prev_close = info[i].get('previousClose', 'N/A')
-                        day_high = info[i].get('dayHigh', 'N/A')
-                        day_low = info[i].get('dayLow', 'N/A')
-                        ft_week_high = info[i].get('fiftyTwoWeekHigh', 'N/A')
-                        ft_week_low = info[i].get('fiftyTwoWeekLow', 'N/A')
+            # Everything is drawn into placeholders as it arrives: the chart gains a line
+            # per history, the combined table fills in a column per info record. The
+            # chart is redrawn at most a few times a second however many tickers land.
+            chart = st.empty()
+            stats_area = st.container()
+            table = st.empty()
+            progress = st.progress(0.0, text="Fetching...")
+            table.dataframe(info_table({}, tickers))
 
-                        price_info = [
-                            ("Price Info", "Value"),
-                            ("Current Price", format_float(current_price)),
-                            ("Previous Close", format_float(prev_close)),
-                            ("Day High", format_float(day_high)),
-                            ("Day Low", format_float(day_low)),
-                            ("52 Week High", format_float(ft_week_high)),
-                            ("52 Week Low", format_float(ft_week_low)),
-                        ]
+            closes, infos = {}, {}
+            total, drawn = 2 * len(tickers) + len(extra), 0.0
+            for done, (kind, ticker, result, error) in enumerate(
+                    stream_comparison(tickers, period, history_only=extra), start=1):
+                progress.progress(done / total, text=f"Fetched {done}/{total}")
+                if kind == "history":
+                    if error is not None:
+                        st.warning(f"Could not load history for {ticker}: {error}")
+                    else:
+                        closes[ticker] = result
+                        if time.monotonic() - drawn > 0.25:
+                            # Trading hours and holidays differ between exchanges (e.g. AAPL vs
+                            # SMSN.IL), so every series is put on one calendar before charting
+                            draw_chart(chart, closes)
+                            drawn = time.monotonic()
+                else:
+                    if error is not None:
+                        st.warning(f"Could not load info for {ticker}: {error}")
+                    infos[ticker] = result or {}
+                    with perf.span("render.info_table", ticker=ticker):
+                        table.dataframe(info_table(infos, tickers))
+            progress.empty()
+            aligned = draw_chart(chart, closes) if closes else None
 
-                        df = pd.DataFrame(price_info[1:], columns=price_info[0])
-                        col2.dataframe(df, width=400, hide_index=True)
-
-                        forward_eps = info[i].get('forwardEps', 'N/A')
-                        forward_pe = info[i].get('forwardPE', 'N/A')
-                        peg_ratio = info[i].get('pegRatio', 'N/A')
-                        dividend_rate = info[i].get('dividendRate', 'N/A')
-                        dividend_yield = info[i].get('dividendYield', 'N/A')
-                        recommendation = info[i].get('recommendationKey', 'N/A')
-
-                        biz_metrics = [
-                            ("Business Metrics", "Value"),
-                            ("EPS (FWD)", format_float(forward_eps)),
-                            ("P/E (FWD)", format_float(forward_pe)),
-                            ("PEG Ratio", format_float(peg_ratio)),
-                            ("Div Rate (FWD)", format_float(dividend_rate)),
-                            ("Div Yield (FWD)", f"{dividend_yield * 100:.2f}%" if isinstance(dividend_yield, (int, float)) else "N/A"),
-                            ("Recommendation", recommendation.capitalize())
-                        ]
-
-                        df = pd.DataFrame(biz_metrics[1:], columns=biz_metrics[0])
-                        col3.dataframe(df, width=400, hide_index=True)
+            if aligned is not None and aligned.shape[1] > 1:
+                with perf.span("transform.stats", tickers=aligned.shape[1]):
+                    stats = comparison_stats(aligned, benchmark=benchmark, interval=interval)
+                summary = stats["summary"].rename(columns={
+                    "total_return": "Return", "annual_return": "Annualised Return",
+                    "annual_volatility": "Annualised Volatility", "max_drawdown": "Max Drawdown",
+                    "observations": "Bars", "beta": f"Beta vs {benchmark}", "correlation": f"Correlation vs {benchmark}"})
+                percent = ["Return", "Annualised Return", "Annualised Volatility", "Max Drawdown"]
+                ratios = [c for c in (f"Beta vs {benchmark}", f"Correlation vs {benchmark}")
+                          if benchmark and c in summary.columns]
+                with stats_area, perf.span("render.stats"):
+                    st.dataframe(summary.style.format("{:.1%}", subset=percent, na_rep="N/A")
+                                 .format("{:.2f}", subset=ratios, na_rep="N/A"))
+                    with st.expander("Correlation of returns"):
+                        st.dataframe(stats["correlation"].style.format("{:.2f}", na_rep="")
+                                     .background_gradient(cmap="RdBu_r", vmin=-1, vmax=1))
+                    with st.expander("Annualised covariance of returns"):
+                        st.dataframe(stats["covariance"].style.format("{:.4f}", na_rep=""))
 
         except Exception as e: 
             st.exception(f"An error occurred: {e}")
+
+# Requests are shared between everyone using the app in this process
+with st.sidebar.expander("Shared data cache"):
+    st.json(broker_stats())
+
+perf.finish(trace)
+if show_timings:
+    perf.show_panel(trace)
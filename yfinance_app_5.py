@@ -1,9 +1,12 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 
+from bar_cache import get_history
+from fundamentals_store import get_info
+from plotting import price_and_precipitation, render_png
+from weather_store import load_weather, with_prices
+
 st.set_page_config(page_title="Financial Analysis", layout="wide")
 with st.sidebar:
     st.title("Financial Analysis with Texas Precipitation : We are in 2017-7-31")
@@ -11,18 +14,9 @@ with st.sidebar:
     period = st.selectbox("Enter a time frame", ("5D", "1M", "6M"))
     button = st.button("Submit")
 
-# Load the dataset
+# Load the dataset (parsed and typed once per process, see weather_store.py)
 file_path = 'austin_weather.csv'
-df_p = pd.read_csv(file_path)
-
-# Convert the 'Date' column to datetime format
-df_p['Date'] = pd.to_datetime(df_p['Date'])
-
-# Set the 'Date' column as the index
-df_p.set_index('Date', inplace=True)
-
-# Keep only the 'PrecipitationSumInches' column
-df_p = df_p[['PrecipitationSumInches']]
+df_p = load_weather(file_path)
 
 def format_value(value):
     if isinstance(value, (int, float)):
@@ -35,8 +29,7 @@ if button:
     else: 
         try: 
             with st.spinner("Please wait..."):
-                stock = yf.Ticker(ticker)
-                info = stock.info
+                info = get_info(ticker)
 
                 st.subheader(f"{ticker} - {info.get('longName', 'N/A')}")
                 
@@ -44,35 +37,26 @@ if button:
 
                 if period == "5D":
                     end_date = start_date - timedelta(days=5)
-                    history = stock.history(start=end_date, end=start_date, interval="1d")
-                    precipitation_data = df_p.last("5D")
+                    interval = "1d"
                 elif period == "1M":
                     end_date = start_date - timedelta(days=30)
-                    history = stock.history(start=end_date, end=start_date, interval="1d")
-                    precipitation_data = df_p.last("1M")
+                    interval = "1d"
                 elif period == "6M":
                     end_date = start_date - timedelta(days=180)
-                    history = stock.history(start=end_date, end=start_date, interval="1wk")
-                    precipitation_data = df_p.last("6M")
-
-                # Plot with dual y-axes
-                fig, ax1 = plt.subplots(figsize=(10, 5))
-
-                # Plot Close Price on the first y-axis
-                ax1.set_xlabel("Date")
-                ax1.set_ylabel("Close Price", color="blue")
-                ax1.plot(history["Close"], color="blue", label="Close Price")
-                ax1.tick_params(axis="y", labelcolor="blue")
-
-                # Plot Precipitation on the second y-axis
-                ax2 = ax1.twinx()
-                ax2.set_ylabel("Precipitation (Inches)", color="black")
-                ax2.plot(precipitation_data["PrecipitationSumInches"], color="pink", label="Precipitation")
-                ax2.tick_params(axis="y", labelcolor="pink")
-
-                # Add a title and display the plot in Streamlit
-                fig.suptitle(f"{ticker} Close Price and Precipitation Data")
-                st.pyplot(fig)
+                    interval = "1wk"
+                history = get_history(ticker, interval=interval, start=end_date, end=start_date)
+
+                # Precipitation summed onto the price bars: weekend/holiday rain rolls forward
+                # onto the next session for daily bars, and is totalled per weekly/monthly bar
+                chart_data = with_prices(history, df_p, ["PrecipitationSumInches"],
+                                         roll="forward" if interval == "1d" else "backward")
+
+                # Dual y-axes chart, decimated to the figure width and cached as a PNG
+                st.image(render_png(price_and_precipitation, chart_data,
+                                    title=f"{ticker} Close Price and Precipitation Data"), width="stretch")
+                if len(chart_data) >= 10:
+                    correlation = chart_data["Close"].pct_change().corr(chart_data["PrecipitationSumInches"])
+                    st.caption(f"Correlation of {interval} returns with precipitation over the window: {correlation:.2f}")
 
                 col1, col2, col3 = st.columns(3)
 
@@ -1,9 +1,16 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 
+import perf
+from bar_cache import get_history
+from fundamentals_store import get_info
+from history_loader import load_histories
+from plotting import price_and_precipitation, render_png
+from rollups import RollupPyramid
+from weather_correlation import correlation_grid, prepare, strongest
+from weather_store import align_to_trading_days, load_weather
+
 st.set_page_config(page_title="Financial Analysis", layout="wide")
 with st.sidebar:
     st.title("Financial Analysis with Texas Precipitation : We are in 2017-7-31")
@@ -11,18 +18,66 @@ with st.sidebar:
     period = st.selectbox("Enter a time frame", ("5D", "1M", "6M", "YTD", "2Y", "3Y"))
     button = st.button("Submit")
 
-# Load the dataset
-file_path = 'austin_weather.csv'
-df_p = pd.read_csv(file_path)
-
-# Convert the 'Date' column to datetime format
-df_p['Date'] = pd.to_datetime(df_p['Date'])
+    st.divider()
+    st.subheader("Weather correlation study")
+    basket = st.text_input("Tickers (comma separated)", "ADM, BG, DE, MOS, CORN, WEAT, SOYB, DBA, XOM, CVX")
+    method = st.selectbox("Correlation", ("pearson", "spearman"))
+    windows = st.multiselect("Rolling windows (sessions)", [20, 60, 120, 250], default=[20, 60])
+    max_lag = st.slider("Max lead/lag (sessions)", 0, 30, 10)
+    study = st.checkbox("Show correlation study")
+    st.divider()
+    show_timings = st.checkbox("Show timings", help="Time every fetch, transform and render step of this rerun")
 
-# Set the 'Date' column as the index
-df_p.set_index('Date', inplace=True)
+trace = perf.start("yfinance_app_5_IMPROVED", enabled=show_timings)
 
-# Keep only the 'PrecipitationSumInches' column
-df_p = df_p[['PrecipitationSumInches']]
+# Load the dataset (parsed and typed once per process, see weather_store.py)
+file_path = 'austin_weather.csv'
+with perf.span("fetch.weather"):
+    df_p = load_weather(file_path)
+start_date = datetime(2017, 7, 31)
+
+# Timeframe -> (rollup level, days of history shown)
+TIMEFRAMES = {"5D": ("D", 5), "1M": ("D", 30), "6M": ("W", 180), "YTD": ("M", 365), "2Y": ("M", 730), "3Y": ("M", 1095)}
+LEVEL_NAMES = {"D": "daily", "W": "weekly", "M": "monthly", "Q": "quarterly"}
+
+# Daily/weekly/monthly/quarterly rollups are built once; each timeframe is then a
+# slice of the right level instead of a fresh resample or a separate download
+@st.cache_resource
+def weather_pyramid():
+    return RollupPyramid(df_p, kind="weather")
+
+@st.cache_resource
+def price_pyramid(ticker):
+    return RollupPyramid(get_history(ticker, interval="1d", start=df_p.index[0], end=start_date), kind="price")
+
+# Every ticker x weather column x lag x window of the basket in one pass; cached per
+# set of inputs so switching the heatmap statistic doesn't recompute anything
+@st.cache_data(show_spinner=False)
+def correlation_study(tickers, method, windows, max_lag):
+    prices, failures = load_histories(tickers, start=df_p.index[0], end=start_date + timedelta(days=1))
+    if prices.empty:
+        return pd.DataFrame(), failures
+    returns, weather = prepare(prices, df_p)
+    return correlation_grid(returns, weather, windows, range(-max_lag, max_lag + 1), method), failures
+
+def heatmap(fig, frame, labels, title):
+    limit = max(float(frame.abs().max().max()), 0.05)
+    ax = fig.add_subplot()
+    image = ax.imshow(frame.to_numpy(dtype=float), cmap="RdBu_r", vmin=-limit, vmax=limit, aspect="auto")
+    ax.set_xticks(range(frame.shape[1]), frame.columns, rotation=60, ha="right")
+    ax.set_yticks(range(frame.shape[0]), frame.index)
+    if labels is not None:
+        for (i, j), value in pd.DataFrame(labels).stack().items():
+            ax.text(frame.columns.get_loc(j), frame.index.get_loc(i), f"{value:g}", ha="center", va="center", fontsize=7)
+    fig.colorbar(image, ax=ax)
+    ax.set_title(title)
+    fig.tight_layout()
+
+def show_heatmap(frame, title, labels=None):
+    # Rendered once per (data, title) and served from the figure cache afterwards
+    figsize = (max(6, 0.5 * frame.shape[1] + 2), max(3, 0.4 * frame.shape[0] + 1.5))
+    with perf.span("render.heatmap", rows=frame.shape[0], columns=frame.shape[1]):
+        st.image(render_png(heatmap, frame, labels, figsize=figsize, title=title), width="stretch")
 
 def format_value(value):
     if isinstance(value, (int, float)):
@@ -35,57 +90,45 @@ if button:
     else: 
         try: 
             with st.spinner("Please wait..."):
-                stock = yf.Ticker(ticker)
-                info = stock.info
+                info = get_info(ticker)
 
                 st.subheader(f"{ticker} - {info.get('longName', 'N/A')}")
                 
-                start_date = datetime(2017, 7, 31)
-                df_p['PrecipitationSumInches'] = pd.to_numeric(df_p['PrecipitationSumInches'], errors='coerce').fillna(0)
-
-                if period == "5D":
-                    end_date = start_date - timedelta(days=5)
-                    history = stock.history(start=end_date, end=start_date, interval="1d")
-                    precipitation_data = df_p.last("5D")
-                elif period == "1M":
-                    end_date = start_date - timedelta(days=30)
-                    history = stock.history(start=end_date, end=start_date, interval="1d")
-                    precipitation_data = df_p.last("1M")
-                elif period == "6M":
-                    end_date = start_date - timedelta(days=180)
-                    history = stock.history(start=end_date, end=start_date, interval="1wk")
-                    precipitation_data = df_p.last("6M")
-                elif period == "YTD":
-                    end_date = start_date - timedelta(days=365)
-                    history = stock.history(start=end_date, end=start_date, interval="1mo")
-                    precipitation_data = df_p.last("1Y").resample("M").mean()  # Monthly average for the last 1 year
-                elif period == "2Y":
-                    end_date = start_date - timedelta(days=730)
-                    history = stock.history(start=end_date, end=start_date, interval="1mo")
-                    precipitation_data = df_p.last("2Y").resample("M").mean()  # Monthly average for the last 2 years
-                elif period == "3Y":
-                    end_date = start_date - timedelta(days=1095)
-                    history = stock.history(start=end_date, end=start_date, interval="1mo")
-                    precipitation_data = df_p.last("5Y").resample("M").mean() 
-
-                # Plot with dual y-axes
-                fig, ax1 = plt.subplots(figsize=(10, 5))
-
-                # Plot Close Price on the first y-axis
-                ax1.set_xlabel("Date")
-                ax1.set_ylabel("Close Price", color="blue")
-                ax1.plot(history["Close"], color="blue", label="Close Price")
-                ax1.tick_params(axis="y", labelcolor="blue")
-
-                # Plot Precipitation on the second y-axis
-                ax2 = ax1.twinx()
-                ax2.set_ylabel("Precipitation (Inches)", color="black")
-                ax2.plot(precipitation_data["PrecipitationSumInches"], color="pink", label="Precipitation")
-                ax2.tick_params(axis="y", labelcolor="pink")
-
-                # Add a title and display the plot in Streamlit
-                fig.suptitle(f"{ticker} Close Price and Precipitation Data")
-                st.pyplot(fig)
+                level, days = TIMEFRAMES[period]
+                end_date = start_date - timedelta(days=days)
+
+                # Fold in any bars the cache has gained since the pyramid was built
+                with perf.span("fetch.price_pyramid", ticker=ticker):
+                    prices = price_pyramid(ticker)
+                latest = get_history(ticker, interval="1d", start=df_p.index[0], end=start_date)
+                with perf.span("transform.prices", level=level):
+                    prices.update_tail(latest)
+                    price_bars = prices.slice(level, end_date, start_date)["Close"]
+
+                with perf.span("transform.chart_data", level=level):
+                    if level == "D":
+                        # Daily: weekend/holiday rain rolls forward onto the next session
+                        window = df_p.loc[end_date - timedelta(days=4):start_date]
+                        precipitation = align_to_trading_days(window, price_bars.index.to_timestamp(),
+                                                              ["PrecipitationSumInches"])["PrecipitationSumInches"]
+                    else:
+                        # Weekly/monthly: both pyramids share the same period labels. Rain is the
+                        # bucket's daily mean, as the original monthly views plotted it
+                        precipitation = weather_pyramid().slice(level, end_date, start_date)[("PrecipitationSumInches", "mean")]
+                        precipitation = precipitation.reindex(price_bars.index)
+                    chart_data = pd.DataFrame({"Close": price_bars.to_numpy(),
+                                               "PrecipitationSumInches": precipitation.to_numpy()},
+                                              index=price_bars.index.to_timestamp())
+                interval = LEVEL_NAMES[level]
+
+                # Dual y-axes chart, decimated to the figure width and cached as a PNG
+                with perf.span("render.chart", bars=len(chart_data)):
+                    st.image(render_png(price_and_precipitation, chart_data,
+                                        title=f"{ticker} Close Price and Precipitation Data"), width="stretch")
+                if len(chart_data) >= 10:
+                    with perf.span("transform.correlation"):
+                        correlation = chart_data["Close"].pct_change().corr(chart_data["PrecipitationSumInches"])
+                    st.caption(f"Correlation of {interval} returns with precipitation over the window: {correlation:.2f}")
 
                 col1, col2, col3 = st.columns(3)
 
@@ -99,7 +142,8 @@ if button:
                     ("Enterprise Value", format_value(info.get('enterpriseValue', 'N/A'))),
                     ("Employees", info.get('fullTimeEmployees', 'N/A'))
                 ]
-                col1.dataframe(pd.DataFrame(stock_info[1:], columns=stock_info[0]), width=400, hide_index=True)
+                with perf.span("render.table", table="stock_info"):
+                    col1.dataframe(pd.DataFrame(stock_info[1:], columns=stock_info[0]), width=400, hide_index=True)
 
                 # Price Info Table
                 price_info = [
@@ -111,7 +155,8 @@ if button:
                     ("52 Week High", format_value(info.get('fiftyTwoWeekHigh', 'N/A'))),
                     ("52 Week Low", format_value(info.get('fiftyTwoWeekLow', 'N/A')))
                 ]
-                col2.dataframe(pd.DataFrame(price_info[1:], columns=price_info[0]), width=400, hide_index=True)
+                with perf.span("render.table", table="price_info"):
+                    col2.dataframe(pd.DataFrame(price_info[1:], columns=price_info[0]), width=400, hide_index=True)
 
                 # Business Metrics Table
                 biz_metrics = [
@@ -123,7 +168,36 @@ if button:
                     ("Div Yield (FWD)", f"{info.get('dividendYield', 'N/A') * 100:.2f}%" if isinstance(info.get('dividendYield'), (int, float)) else "N/A"),
                     ("Recommendation", info.get('recommendationKey', 'N/A').capitalize() if info.get('recommendationKey') else "N/A")
                 ]
-                col3.dataframe(pd.DataFrame(biz_metrics[1:], columns=biz_metrics[0]), width=400, hide_index=True)
+                with perf.span("render.table", table="biz_metrics"):
+                    col3.dataframe(pd.DataFrame(biz_metrics[1:], columns=biz_metrics[0]), width=400, hide_index=True)
                 
         except Exception as e: 
             st.exception(f"An error occurred: {e}")
+
+if study:
+    tickers = tuple(dict.fromkeys(t.strip().upper() for t in basket.split(",") if t.strip()))
+    if not tickers or not windows:
+        st.error("Please provide at least one ticker and one rolling window.")
+    else:
+        with st.spinner("Correlating weather with the basket..."), \
+                perf.span("transform.correlation_study", tickers=len(tickers)):
+            grid, failures = correlation_study(tickers, method, tuple(sorted(windows)), max_lag)
+        for failed, reason in failures.items():
+            st.warning(f"{failed}: {reason}")
+        if not grid.empty:
+            st.subheader("Weather vs. daily returns")
+            statistics = {"full": "Whole period"}
+            statistics.update({f"mean_{w}": f"Mean {w}-session rolling" for w in sorted(windows)})
+            statistic = st.radio("Statistic", list(statistics), format_func=statistics.get, horizontal=True)
+            with perf.span("transform.strongest"):
+                correlation, lag = strongest(grid, statistic)
+            show_heatmap(correlation, f"Strongest {method} correlation over lags -{max_lag}..{max_lag}", lag)
+            st.caption("Numbers are the lag in trading sessions: positive means the weather leads the price.")
+
+            profile_ticker = st.selectbox("Lag profile for", correlation.index)
+            profile = grid[statistic].xs(profile_ticker, level="ticker").unstack("lag")
+            show_heatmap(profile, f"{profile_ticker}: {statistics[statistic].lower()} correlation by lag")
+
+perf.finish(trace)
+if show_timings:
+    perf.show_panel(trace)
@@ -1,9 +1,14 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import os
+import numpy as np
 from datetime import datetime
-import matplotlib.pyplot as plt
+
+import stock_store
+from backtester import (ma_crossover_signals, threshold_signals, positions_from_signals,
+                        position_sizes, run_backtest)
+from pl_engine import DateIndex, best_trade, holding_period_pl, return_distribution
+from fundamentals_store import get_info
+from plotting import decimate, plot_width, render_png
 
 # Custom CSS to change background and text colors
 st.markdown(
@@ -17,58 +22,66 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Paths
-data_folder = 'Stock_data/Stocks'
+# Stock list comes from the columnar store's manifest (see stock_store.py), built once
+# per server process instead of listing the data folder on every rerun
+@st.cache_data
+def list_stocks():
+    return stock_store.list_tickers()
 
-# Helper function to load data for a specific stock
-def load_stock_data(stock_file):
-    file_path = os.path.join(data_folder, stock_file)
-    return pd.read_csv(file_path, delimiter=',', parse_dates=['Date'])
+# Helper function to load data for a specific stock (only the columns used below)
+def load_stock_data(stock_name):
+    return stock_store.load_series(stock_name, columns=['Date', 'Close'])
 
 # UI for selecting stock and dates
 st.title("Stock Profit/Loss Calculator")
 
 # Step 1: Select Stock
-stock_files = [f for f in os.listdir(data_folder) if f.endswith('.txt')]
-stock_names = [f.replace('.txt', '') for f in stock_files]
+stock_names = list_stocks()
 selected_stock = st.selectbox("Select a stock to buy", stock_names)
 
-# Fetch the company name using yfinance
-ticker = yf.Ticker(selected_stock[:-3])
-company_name = ticker.info.get('longName', 'Unknown Company')
+# Fetch the company name (read through the local fundamentals store)
+try:
+    company_name = get_info(selected_stock[:-3], fields=['longName']).get('longName', 'Unknown Company')
+except Exception as e:
+    company_name = 'Unknown Company'
+    st.warning(f"Could not look up the company name: {e}")
 st.write(f"**Selected Company**: {company_name}")
 
-# Load selected stock data
-stock_data = load_stock_data(f"{selected_stock}.txt")
-stock_data['Year'] = stock_data['Date'].dt.year
-stock_data['Month'] = stock_data['Date'].dt.month
-stock_data['Day'] = stock_data['Date'].dt.day
+# Load selected stock data and build its sorted date index once per stock
+@st.cache_resource
+def load_date_index(stock_name):
+    stock_data = load_stock_data(stock_name)
+    return stock_data, DateIndex(stock_data['Date'], stock_data['Close'])
+
+stock_data, date_index = load_date_index(selected_stock)
+calendar = date_index.calendar()
 
 # Step 2: Select Units
 units = st.number_input("Enter the number of units to buy", min_value=1, step=1)
-years = list(stock_data['Year'].unique())
+years = list(calendar)
 min_year_index = years.index(min(years))
 
 # Step 3: Select Purchase Date
 purchase_year = st.selectbox("Select the purchase year", years, index = min_year_index)
-purchase_month = st.selectbox("Select the purchase month", stock_data[stock_data['Year'] == purchase_year]['Month'].unique())
-purchase_day = st.selectbox("Select the purchase day", stock_data[(stock_data['Year'] == purchase_year) & (stock_data['Month'] == purchase_month)]['Day'].unique())
+purchase_month = st.selectbox("Select the purchase month", list(calendar[purchase_year]))
+purchase_day = st.selectbox("Select the purchase day", calendar[purchase_year][purchase_month])
 purchase_date = datetime(purchase_year, purchase_month, purchase_day)
 
 # Step 4: Select Selling Date
 filtered_years = [year for year in years if year>=purchase_year]
 max_year_index = filtered_years.index(max(filtered_years))
 selling_year = st.selectbox("Select the selling year", filtered_years, max_year_index)
-selling_month = st.selectbox("Select the selling month", stock_data[stock_data['Year'] == selling_year]['Month'].unique())
-selling_day = st.selectbox("Select the selling day", stock_data[(stock_data['Year'] == selling_year) & (stock_data['Month'] == selling_month)]['Day'].unique())
+selling_month = st.selectbox("Select the selling month", list(calendar[selling_year]))
+selling_day = st.selectbox("Select the selling day", calendar[selling_year][selling_month])
 selling_date = datetime(selling_year, selling_month, selling_day)
 
 # Filter the data between purchase and selling dates
-filtered_data = stock_data[(stock_data['Date'] >= purchase_date) & (stock_data['Date'] <= selling_date)]
+held = date_index.between(purchase_date, selling_date)
+filtered_data = stock_data.iloc[held]
 
 # Calculate profit or loss
-purchase_price = stock_data.loc[stock_data['Date'] == purchase_date, 'Close'].values[0]
-selling_price = stock_data.loc[stock_data['Date'] == selling_date, 'Close'].values[0]
+purchase_price = date_index.price_at(purchase_date)
+selling_price = date_index.price_at(selling_date)
 profit_loss = (selling_price - purchase_price) * units
 
 st.write(f"**Purchase Price**: ${purchase_price}")
@@ -77,12 +90,92 @@ st.write(f"**Units**: {units}")
 st.write(f"**Net Profit/Loss** (in USD ($)): {profit_loss:.2f}")
 
 # Display line chart for the stock performance between purchase and selling dates
-fig, ax = plt.subplots(figsize=(10, 5))
-ax.plot(filtered_data['Date'], filtered_data['Close'], color="blue", label="Close Price")
-ax.axvline(purchase_date, color="green", linestyle="--", label="Purchase Date")
-ax.axvline(selling_date, color="red", linestyle="--", label="Selling Date")
-ax.set_xlabel("Date")
-ax.set_ylabel("Close Price")
-ax.set_title(f"{company_name} ({selected_stock}) Stock Performance")
-ax.legend()
-st.pyplot(fig)
+# (decimated to the chart width, so decades of history draw as fast as a month)
+def performance_chart(fig, prices, purchase_date, selling_date, title):
+    ax = fig.add_subplot()
+    ax.plot(decimate(prices, plot_width(fig, 0.8)), color="blue", label="Close Price")
+    ax.axvline(purchase_date, color="green", linestyle="--", label="Purchase Date")
+    ax.axvline(selling_date, color="red", linestyle="--", label="Selling Date")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Close Price")
+    ax.set_title(title)
+    ax.legend()
+
+prices = pd.Series(filtered_data['Close'].to_numpy(), index=pd.DatetimeIndex(filtered_data['Date']))
+st.image(render_png(performance_chart, prices, purchase_date=purchase_date, selling_date=selling_date,
+                    title=f"{company_name} ({selected_stock}) Stock Performance"), width="stretch")
+
+# Histogram of holding-period returns, drawn in the range analytics below
+def histogram_chart(fig, counts, edges, holding_days):
+    ax = fig.add_subplot()
+    ax.bar(edges[:-1] * 100, counts, width=(edges[1] - edges[0]) * 100, align="edge", color="blue")
+    ax.set_xlabel(f"{holding_days}-day return (%)")
+    ax.set_ylabel("Entry dates")
+
+# Range analytics over the selected window, each computed in one vectorized pass
+st.subheader("Range Analytics")
+window_dates = date_index.dates[held]
+window_prices = date_index.prices[held]
+if len(window_prices) >= 2:
+    buy, sell, best_profit = best_trade(window_prices)
+    st.write(f"**Best Buy/Sell Pair**: buy {pd.Timestamp(window_dates[buy]).date()} at ${window_prices[buy]:.2f}, "
+             f"sell {pd.Timestamp(window_dates[sell]).date()} at ${window_prices[sell]:.2f} "
+             f"(P/L {best_profit * units:.2f})")
+
+    holding_days = st.number_input("Holding period (trading days)", min_value=1,
+                                   max_value=len(window_prices) - 1, value=min(20, len(window_prices) - 1))
+    pl = holding_period_pl(window_prices, holding_days, units)
+    st.line_chart(pd.DataFrame({f"P/L of a {holding_days}-day hold": pl},
+                               index=pd.DatetimeIndex(window_dates[:len(pl)], name="Entry Date")))
+
+    distribution = return_distribution(window_prices, holding_days)
+    st.write(f"**{holding_days}-day returns over {distribution['count']} entry dates**: "
+             f"mean {distribution['mean']:.2%}, median {distribution['median']:.2%}, "
+             f"win rate {distribution['win_rate']:.0%}, 5th-95th percentile "
+             f"{distribution['p05']:.2%} to {distribution['p95']:.2%}")
+    counts, edges = distribution['histogram']
+    st.image(render_png(histogram_chart, counts, edges, figsize=(10, 3), holding_days=holding_days), width="stretch")
+
+# Strategy tester: rule-based backtest over the same window, fully vectorized so it
+# reruns instantly whenever a widget changes
+st.subheader("Strategy Tester")
+strategy = st.selectbox("Strategy", ("Moving average crossover", "Price thresholds"))
+if strategy == "Moving average crossover":
+    fast_window = st.number_input("Fast moving average (days)", min_value=2, value=20, step=1)
+    slow_window = st.number_input("Slow moving average (days)", min_value=3, value=50, step=1)
+    entries, exits = ma_crossover_signals(window_prices, fast_window, slow_window)
+else:
+    # Defaults from the window's quartiles; an empty window (selling on or before the
+    # purchase date) falls back to the last close
+    reference = window_prices if len(window_prices) >= 2 else date_index.prices[-1:]
+    entry_price = st.number_input("Buy when the close falls to ($)", min_value=0.0,
+                                  value=float(np.percentile(reference, 25)))
+    exit_price = st.number_input("Sell when the close reaches ($)", min_value=0.0,
+                                 value=float(np.percentile(reference, 75)))
+    entries, exits = threshold_signals(window_prices, entry_price, exit_price)
+
+col1, col2, col3, col4 = st.columns(4)
+stop_loss = col1.number_input("Stop-loss (%)", min_value=0.0, value=0.0, help="0 = off")
+take_profit = col2.number_input("Take-profit (%)", min_value=0.0, value=0.0, help="0 = off")
+fee = col3.number_input("Fee per trade (%)", min_value=0.0, value=0.1)
+fraction = col4.number_input("Capital per trade (%)", min_value=1.0, max_value=100.0, value=100.0)
+
+if len(window_prices) >= 2:
+    position = positions_from_signals(window_prices, entries, exits,
+                                      stop_loss=stop_loss / 100 or None, take_profit=take_profit / 100 or None)
+    backtest, stats = run_backtest(window_dates, window_prices, position,
+                                   sizes=position_sizes(window_prices, fraction / 100), fee=fee / 100,
+                                   initial_capital=float(purchase_price * units))
+    st.line_chart(backtest[["Equity", "Buy & Hold"]])
+    stats_table = [
+        ("Metric", "Value"),
+        ("Total Return", f"{stats['total_return']:.2%}"),
+        ("Buy & Hold Return", f"{stats['buy_hold_return']:.2%}"),
+        ("CAGR", f"{stats['cagr']:.2%}"),
+        ("Max Drawdown", f"{stats['max_drawdown']:.2%}"),
+        ("Sharpe", f"{stats['sharpe']:.2f}"),
+        ("Trades", f"{stats['trades']}"),
+        ("Win Rate", f"{stats['win_rate']:.0%}" if stats['trades'] else "N/A"),
+        ("Time in Market", f"{stats['exposure']:.0%}"),
+    ]
+    st.dataframe(pd.DataFrame(stats_table[1:], columns=stats_table[0]), width=400, hide_index=True)
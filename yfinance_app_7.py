@@ -1,6 +1,12 @@
-import yfinance as yf
 import streamlit as st
 import pandas as pd
+import time
+
+from factors import FACTORS, compute_factors
+from fundamentals_store import get_store, iter_infos
+from history_loader import load_histories
+from screener_engine import INFO_COLUMNS, build_metrics, screen
+from trend import trend_summary
 
 tickers = ['MMM', 'AOS', 'ABT', 'ABBV', 'ACN', 'ADBE', 'AMD', 'AES', 'AFL', 'A', 'APD', 'ABNB', 
            'AKAM', 'ALB', 'ARE', 'ALGN', 'ALLE', 'LNT', 'ALL', 'GOOGL', 'GOOG', 'MO', 'AMZN', 
@@ -32,28 +38,76 @@ st.title("Stock Screener")
 
 pe_threshold = st.number_input("Max P/E Ratio")
 growth_threshold = st.number_input("Min Annual Growth (%)")
+extra_filter = st.text_input("Extra filter (e.g. sector == 'Technology' and market_cap > 1e10 and vol_12m < 30)")
+with st.expander("Price factors usable in filters"):
+    st.dataframe(pd.DataFrame({"Column": list(FACTORS), "Meaning": list(FACTORS.values())}), hide_index=True)
+    st.caption("Trend columns: trend_slope_pct, piecewise_slope_pct, rolling_slope_pct (% per year), "
+               "trend_residual_pct (% above the cubic trend), trend_r2.")
+rank_by = st.multiselect("Rank by (several factors = composite rank)",
+                         ("growth", "pe", "forward_pe", "market_cap", "dividend_yield", "momentum_12_1",
+                          "ret_3m", "sharpe_12m", "vol_12m", "max_drawdown_12m", "trend_slope_pct"),
+                         default=["growth"])
+top_n = st.number_input("Show top N (0 = all)", min_value=0, step=1)
+
+# Past screens can be replayed exactly from a dated snapshot of the fundamentals store
+store = get_store()
+with st.sidebar:
+    replay_date = st.selectbox("Fundamentals as of", ["Live"] + store.snapshot_dates()[::-1])
+    if st.button("Save snapshot"):
+        st.success(f"Saved snapshot {store.snapshot()}")
+
+def load_technicals(replay_date):
+    # Five years of daily closes for the whole universe in one download; every
+    # factor and trend column is then computed over the matrix at once
+    with st.spinner("Downloading price history..."):
+        closes, _ = load_histories(tickers, period="5y", interval="1d")
+    if replay_date != "Live":
+        closes = closes.loc[:replay_date]
+    if closes.empty:
+        return None
+    return compute_factors(closes).join(trend_summary(closes))
+
+def load_universe(replay_date):
+    technicals = load_technicals(replay_date)
+    if replay_date != "Live":
+        return build_metrics(store.get_snapshot(replay_date, tickers), technicals)
+
+    # Fresh tickers come straight from the local store; the rest are fetched concurrently
+    infos = {}
+    progress = st.progress(0.0, text="Fetching fundamentals...")
+    for done, (ticker, info, error) in enumerate(iter_infos(tickers, list(INFO_COLUMNS.values()), max_workers=16, rate=20), start=1):
+        progress.progress(done / len(tickers), text=f"Fetched {done}/{len(tickers)} tickers")
+        if error is None:
+            infos[ticker] = info
+    progress.empty()
+    return build_metrics(infos, technicals)
+
+# The metrics matrix is built once per session (and refreshed every 15 minutes), so
+# changing a threshold only re-runs the in-memory filter below
+universe = st.session_state.get("universe")
+if universe is None or universe[0] != replay_date or time.time() - universe[1] > 15 * 60:
+    universe = (replay_date, time.time(), load_universe(replay_date))
+    st.session_state["universe"] = universe
+metrics = universe[2]
+
+expression = f"pe <= {pe_threshold} and growth >= {growth_threshold}"
+if extra_filter.strip():
+    expression += f" and ({extra_filter})"
+
+try:
+    # One factor sorts by its value; several are combined into an average percentile rank
+    lower_is_better = [factor in ("pe", "forward_pe", "vol_12m") for factor in rank_by]
+    if len(rank_by) == 1:
+        results_df = screen(metrics, expression, sort_by=rank_by[0], ascending=lower_is_better[0], top_n=int(top_n))
+    else:
+        results_df = screen(metrics, expression, sort_by=rank_by or None, ascending=lower_is_better, top_n=int(top_n))
+except Exception as e:
+    st.error(f"Invalid filter: {e}")
+    st.stop()
 
-results = []
-
-for ticker in tickers: 
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    pe_ratio = info.get('trailingPE')
-    if pe_ratio is not None:
-        try:
-            pe_ratio = float(pe_ratio)
-        except ValueError:
-            pe_ratio = None 
-    pc = info.get('previousClose')
-    fth = info.get('fiftyTwoWeekHigh')
-    ftl = info.get('fiftyTwoWeekLow')
-    if (ftl and fth and pc) :
-        annual_growth = ((pc - ftl)/fth) * 100 
-    else : 
-        annual_growth = None
-
-    if pe_ratio and annual_growth and pe_ratio <= pe_threshold and annual_growth >= growth_threshold:
-        results.append({"Ticker": ticker, "P/E Ratio": pe_ratio, "Annual Growth (%)": annual_growth})
-
-results_df = pd.DataFrame(results)
-st.dataframe(results_df)
\ No newline at end of file
+columns = ["ticker", "sector", "pe", "growth"] + [c for c in ("vol_12m", "max_drawdown_12m", *rank_by, "score")
+                                                   if c in results_df and c not in ("pe", "growth")]
+results_df = results_df.reset_index()[list(dict.fromkeys(columns))].rename(columns={
+    "ticker": "Ticker", "sector": "Sector", "pe": "P/E Ratio", "growth": "Annual Growth (%)",
+    "vol_12m": "12M Volatility (%)", "max_drawdown_12m": "12M Max Drawdown (%)", "score": "Composite Rank"})
+st.dataframe(results_df, hide_index=True)